@@ -0,0 +1,29 @@
+"""add tracked hit backfill
+
+Revision ID: 021154d2090c
+Revises: 2b3f410419ef
+Create Date: 2026-03-22 11:15:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "021154d2090c"
+down_revision = "2b3f410419ef"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Left NULL for existing sites: the first backfill also catches up
+    # results from before they were tracked
+    op.add_column("tracked_sites", sa.Column("hits_backfilled_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_serp_results_domain", "serp_results", ["domain"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_serp_results_domain", table_name="serp_results")
+    op.drop_column("tracked_sites", "hits_backfilled_at")
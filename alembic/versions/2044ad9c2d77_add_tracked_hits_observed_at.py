@@ -0,0 +1,27 @@
+"""add tracked_hits.observed_at
+
+Revision ID: 2044ad9c2d77
+Revises: 021154d2090c
+Create Date: 2026-03-23 09:40:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "2044ad9c2d77"
+down_revision = "021154d2090c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Backfilled hits are stamped with the time of the backfill, so incremental
+    # exports past them still pick them up; the result's own time goes here
+    op.add_column("tracked_hits", sa.Column("observed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("tracked_hits", "observed_at")
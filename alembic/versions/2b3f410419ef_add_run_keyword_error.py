@@ -0,0 +1,25 @@
+"""add run keyword error
+
+Revision ID: 2b3f410419ef
+Revises: cefd81a10b55
+Create Date: 2026-03-21 10:30:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "2b3f410419ef"
+down_revision = "cefd81a10b55"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("run_keywords", sa.Column("error", sa.String(length=500), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("run_keywords", "error")
@@ -0,0 +1,68 @@
+"""page tag changelog storage
+
+Revision ID: 42b6f039f069
+Revises: 4c2e9a7b1f6d
+Create Date: 2026-03-02 10:15:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "42b6f039f069"
+down_revision = "4c2e9a7b1f6d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled in for existing rows by 7a10d231c8b7
+    op.add_column("page_tags", sa.Column("state_hash", sa.String(length=64), nullable=True))
+    op.add_column(
+        "page_tags",
+        sa.Column("confirm_count", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+    op.add_column(
+        "page_tags", sa.Column("last_confirmed_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.execute("UPDATE page_tags SET last_confirmed_at = created_at")
+    op.create_index("ix_page_tags_watch_url_id_id", "page_tags", ["watch_url_id", "id"], unique=False)
+
+    op.create_table(
+        "page_tag_checks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("watch_url_id", sa.Integer(), nullable=False),
+        sa.Column("page_tag_id", sa.Integer(), nullable=False),
+        sa.Column("checked_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["run_id"], ["runs.id"]),
+        sa.ForeignKeyConstraint(["watch_url_id"], ["watch_urls.id"]),
+        sa.ForeignKeyConstraint(["page_tag_id"], ["page_tags.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_page_tag_checks_run_id"), "page_tag_checks", ["run_id"], unique=False)
+    op.create_index(op.f("ix_page_tag_checks_watch_url_id"), "page_tag_checks", ["watch_url_id"], unique=False)
+    op.create_index(op.f("ix_page_tag_checks_page_tag_id"), "page_tag_checks", ["page_tag_id"], unique=False)
+
+    # Every existing row was a check of its own run
+    op.execute(
+        """
+        INSERT INTO page_tag_checks (run_id, watch_url_id, page_tag_id, checked_at)
+        SELECT run_id, watch_url_id, id, created_at
+        FROM page_tags
+        ORDER BY id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_page_tag_checks_page_tag_id"), table_name="page_tag_checks")
+    op.drop_index(op.f("ix_page_tag_checks_watch_url_id"), table_name="page_tag_checks")
+    op.drop_index(op.f("ix_page_tag_checks_run_id"), table_name="page_tag_checks")
+    op.drop_table("page_tag_checks")
+    op.drop_index("ix_page_tags_watch_url_id_id", table_name="page_tags")
+    op.drop_column("page_tags", "last_confirmed_at")
+    op.drop_column("page_tags", "confirm_count")
+    op.drop_column("page_tags", "state_hash")
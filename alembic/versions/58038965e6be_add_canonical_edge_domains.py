@@ -0,0 +1,53 @@
+"""add canonical edge domains
+
+Revision ID: 58038965e6be
+Revises: 92bd7062a0ba
+Create Date: 2026-03-16 10:20:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "58038965e6be"
+down_revision = "92bd7062a0ba"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("canonical_edges", sa.Column("source_domain", sa.String(length=255), nullable=True))
+    op.add_column("canonical_edges", sa.Column("canonical_domain", sa.String(length=255), nullable=True))
+    # Same normalization as utils.urls.extract_domain
+    op.execute(
+        """
+        UPDATE canonical_edges
+        SET source_domain = nullif(
+                regexp_replace(lower(substring(source_url from '://([^/?#]+)')), '^www\\.', ''), ''
+            ),
+            canonical_domain = nullif(
+                regexp_replace(lower(substring(canonical_url from '://([^/?#]+)')), '^www\\.', ''), ''
+            )
+        """
+    )
+    op.create_index(
+        "ix_canonical_edges_source_domain_observed_at",
+        "canonical_edges",
+        ["source_domain", "observed_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_canonical_edges_canonical_domain_observed_at",
+        "canonical_edges",
+        ["canonical_domain", "observed_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_canonical_edges_canonical_domain_observed_at", table_name="canonical_edges")
+    op.drop_index("ix_canonical_edges_source_domain_observed_at", table_name="canonical_edges")
+    op.drop_column("canonical_edges", "canonical_domain")
+    op.drop_column("canonical_edges", "source_domain")
@@ -0,0 +1,59 @@
+"""add run keywords
+
+Revision ID: 68314d74da99
+Revises: 42b6f039f069
+Create Date: 2026-03-04 09:40:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "68314d74da99"
+down_revision = "42b6f039f069"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "run_keywords",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("keyword_id", sa.Integer(), nullable=False),
+        sa.Column("result_count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM("pending", "running", "success", "failed", name="runstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["run_id"], ["runs.id"]),
+        sa.ForeignKeyConstraint(["keyword_id"], ["keywords.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("run_id", "keyword_id", name="uq_run_keywords_run_id_keyword_id"),
+    )
+    op.create_index(
+        "ix_run_keywords_keyword_id_run_id", "run_keywords", ["keyword_id", "run_id"], unique=False
+    )
+
+    # Runs used to be written in a single transaction, so every keyword with
+    # stored results finished with its run; per-keyword start times are unknown.
+    op.execute(
+        """
+        INSERT INTO run_keywords (run_id, keyword_id, result_count, status, started_at, finished_at)
+        SELECT sr.run_id, sr.keyword_id, count(*), 'success', NULL, max(sr.created_at)
+        FROM serp_results sr
+        GROUP BY sr.run_id, sr.keyword_id
+        ORDER BY sr.run_id, sr.keyword_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_run_keywords_keyword_id_run_id", table_name="run_keywords")
+    op.drop_table("run_keywords")
@@ -0,0 +1,141 @@
+"""add site status summary
+
+Revision ID: 6b62fbb4ea81
+Revises: 68314d74da99
+Create Date: 2026-03-06 11:20:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "6b62fbb4ea81"
+down_revision = "68314d74da99"
+branch_labels = None
+depends_on = None
+
+
+# Same normalization as utils.urls.extract_domain
+_DOMAIN_SQL = "regexp_replace(lower(substring({col} from '://([^/?#]+)')), '^www\\.', '')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "site_status",
+        sa.Column("domain", sa.String(length=255), nullable=False),
+        sa.Column("top10_now", sa.Boolean(), server_default=sa.text("false"), nullable=False),
+        sa.Column("last_position", sa.Integer(), nullable=True),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("canonical_changed", sa.Boolean(), server_default=sa.text("false"), nullable=False),
+        sa.Column("hreflang_changed", sa.Boolean(), server_default=sa.text("false"), nullable=False),
+        sa.Column("last_canonical", sa.String(length=1000), nullable=True),
+        sa.Column("last_hreflang", postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column("redirect_ever", sa.Boolean(), server_default=sa.text("false"), nullable=False),
+        sa.Column("redirect_now", sa.Boolean(), server_default=sa.text("false"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("domain"),
+    )
+
+    serp_domain = _DOMAIN_SQL.format(col="sr.link")
+    watch_domain = _DOMAIN_SQL.format(col="w.url")
+
+    # Last SERP appearance per domain; top-10 now = seen in the latest SERP run
+    op.execute(
+        f"""
+        WITH latest AS (SELECT max(run_id) AS run_id FROM serp_results),
+        seen AS (
+            SELECT DISTINCT ON ({serp_domain})
+                {serp_domain} AS domain, sr.run_id, sr.position,
+                coalesce(r.finished_at, r.created_at) AS seen_at
+            FROM serp_results sr
+            JOIN runs r ON r.id = sr.run_id
+            WHERE sr.position <= 10
+            ORDER BY {serp_domain}, sr.run_id DESC, sr.position ASC
+        )
+        INSERT INTO site_status (domain, top10_now, last_position, last_seen_at)
+        SELECT seen.domain, seen.run_id = latest.run_id, seen.position, seen.seen_at
+        FROM seen CROSS JOIN latest
+        WHERE seen.domain IS NOT NULL AND seen.domain <> ''
+        """
+    )
+
+    # Replay page tags per domain in check order, preferring Googlebot values
+    op.execute(
+        f"""
+        WITH tags AS (
+            SELECT
+                {watch_domain} AS domain,
+                pt.created_at,
+                pt.id,
+                coalesce(
+                    nullif(pt.raw -> 'googlebot' ->> 'canonical', ''),
+                    nullif(pt.raw -> 'bot' ->> 'canonical', ''),
+                    CASE WHEN pt.raw ? 'bot' THEN NULL ELSE pt.canonical END
+                ) AS canonical,
+                coalesce(
+                    nullif(nullif(pt.raw -> 'googlebot' -> 'hreflang', 'null'::jsonb), '{{}}'::jsonb),
+                    nullif(nullif(pt.raw -> 'bot' -> 'hreflang', 'null'::jsonb), '{{}}'::jsonb),
+                    CASE WHEN pt.raw ? 'bot' THEN NULL ELSE pt.hreflang END
+                ) AS hreflang
+            FROM page_tags pt
+            JOIN watch_urls w ON w.id = pt.watch_url_id
+        ),
+        ordered AS (
+            SELECT
+                domain, created_at, id, canonical, hreflang,
+                lag(canonical) OVER w AS prev_canonical,
+                lag(hreflang) OVER w AS prev_hreflang,
+                row_number() OVER (PARTITION BY domain ORDER BY created_at DESC, id DESC) AS rn
+            FROM tags
+            WHERE domain IS NOT NULL AND domain <> ''
+            WINDOW w AS (PARTITION BY domain ORDER BY created_at, id)
+        ),
+        flags AS (
+            SELECT
+                domain,
+                bool_or(prev_canonical IS NOT NULL AND prev_canonical IS DISTINCT FROM canonical)
+                    AS canonical_changed,
+                bool_or(prev_hreflang IS NOT NULL AND prev_hreflang IS DISTINCT FROM hreflang)
+                    AS hreflang_changed,
+                max(canonical) FILTER (WHERE rn = 1) AS last_canonical,
+                (array_agg(hreflang) FILTER (WHERE rn = 1))[1] AS last_hreflang
+            FROM ordered
+            GROUP BY domain
+        )
+        INSERT INTO site_status (domain, canonical_changed, hreflang_changed, last_canonical, last_hreflang)
+        SELECT domain, canonical_changed, hreflang_changed, last_canonical, last_hreflang
+        FROM flags
+        ON CONFLICT (domain) DO UPDATE SET
+            canonical_changed = excluded.canonical_changed,
+            hreflang_changed = excluded.hreflang_changed,
+            last_canonical = excluded.last_canonical,
+            last_hreflang = excluded.last_hreflang
+        """
+    )
+
+    op.execute(
+        """
+        WITH events AS (
+            SELECT
+                source_domain AS domain,
+                bool_or(final_domain <> source_domain) AS redirect_ever,
+                (array_agg(final_domain <> source_domain ORDER BY observed_at DESC, id DESC))[1]
+                    AS redirect_now
+            FROM redirect_events
+            GROUP BY source_domain
+        )
+        INSERT INTO site_status (domain, redirect_ever, redirect_now)
+        SELECT domain, redirect_ever, redirect_now
+        FROM events
+        ON CONFLICT (domain) DO UPDATE SET
+            redirect_ever = excluded.redirect_ever,
+            redirect_now = excluded.redirect_now
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("site_status")
@@ -0,0 +1,48 @@
+"""add export checkpoints
+
+Revision ID: 70337f1ae0b1
+Revises: 58038965e6be
+Create Date: 2026-03-18 09:40:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "70337f1ae0b1"
+down_revision = "58038965e6be"
+branch_labels = None
+depends_on = None
+
+# (time, id) keysets read by incremental export
+_KEYSET_INDEXES = [
+    ("ix_serp_results_created_at_id", "serp_results", ["created_at", "id"]),
+    ("ix_tracked_hits_detected_at_id", "tracked_hits", ["detected_at", "id"]),
+    ("ix_page_tags_created_at_id", "page_tags", ["created_at", "id"]),
+    ("ix_redirect_events_observed_at_id", "redirect_events", ["observed_at", "id"]),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "export_checkpoints",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("dataset", sa.String(length=32), nullable=False),
+        sa.Column("last_time", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_id", sa.BigInteger(), nullable=True),
+        sa.Column("pending_before", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("sequence", sa.Integer(), server_default=sa.text("0"), nullable=False),
+        sa.Column("rows_exported", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("name", "dataset"),
+    )
+    for name, table, columns in _KEYSET_INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(_KEYSET_INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_table("export_checkpoints")
@@ -0,0 +1,75 @@
+"""backfill page_tags.state_hash, export page tags by confirmation
+
+Revision ID: 7a10d231c8b7
+Revises: 2044ad9c2d77
+Create Date: 2026-03-24 10:20:00.000000
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "7a10d231c8b7"
+down_revision = "2044ad9c2d77"
+branch_labels = None
+depends_on = None
+
+# Rows hashed per round trip
+BATCH_SIZE = 1000
+
+# As tag_service at this revision, so rows from before the change-log
+# compare equal to a new check of the same state
+_STATE_KEYS = ("canonical", "hreflang", "status", "final_url")
+
+
+def _tag_state_hash(bot_parsed: dict, google_parsed: dict) -> str:
+    state = {
+        "bot": {key: bot_parsed.get(key) for key in _STATE_KEYS},
+        "googlebot": {key: google_parsed.get(key) for key in _STATE_KEYS},
+    }
+    encoded = json.dumps(state, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                """
+                SELECT id, raw -> 'bot' AS bot, raw -> 'googlebot' AS googlebot
+                FROM page_tags
+                WHERE state_hash IS NULL AND id > :last_id
+                ORDER BY id
+                LIMIT :limit
+                """
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("UPDATE page_tags SET state_hash = :state_hash WHERE id = :id"),
+            [
+                {"id": row.id, "state_hash": _tag_state_hash(row.bot or {}, row.googlebot or {})}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+    # Exports key page tags on their last confirmation, so re-confirmed
+    # states are exported again
+    op.execute("UPDATE page_tags SET last_confirmed_at = created_at WHERE last_confirmed_at IS NULL")
+    op.create_index(
+        "ix_page_tags_last_confirmed_at_id", "page_tags", ["last_confirmed_at", "id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_page_tags_last_confirmed_at_id", table_name="page_tags")
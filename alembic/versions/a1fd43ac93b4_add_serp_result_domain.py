@@ -0,0 +1,39 @@
+"""add serp result domain
+
+Revision ID: a1fd43ac93b4
+Revises: 6b62fbb4ea81
+Create Date: 2026-03-09 14:05:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a1fd43ac93b4"
+down_revision = "6b62fbb4ea81"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("serp_results", sa.Column("domain", sa.String(length=255), nullable=True))
+    # Same normalization as utils.urls.extract_domain
+    op.execute(
+        """
+        UPDATE serp_results
+        SET domain = nullif(regexp_replace(lower(substring(link from '://([^/?#]+)')), '^www\\.', ''), '')
+        """
+    )
+    op.create_index(
+        "ix_serp_results_keyword_id_domain_run_id",
+        "serp_results",
+        ["keyword_id", "domain", "run_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_serp_results_keyword_id_domain_run_id", table_name="serp_results")
+    op.drop_column("serp_results", "domain")
@@ -0,0 +1,39 @@
+"""add run shards
+
+Revision ID: cefd81a10b55
+Revises: db2e06ba44bb
+Create Date: 2026-03-20 14:15:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "cefd81a10b55"
+down_revision = "db2e06ba44bb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("runs", sa.Column("parent_id", sa.Integer(), nullable=True))
+    op.add_column("runs", sa.Column("run_key", sa.String(length=64), nullable=True))
+    op.add_column("runs", sa.Column("shard_index", sa.Integer(), nullable=True))
+    op.add_column("runs", sa.Column("shard_count", sa.Integer(), nullable=True))
+    op.add_column("runs", sa.Column("keyword_total", sa.Integer(), nullable=True))
+    op.create_foreign_key("runs_parent_id_fkey", "runs", "runs", ["parent_id"], ["id"])
+    op.create_unique_constraint("uq_runs_run_key", "runs", ["run_key"])
+    op.create_unique_constraint("uq_runs_parent_id_shard_index", "runs", ["parent_id", "shard_index"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_runs_parent_id_shard_index", "runs", type_="unique")
+    op.drop_constraint("uq_runs_run_key", "runs", type_="unique")
+    op.drop_constraint("runs_parent_id_fkey", "runs", type_="foreignkey")
+    op.drop_column("runs", "keyword_total")
+    op.drop_column("runs", "shard_count")
+    op.drop_column("runs", "shard_index")
+    op.drop_column("runs", "run_key")
+    op.drop_column("runs", "parent_id")
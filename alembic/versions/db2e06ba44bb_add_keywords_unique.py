@@ -0,0 +1,95 @@
+"""add keywords unique constraint
+
+Revision ID: db2e06ba44bb
+Revises: 70337f1ae0b1
+Create Date: 2026-03-19 11:05:00.000000
+
+Needs PostgreSQL 15 or later: the constraint is NULLS NOT DISTINCT, so
+keywords without a proxy profile are unique too.
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+revision = "db2e06ba44bb"
+down_revision = "70337f1ae0b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Merge duplicate keywords into the oldest row of each group first
+    op.execute(
+        """
+        CREATE TEMP TABLE keyword_duplicates ON COMMIT DROP AS
+        SELECT id, keep_id
+        FROM (
+            SELECT id, min(id) OVER (PARTITION BY keyword, region, language, proxy_profile) AS keep_id
+            FROM keywords
+        ) grouped
+        WHERE id <> keep_id
+        """
+    )
+    # One schedule per merged keyword: prefer an active one, then the kept
+    # keyword's, then the oldest
+    op.execute(
+        """
+        DELETE FROM keyword_schedules s
+        USING (
+            SELECT s.id,
+                   row_number() OVER (
+                       PARTITION BY coalesce(d.keep_id, s.keyword_id)
+                       ORDER BY s.active IS TRUE DESC, d.id IS NULL DESC, s.id
+                   ) AS rank
+            FROM keyword_schedules s
+            LEFT JOIN keyword_duplicates d ON d.id = s.keyword_id
+            WHERE coalesce(d.keep_id, s.keyword_id) IN (SELECT keep_id FROM keyword_duplicates)
+        ) ranked
+        WHERE s.id = ranked.id AND ranked.rank > 1
+        """
+    )
+    for table in ("serp_results", "tracked_hits", "keyword_schedules"):
+        op.execute(
+            f"""
+            UPDATE {table} t SET keyword_id = d.keep_id
+            FROM keyword_duplicates d
+            WHERE t.keyword_id = d.id
+            """
+        )
+    # One run_keywords row per run and merged keyword: prefer the kept
+    # keyword's row, then the oldest
+    op.execute(
+        """
+        DELETE FROM run_keywords r
+        USING keyword_duplicates d
+        WHERE r.keyword_id = d.id
+          AND EXISTS (
+              SELECT 1
+              FROM run_keywords k
+              LEFT JOIN keyword_duplicates kd ON kd.id = k.keyword_id
+              WHERE k.run_id = r.run_id
+                AND coalesce(kd.keep_id, k.keyword_id) = d.keep_id
+                AND (k.keyword_id = d.keep_id OR k.id < r.id)
+          )
+        """
+    )
+    op.execute(
+        """
+        UPDATE run_keywords r SET keyword_id = d.keep_id
+        FROM keyword_duplicates d
+        WHERE r.keyword_id = d.id
+        """
+    )
+    op.execute("DELETE FROM keywords k USING keyword_duplicates d WHERE k.id = d.id")
+    op.create_unique_constraint(
+        "uq_keywords_keyword_region_language_proxy_profile",
+        "keywords",
+        ["keyword", "region", "language", "proxy_profile"],
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_keywords_keyword_region_language_proxy_profile", "keywords", type_="unique")
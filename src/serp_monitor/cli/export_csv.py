@@ -4,67 +4,102 @@ from __future__ import annotations
 
 import argparse
 import csv
+from datetime import datetime
+from pathlib import Path
 
-from sqlalchemy import desc, select
-
-from serp_monitor.db.models import Keyword, Run, SerpResult
-from serp_monitor.db.session import get_session
+from serp_monitor.db.session import get_read_session, get_session
+from serp_monitor.services.export import (
+    CSV_DATASET,
+    EXPORT_BATCH_SIZE,
+    EXPORT_COLUMNS,
+    export_statement,
+    latest_run_id,
+    stream_export_batches,
+)
+from serp_monitor.services.incremental_export import csv_writer, export_increment
 
 
 def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Export SERP results to CSV")
-    parser.add_argument("--out", required=True, help="Output CSV path")
-    parser.add_argument("--run-id", type=int, default=None, help="Run id to export")
+    parser = argparse.ArgumentParser(
+        description="Export SERP results to CSV (the latest hourly run unless filters are given)"
+    )
+    parser.add_argument("--out", default=None, help="Output CSV path")
+    parser.add_argument(
+        "--incremental",
+        metavar="NAME",
+        default=None,
+        help="Export only rows added since the previous run under this checkpoint name",
+    )
+    parser.add_argument(
+        "--out-dir", type=Path, default=None, help="Directory for --incremental files (one per run)"
+    )
+    parser.add_argument(
+        "--run-id", type=int, action="append", default=None, help="Run id to export, repeatable"
+    )
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Runs from, ISO date/time")
+    parser.add_argument(
+        "--until", type=datetime.fromisoformat, default=None, help="Runs before, ISO date/time"
+    )
+    parser.add_argument("--kind", default=None, help="Run kind, e.g. hourly or schedule")
+    parser.add_argument("--keyword", action="append", default=None, help="Keyword text, repeatable")
+    parser.add_argument(
+        "--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Rows fetched per round trip"
+    )
     return parser
 
 
-def _get_latest_run_id(session) -> int | None:
-    stmt = select(Run.id).where(Run.kind == "hourly").order_by(desc(Run.id)).limit(1)
-    return session.execute(stmt).scalar_one_or_none()
-
-
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
 
-    with get_session() as session:
-        run_id = args.run_id or _get_latest_run_id(session)
-        if not run_id:
-            print("No runs found")
-            return
+    if args.incremental:
+        if not args.out_dir:
+            parser.error("--incremental requires --out-dir")
+        if args.run_id or args.since or args.until or args.kind or args.keyword:
+            parser.error("--incremental exports every new row, filters are not supported")
+        _export_increment(args)
+        return
+    if not args.out:
+        parser.error("--out is required")
 
-        stmt = (
-            select(
-                SerpResult.id,
-                SerpResult.position,
-                SerpResult.title,
-                SerpResult.link,
-                SerpResult.snippet,
-                SerpResult.created_at,
-                Keyword.keyword,
-                Keyword.region,
-                Keyword.language,
-            )
-            .join(Keyword, Keyword.id == SerpResult.keyword_id)
-            .where(SerpResult.run_id == run_id)
-            .order_by(SerpResult.position.asc())
+    with get_read_session("cli") as session:
+        run_ids = args.run_id
+        if not (run_ids or args.since or args.until or args.kind or args.keyword):
+            latest = latest_run_id(session)
+            if not latest:
+                print("No runs found")
+                return
+            run_ids = [latest]
+
+        stmt = export_statement(
+            run_ids=run_ids,
+            since=args.since,
+            until=args.until,
+            kind=args.kind,
+            keywords=args.keyword,
         )
-        rows = session.execute(stmt).all()
+        exported = 0
+        with open(args.out, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(EXPORT_COLUMNS)
+            for batch in stream_export_batches(session, stmt, args.batch_size):
+                writer.writerows(batch)
+                exported += len(batch)
+
+    print(f"Exported {exported} rows to {args.out}")
 
-    with open(args.out, "w", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow([
-            "result_id",
-            "position",
-            "title",
-            "link",
-            "snippet",
-            "created_at",
-            "keyword",
-            "region",
-            "language",
-        ])
-        for row in rows:
-            writer.writerow(row)
 
-    print(f"Exported {len(rows)} rows to {args.out}")
+def _export_increment(args: argparse.Namespace) -> None:
+    # Primary, not the replica: the checkpoint is written and the bound of
+    # settled rows is read from the primary's open transactions
+    with get_session("cli") as session:
+        exported = export_increment(
+            session,
+            args.incremental,
+            # Own checkpoint, apart from export-parquet's serp_results
+            "serp_results_csv",
+            CSV_DATASET,
+            csv_writer(args.out_dir, "serp_results", EXPORT_COLUMNS),
+            args.batch_size,
+        )
+    print(f"Exported {exported} new rows to {args.out_dir}")
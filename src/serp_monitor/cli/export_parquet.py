@@ -0,0 +1,70 @@
+"""CLI for columnar (Parquet) export."""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from serp_monitor.db.session import get_read_session, get_session
+from serp_monitor.services.export import EXPORT_BATCH_SIZE, EXPORT_DATASETS
+from serp_monitor.services.incremental_export import export_increment
+from serp_monitor.services.parquet_export import parquet_writer, write_dataset
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Export tables to Parquet partitioned by date and region"
+    )
+    parser.add_argument("--out-dir", required=True, type=Path, help="Output directory")
+    parser.add_argument(
+        "--dataset",
+        action="append",
+        choices=list(EXPORT_DATASETS),
+        default=None,
+        help="Dataset to export, repeatable (default: all)",
+    )
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="From, ISO date/time")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="Before, ISO date/time")
+    parser.add_argument(
+        "--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="Rows per fetch and per record batch"
+    )
+    parser.add_argument(
+        "--incremental",
+        metavar="NAME",
+        default=None,
+        help="Export only rows added since the previous run under this checkpoint name",
+    )
+    return parser
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.incremental and (args.since or args.until):
+        parser.error("--incremental exports every new row, --since/--until are not supported")
+
+    for dataset in args.dataset or list(EXPORT_DATASETS):
+        if args.incremental:
+            # Primary: the checkpoint is written there
+            with get_session("cli") as session:
+                written = export_increment(
+                    session,
+                    args.incremental,
+                    dataset,
+                    EXPORT_DATASETS[dataset],
+                    parquet_writer(args.out_dir / dataset, dataset, args.batch_size),
+                    args.batch_size,
+                )
+            print(f"Exported {written} new {dataset} rows to {args.out_dir / dataset}")
+            continue
+        with get_read_session("cli") as session:
+            written = write_dataset(
+                session,
+                dataset,
+                args.out_dir,
+                since=args.since,
+                until=args.until,
+                batch_size=args.batch_size,
+            )
+        print(f"Exported {written} {dataset} rows to {args.out_dir / dataset}")
@@ -3,67 +3,59 @@
 from __future__ import annotations
 
 import argparse
-from typing import Any
 
 from sqlalchemy import select
 
-from serp_monitor.config.loaders import load_config
+from serp_monitor.config.loaders import load_keywords
 from serp_monitor.config.settings import get_settings
-from serp_monitor.db.models import Keyword
-from serp_monitor.db.session import get_session
+from serp_monitor.db.models import Keyword, Run, RunKeyword, RunStatus
+from serp_monitor.db.session import get_read_session, get_session
 from serp_monitor.providers.serper import SerperClient
+from serp_monitor.services.keywords import sync_keywords
 from serp_monitor.services.serp_service import SerpService
-
-
-def _load_keywords(config_path: str) -> list[dict[str, Any]]:
-    data = load_config(config_path)
-    items = data.get("keywords") or []
-    if not isinstance(items, list):
-        raise ValueError("keywords must be a list")
-    normalized: list[dict[str, Any]] = []
-    for item in items:
-        if not isinstance(item, dict):
-            continue
-        keyword = str(item.get("keyword") or "").strip()
-        region = str(item.get("region") or "").strip()
-        if not keyword or not region:
-            continue
-        language = str(item.get("language") or "EN").strip()
-        normalized.append(
-            {
-                "keyword": keyword,
-                "region": region,
-                "language": language,
-                "proxy_profile": (item.get("proxy_profile") or None),
-            }
-        )
-    return normalized
-
-
-def _sync_keywords(session, keywords: list[dict[str, Any]]) -> list[Keyword]:
-    result: list[Keyword] = []
-    for item in keywords:
-        stmt = select(Keyword).where(
-            Keyword.keyword == item["keyword"],
-            Keyword.region == item["region"],
-            Keyword.language == item["language"],
-            Keyword.proxy_profile == item["proxy_profile"],
-        )
-        existing = session.execute(stmt).scalar_one_or_none()
-        if existing:
-            result.append(existing)
-            continue
-        row = Keyword(**item)
-        session.add(row)
-        session.flush()
-        result.append(row)
-    session.commit()
-    return result
+from serp_monitor.services.shards import (
+    create_shard_run,
+    default_run_key,
+    finish_parent_run,
+    get_or_create_parent_run,
+    latest_parent_run,
+    parse_shard,
+    select_shard,
+    shard_progress,
+)
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Run hourly SERP fetch")
-    parser.add_argument("--config", required=True, help="Path to keywords config (yaml/json)")
+    parser.add_argument("--config", default=None, help="Path to keywords config (yaml/json/jsonl)")
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Fetch only shard I (from 1) of N; shards of one run share a parent run",
+    )
+    parser.add_argument(
+        "--run-key",
+        default=None,
+        help="Parent run key shared by all shards (default: current UTC hour and N)",
+    )
+    parser.add_argument(
+        "--resume",
+        type=int,
+        default=None,
+        metavar="RUN_ID",
+        help="Fetch the keywords of an interrupted run that are still pending or failed",
+    )
+    parser.add_argument(
+        "--status",
+        type=int,
+        nargs="?",
+        const=0,
+        default=None,
+        metavar="RUN_ID",
+        help="Show completion of a sharded run (default: the latest) and exit",
+    )
     return parser
 
 
@@ -71,17 +63,106 @@ def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
 
-    settings = get_settings()
-    client = SerperClient(settings)
-    service = SerpService(client)
+    if args.status is not None:
+        _print_status(args.status or None)
+        return
+    if args.resume is not None:
+        _resume(args.resume)
+        return
+    if not args.config:
+        parser.error("--config is required")
 
-    keywords_config = _load_keywords(args.config)
+    settings = get_settings()
+    keywords_config = load_keywords(args.config, cache_dir=settings.config_cache_dir or None)
     if not keywords_config:
         print("No keywords found in config")
         return
 
-    with get_session() as session:
-        keywords = _sync_keywords(session, keywords_config)
-        run = service.run_keywords(session, keywords, kind="hourly")
-
-    print(f"Run {run.id} finished with status={run.status}")
+    with SerperClient(settings) as client:
+        service = SerpService(client)
+        if not args.shard:
+            with get_session("cli") as session:
+                keywords = sync_keywords(session, keywords_config)
+                run = service.run_keywords(session, keywords, kind="hourly")
+                print(f"Run {run.id} finished with status={run.status}")
+            return
+
+        shard_index, shard_count = args.shard
+        keywords_config = select_shard(keywords_config, shard_index, shard_count)
+        run_key = args.run_key or default_run_key("hourly", shard_count)
+        with get_session("cli") as session:
+            parent = get_or_create_parent_run(session, run_key, "hourly", shard_count)
+            run = create_shard_run(session, parent, shard_index)
+            keywords = sync_keywords(session, keywords_config)
+            try:
+                run = service.run_keywords(session, keywords, run=run)
+            finally:
+                parent = finish_parent_run(session, parent.id)
+            print(
+                f"Run {run.id} (shard {shard_index}/{shard_count} of run {parent.id}) finished with "
+                f"status={run.status}; run {parent.id} is {parent.status.value}"
+            )
+
+
+def _resume(run_id: int) -> None:
+    """Continue ``run_id`` with the keywords it was started with.
+
+    Only for runs whose process is gone: nothing stops two processes from
+    resuming the same run at once.
+    """
+    with SerperClient(get_settings()) as client, get_session("cli") as session:
+        service = SerpService(client)
+        run = session.get(Run, run_id)
+        if run is None:
+            print(f"Run {run_id} not found")
+            return
+        if run.parent_id is None and run.shard_count:
+            print(f"Run {run_id} is a sharded run, resume its shard runs (see --status {run_id})")
+            return
+        keywords = list(
+            session.execute(
+                select(Keyword)
+                .join(RunKeyword, RunKeyword.keyword_id == Keyword.id)
+                .where(RunKeyword.run_id == run_id)
+                .order_by(RunKeyword.id)
+            ).scalars()
+        )
+        try:
+            run = service.run_keywords(session, keywords, run=run)
+        finally:
+            if run.parent_id is not None:
+                finish_parent_run(session, run.parent_id)
+        print(f"Run {run.id} finished with status={run.status}")
+        if run.error:
+            print(run.error)
+
+
+def _print_status(run_id: int | None) -> None:
+    with get_read_session("cli") as session:
+        parent = session.get(Run, run_id) if run_id else latest_parent_run(session)
+        if parent is None or not parent.shard_count:
+            print("No sharded run found")
+            return
+        progress = shard_progress(session, parent)
+
+    started = [shard for shard in progress if shard.run is not None]
+    finished = [shard for shard in started if shard.run.status in (RunStatus.success, RunStatus.failed)]
+    print(
+        f"Run {parent.id} ({parent.run_key}): {parent.status.value}, "
+        f"{len(finished)}/{parent.shard_count} shards finished, {len(started) - len(finished)} running"
+    )
+    for shard in progress:
+        label = f"  shard {shard.shard_index}/{parent.shard_count}"
+        if shard.run is None:
+            print(f"{label}  not started")
+            continue
+        total = shard.run.keyword_total if shard.run.keyword_total is not None else "?"
+        print(
+            f"{label}  run {shard.run.id}  {shard.run.status.value}  "
+            f"{shard.keywords_done}/{total} keywords  {shard.results} results"
+        )
+    done = sum(shard.keywords_done for shard in started)
+    known = sum(shard.run.keyword_total or 0 for shard in started)
+    if known:
+        scope = "" if len(started) == parent.shard_count else " (started shards)"
+        print(f"Keywords: {done}/{known} ({done / known:.0%}){scope}")
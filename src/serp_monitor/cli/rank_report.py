@@ -0,0 +1,58 @@
+"""CLI for portfolio-wide rank reports."""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+
+from serp_monitor.db.session import get_read_session
+from serp_monitor.services.analytics import (
+    DEFAULT_STREAK,
+    load_positions,
+    rank_events,
+    rank_summary,
+    tracked_pairs,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Drop/return events, streaks and volatility for tracked sites"
+    )
+    parser.add_argument("--out", default=None, help="Output CSV path (prints a table if omitted)")
+    parser.add_argument(
+        "--events", action="store_true", help="Export first-seen/dropped/back events instead of the summary"
+    )
+    parser.add_argument("--keyword-id", type=int, action="append", default=None, help="Limit to keyword id")
+    parser.add_argument("--domain", action="append", default=None, help="Limit to domain")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="ISO date/time, inclusive")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="ISO date/time, exclusive")
+    parser.add_argument(
+        "--streak", type=int, default=DEFAULT_STREAK, help="Consecutive runs confirming a drop/return"
+    )
+    return parser
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    with get_read_session("cli") as session:
+        # Filtered before loading, so only the selected series are queried
+        pairs = [
+            (keyword_id, domain)
+            for keyword_id, domain in tracked_pairs(session)
+            if (not args.keyword_id or keyword_id in args.keyword_id)
+            and (not args.domain or domain in args.domain)
+        ]
+        frame = load_positions(session, pairs, since=args.since, until=args.until)
+    if frame.empty:
+        print("No positions found")
+        return
+
+    report = rank_events(frame, args.streak) if args.events else rank_summary(frame, args.streak)
+    if args.out:
+        report.to_csv(args.out, index=False)
+        print(f"Exported {len(report)} rows to {args.out}")
+    else:
+        print(report.to_string(index=False))
@@ -0,0 +1,94 @@
+"""CLI for replaying stored SERP payloads without calling Serper."""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+import time
+
+from serp_monitor.db.session import get_read_session, get_session
+from serp_monitor.services.export import EXPORT_BATCH_SIZE
+from serp_monitor.services.replay import (
+    REPLAY_BATCH_SIZE,
+    REPLAY_KIND,
+    archive_payloads,
+    replay,
+    run_payloads,
+    source_run_ids,
+    write_archive,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run stored SERP payloads through ingestion again, without calling Serper"
+    )
+    source = parser.add_argument_group("source (one of)")
+    source.add_argument(
+        "--run-id", type=int, action="append", default=None, help="Run to replay, repeatable"
+    )
+    source.add_argument(
+        "--since", type=datetime.fromisoformat, default=None, help="Runs from, ISO date/time"
+    )
+    source.add_argument(
+        "--until", type=datetime.fromisoformat, default=None, help="Runs before, ISO date/time"
+    )
+    source.add_argument(
+        "--archive", type=Path, default=None, help="Archive file or directory of *.jsonl[.gz] files"
+    )
+    parser.add_argument(
+        "--archive-out",
+        type=Path,
+        default=None,
+        help="Write the runs' payloads to this directory instead of replaying them",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=REPLAY_BATCH_SIZE, help="Keywords written per commit"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Parse and match tracked sites only, write nothing"
+    )
+    return parser
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+    from_runs = bool(args.run_id or args.since or args.until)
+    if from_runs == (args.archive is not None):
+        parser.error("give either --run-id/--since/--until or --archive")
+    if args.archive_out and not from_runs:
+        parser.error("--archive-out writes the payloads of runs, not of an archive")
+
+    started = time.perf_counter()
+    keywords = results = 0
+    # Payloads are read from the replica, results written to the primary
+    with get_read_session("cli") as read_session, get_session("cli") as session:
+        if from_runs:
+            run_ids = source_run_ids(read_session, args.run_id, args.since, args.until)
+            payloads = run_payloads(read_session, run_ids, EXPORT_BATCH_SIZE)
+        else:
+            payloads = archive_payloads(args.archive)
+
+        if args.archive_out:
+            for path, count in write_archive(payloads, args.archive_out).items():
+                keywords += count
+                print(f"{path}: {count} keywords")
+        else:
+            for result in replay(session, payloads, REPLAY_KIND, args.batch_size, args.dry_run):
+                keywords += result.keywords
+                results += result.results
+                target = "dry run" if result.run_id is None else f"run {result.run_id}"
+                print(
+                    f"{result.source} -> {target}: {result.keywords} keywords, "
+                    f"{result.results} results, {result.hits} tracked hits"
+                )
+
+    elapsed = time.perf_counter() - started
+    totals = f"{keywords} keywords" if args.archive_out else f"{keywords} keywords, {results} results"
+    print(f"{totals} in {elapsed:.1f}s ({keywords / elapsed if elapsed else 0:.0f} keywords/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,171 @@
-"""Quick one-off Serper query."""
+"""Serper queries from the command line: one, or a batch as JSON Lines."""
 
 from __future__ import annotations
 
 import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import json
+import sys
+import time
+from typing import Any, Iterable, Iterator, TextIO
 
+from serp_monitor.config.loaders import normalize_keyword
 from serp_monitor.config.settings import get_settings
+from serp_monitor.db.session import get_session
 from serp_monitor.providers.serper import SerperClient
+from serp_monitor.services.replay import StoredPayload, replay
+
+QUERY_KIND = "query"
+
+# A query with its payload, or with the error it failed with
+Outcome = tuple[dict[str, Any], dict[str, Any] | None, Exception | None]
 
 
 def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(description="Run one Serper query and print JSON")
-    parser.add_argument("--q", required=True, help="Search query")
-    parser.add_argument("--region", default=None, help="Region code, e.g. IN or US")
+    parser = argparse.ArgumentParser(description="Run Serper queries and print JSON")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--q", help="Search query")
+    source.add_argument(
+        "--file",
+        help="Batch of queries, '-' for stdin: one per line, plain text or a JSON object "
+        "with keyword, region and language",
+    )
+    parser.add_argument("--region", default=None, help="Region code, e.g. IN or US (batch: default)")
+    parser.add_argument("--language", default=None, help="Language code, e.g. en (batch: default)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Batch: queries in flight")
+    parser.add_argument(
+        "--rps", type=float, default=None, help="Batch: at most this many requests per second"
+    )
+    parser.add_argument(
+        "--persist", action="store_true", help="Batch: also store the results as a run of kind 'query'"
+    )
     return parser
 
 
+def read_queries(
+    handle: TextIO, region: str | None, language: str | None, require_region: bool = False
+) -> Iterator[dict[str, Any]]:
+    """Queries of a batch, read line by line; region and language default to the given ones.
+
+    With ``require_region`` a line left without a region is an error, raised
+    before it is searched.
+    """
+    for number, line in enumerate(handle, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            query = {"keyword": line, "region": region, "language": language, "proxy_profile": None}
+        else:
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"line {number}: {exc}") from exc
+            keyword = str(item.get("keyword") or item.get("q") or "").strip()
+            if not keyword:
+                raise ValueError(f"line {number}: no keyword")
+            query = {
+                "keyword": keyword,
+                "region": item.get("region") or region,
+                "language": item.get("language") or language,
+                "proxy_profile": item.get("proxy_profile"),
+            }
+        if require_region and not str(query["region"] or "").strip():
+            raise ValueError(f"line {number}: no region, give one per line or --region")
+        yield query
+
+
+def fetch_queries(
+    client: SerperClient, queries: Iterable[dict[str, Any]], concurrency: int
+) -> Iterator[Outcome]:
+    """Search ``queries`` on ``concurrency`` threads; yields (query, payload, error) as each completes.
+
+    At most twice ``concurrency`` queries are submitted ahead, so a large
+    batch or a pipe is read as the searches progress.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending: dict[Future, dict[str, Any]] = {}
+
+        def _completed(done: set[Future]) -> Iterator[Outcome]:
+            for future in done:
+                query = pending.pop(future)
+                error = future.exception()
+                yield query, None if error else future.result(), error
+
+        for query in queries:
+            future = pool.submit(
+                client.search, query["keyword"], region=query["region"], language=query["language"]
+            )
+            pending[future] = query
+            if len(pending) >= 2 * concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from _completed(done)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from _completed(done)
+
+
+def _run_batch(args: argparse.Namespace, client: SerperClient) -> int:
+    handle = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    started = time.perf_counter()
+    done = failed = 0
+
+    def _results() -> Iterator[StoredPayload]:
+        nonlocal done, failed
+        queries = read_queries(handle, args.region, args.language, require_region=args.persist)
+        for query, payload, error in fetch_queries(client, queries, args.concurrency):
+            if error is not None:
+                failed += 1
+                message = str(error).splitlines()[0] if str(error) else type(error).__name__
+                print(f"{query['keyword']} ({query['region'] or '-'}): {message}", file=sys.stderr)
+                continue
+            done += 1
+            # Same records as a serp-replay archive
+            print(json.dumps({**query, "payload": payload}, ensure_ascii=False), flush=True)
+            if args.persist:
+                # read_queries made sure there is a region
+                keyword = normalize_keyword(query)
+                yield StoredPayload(source=QUERY_KIND, keyword=keyword, payload=payload)
+
+    try:
+        if args.persist:
+            with get_session("cli") as session:
+                for result in replay(session, _results(), kind=QUERY_KIND):
+                    print(f"Stored {result.keywords} queries in run {result.run_id}", file=sys.stderr)
+        else:
+            for _ in _results():
+                pass
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"{done} queries, {failed} failed in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f}/s)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
-
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.file is None and (args.persist or args.rps):
+        parser.error("--persist and --rps are for --file batches")
     settings = get_settings()
-    client = SerperClient(settings)
-    payload = client.search(args.q, region=args.region)
+    if args.file is not None:
+        try:
+            with SerperClient(settings, max_connections=args.concurrency, rate_limit=args.rps) as client:
+                status = _run_batch(args, client)
+        except ValueError as exc:
+            # A malformed line of the batch
+            sys.exit(f"{parser.prog}: {exc}")
+        sys.exit(status)
+
+    with SerperClient(settings) as client:
+        payload = client.search(args.q, region=args.region, language=args.language)
     print(json.dumps(payload, ensure_ascii=False, indent=2))
 
 
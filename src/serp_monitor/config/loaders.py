@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import pickle
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import yaml
 
+# libyaml's C parser when PyYAML was built with it, several times faster
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Bump when normalize_keyword changes, so cached keyword lists are rebuilt
+KEYWORDS_CACHE_VERSION = 1
+
 
 def load_config(path: str | Path) -> dict[str, Any]:
     path = Path(path)
@@ -13,7 +22,7 @@ def load_config(path: str | Path) -> dict[str, Any]:
         raise FileNotFoundError(str(path))
     if path.suffix.lower() in {".yaml", ".yml"}:
         with path.open("r", encoding="utf-8") as handle:
-            data = yaml.safe_load(handle) or {}
+            data = yaml.load(handle, Loader=_YAML_LOADER) or {}
     elif path.suffix.lower() == ".json":
         with path.open("r", encoding="utf-8") as handle:
             data = json.load(handle) or {}
@@ -22,3 +31,119 @@ def load_config(path: str | Path) -> dict[str, Any]:
     if not isinstance(data, dict):
         raise ValueError("Config root must be an object")
     return data
+
+
+def iter_keyword_entries(path: str | Path) -> Iterator[Any]:
+    """Raw keyword entries of a config file.
+
+    ``.jsonl`` files hold one keyword object per line and are read line by
+    line; YAML and JSON files are parsed whole and their ``keywords`` list
+    is returned.
+    """
+    path = Path(path)
+    if path.suffix.lower() != ".jsonl":
+        items = load_config(path).get("keywords") or []
+        if not isinstance(items, list):
+            raise ValueError("keywords must be a list")
+        yield from items
+        return
+    with path.open("r", encoding="utf-8") as handle:
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{number}: {exc}") from exc
+
+
+def normalize_keyword(item: Any) -> dict[str, Any] | None:
+    """Keyword row fields of a config entry, or None to skip it."""
+    if not isinstance(item, dict):
+        return None
+    keyword = str(item.get("keyword") or "").strip()
+    region = str(item.get("region") or "").strip()
+    if not keyword or not region:
+        return None
+    language = str(item.get("language") or "EN").strip()
+    return {
+        "keyword": keyword,
+        "region": region,
+        "language": language,
+        "proxy_profile": (item.get("proxy_profile") or None),
+    }
+
+
+def load_keywords(path: str | Path, cache_dir: str | Path | None = None) -> list[dict[str, Any]]:
+    """Normalized keyword entries of a config file.
+
+    With ``cache_dir`` the result is pickled there, keyed by the file's
+    resolved path. It is reused while the file's mtime and size are unchanged,
+    or when its content hash still matches (the file was only touched).
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(str(path))
+    if cache_dir is None:
+        return _parse_keywords(path)
+
+    stat = path.stat()
+    cache_path = _keywords_cache_path(Path(cache_dir).expanduser(), path)
+    cached = _read_keywords_cache(cache_path)
+    if cached is not None and (cached["mtime_ns"], cached["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return cached["keywords"]
+
+    digest = _file_digest(path)
+    if cached is not None and cached["sha256"] == digest:
+        keywords = cached["keywords"]
+    else:
+        keywords = _parse_keywords(path)
+    _write_keywords_cache(
+        cache_path,
+        {
+            "version": KEYWORDS_CACHE_VERSION,
+            "path": str(path.resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "keywords": keywords,
+        },
+    )
+    return keywords
+
+
+def _parse_keywords(path: Path) -> list[dict[str, Any]]:
+    return [row for item in iter_keyword_entries(path) if (row := normalize_keyword(item)) is not None]
+
+
+def _file_digest(path: Path) -> str:
+    with path.open("rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
+
+
+def _keywords_cache_path(cache_dir: Path, path: Path) -> Path:
+    resolved = str(path.resolve())
+    return cache_dir / f"keywords-{hashlib.sha256(resolved.encode()).hexdigest()[:32]}.pickle"
+
+
+def _read_keywords_cache(cache_path: Path) -> dict[str, Any] | None:
+    try:
+        with cache_path.open("rb") as handle:
+            cached = pickle.load(handle)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != KEYWORDS_CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_keywords_cache(cache_path: Path, cached: dict[str, Any]) -> None:
+    # Best effort: an unwritable cache only costs the next run a parse
+    partial = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with partial.open("wb") as handle:
+            pickle.dump(cached, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, cache_path)
+    except OSError:
+        partial.unlink(missing_ok=True)
@@ -8,15 +8,40 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
     database_url: str | None = Field(default=None, alias="DATABASE_URL")
+    # Optional read-only replica for UI, export and analytics queries
+    database_read_url: str | None = Field(default=None, alias="DATABASE_READ_URL")
+    db_read_after_write_seconds: float = Field(default=30, alias="DB_READ_AFTER_WRITE_SECONDS")
+
+    db_pool_size: int = Field(default=5, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
+    db_pool_recycle: int = Field(default=1800, alias="DB_POOL_RECYCLE")
+    db_pool_timeout: int = Field(default=30, alias="DB_POOL_TIMEOUT")
+    db_statement_timeout_ms: int = Field(default=0, alias="DB_STATEMENT_TIMEOUT_MS")
+    db_pipeline: bool = Field(default=False, alias="DB_PIPELINE")
+    db_prepared_statements: bool = Field(default=True, alias="DB_PREPARED_STATEMENTS")
+    db_prepare_threshold: int = Field(default=5, alias="DB_PREPARE_THRESHOLD")
 
     http_timeout: int = Field(default=20, alias="HTTP_TIMEOUT")
     http_retries: int = Field(default=3, alias="HTTP_RETRIES")
 
-    serper_api_key: str = Field(alias="SERPER_API_KEY")
+    # Only needed by commands that call Serper; SerperClient checks for it
+    serper_api_key: str | None = Field(default=None, alias="SERPER_API_KEY")
     serper_base_url: str = Field(default="https://google.serper.dev", alias="SERPER_BASE_URL")
 
+    # Normalized keyword lists of configs, reused while a config is unchanged;
+    # empty disables the cache
+    config_cache_dir: str = Field(default="~/.cache/serp_monitor", alias="CONFIG_CACHE_DIR")
+
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     scheduler_tz: str = Field(default="Etc/GMT-1", alias="SCHEDULER_TZ")
+    # Background jobs submitted by the UI, executed by the scheduler process
+    job_workers: int = Field(default=2, alias="JOB_WORKERS")
+    job_poll_seconds: int = Field(default=5, alias="JOB_POLL_SECONDS")
+    job_stale_minutes: int = Field(default=30, alias="JOB_STALE_MINUTES")
+
+    # "changelog" stores a new page tag row only when the parsed state changes,
+    # "append" stores one row per check.
+    page_tag_storage: str = Field(default="changelog", alias="PAGE_TAG_STORAGE")
 
 
 _settings: Settings | None = None
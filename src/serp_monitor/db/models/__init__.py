@@ -1,30 +1,44 @@
+from serp_monitor.db.models.data_version import DataVersion
+from serp_monitor.db.models.export_checkpoint import ExportCheckpoint
+from serp_monitor.db.models.job import Job, JobStatus
 from serp_monitor.db.models.keyword import Keyword
 from serp_monitor.db.models.keyword_schedule import KeywordSchedule
 from serp_monitor.db.models.scheduler_status import SchedulerStatus
 from serp_monitor.db.models.page_tag import PageTag
+from serp_monitor.db.models.page_tag_check import PageTagCheck
 from serp_monitor.db.models.tracked_site import TrackedSite
 from serp_monitor.db.models.tracked_hit import TrackedHit
 from serp_monitor.db.models.canonical_site import CanonicalSite
 from serp_monitor.db.models.canonical_edge import CanonicalEdge
 from serp_monitor.db.models.canonical_favorite import CanonicalFavorite
 from serp_monitor.db.models.redirect_event import RedirectEvent
-from serp_monitor.db.models.run import Run, RunStatus
+from serp_monitor.db.models.run import REPLAY_KIND, Run, RunStatus
+from serp_monitor.db.models.run_keyword import RunKeyword
 from serp_monitor.db.models.serp_result import SerpResult
+from serp_monitor.db.models.site_status import SiteStatus
 from serp_monitor.db.models.watch_url import WatchUrl
 
 __all__ = [
+    "DataVersion",
+    "ExportCheckpoint",
+    "Job",
+    "JobStatus",
     "Keyword",
     "KeywordSchedule",
     "SchedulerStatus",
     "PageTag",
+    "PageTagCheck",
     "TrackedSite",
     "TrackedHit",
     "CanonicalSite",
     "CanonicalEdge",
     "CanonicalFavorite",
     "RedirectEvent",
+    "REPLAY_KIND",
     "Run",
     "RunStatus",
+    "RunKeyword",
     "SerpResult",
+    "SiteStatus",
     "WatchUrl",
 ]
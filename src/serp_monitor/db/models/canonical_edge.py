@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from serp_monitor.db.base import Base
@@ -10,6 +10,10 @@ from serp_monitor.db.base import Base
 
 class CanonicalEdge(Base):
     __tablename__ = "canonical_edges"
+    __table_args__ = (
+        Index("ix_canonical_edges_source_domain_observed_at", "source_domain", "observed_at"),
+        Index("ix_canonical_edges_canonical_domain_observed_at", "canonical_domain", "observed_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), index=True)
@@ -17,6 +21,9 @@ class CanonicalEdge(Base):
     canonical_url: Mapped[str | None] = mapped_column(String(1000))
     canonical_google: Mapped[str | None] = mapped_column(String(1000))
     canonical_bot: Mapped[str | None] = mapped_column(String(1000))
+    # extract_domain() of source_url / canonical_url, for exact per-domain lookups
+    source_domain: Mapped[str | None] = mapped_column(String(255))
+    canonical_domain: Mapped[str | None] = mapped_column(String(255))
     observed_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
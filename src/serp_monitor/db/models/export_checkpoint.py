@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from serp_monitor.db.base import Base
+
+
+class ExportCheckpoint(Base):
+    """Position of an incremental export consumer in one dataset."""
+
+    __tablename__ = "export_checkpoints"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    dataset: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # (time, id) of the last exported row, in the dataset's keyset order
+    last_time: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    last_id: Mapped[int | None] = mapped_column(BigInteger)
+    # Upper time bound of the increment being written, kept until it is done
+    pending_before: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    sequence: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    rows_exported: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
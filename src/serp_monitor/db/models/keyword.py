@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Integer, String
+from sqlalchemy import Integer, String, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from serp_monitor.db.base import Base
@@ -8,6 +8,17 @@ from serp_monitor.db.base import Base
 
 class Keyword(Base):
     __tablename__ = "keywords"
+    __table_args__ = (
+        # NULL language/proxy_profile values compare equal: one row per config entry
+        UniqueConstraint(
+            "keyword",
+            "region",
+            "language",
+            "proxy_profile",
+            name="uq_keywords_keyword_region_language_proxy_profile",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     keyword: Mapped[str] = mapped_column(String(300), index=True)
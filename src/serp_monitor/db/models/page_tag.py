@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -11,6 +11,11 @@ from serp_monitor.db.base import Base
 
 class PageTag(Base):
     __tablename__ = "page_tags"
+    __table_args__ = (
+        Index("ix_page_tags_watch_url_id_id", "watch_url_id", "id"),
+        Index("ix_page_tags_created_at_id", "created_at", "id"),
+        Index("ix_page_tags_last_confirmed_at_id", "last_confirmed_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), index=True)
@@ -21,6 +26,11 @@ class PageTag(Base):
 
     raw: Mapped[dict] = mapped_column(JSONB)
 
+    # Change-log storage: a row is one observed state, re-confirmed in place
+    state_hash: Mapped[str | None] = mapped_column(String(64))
+    confirm_count: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    last_confirmed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from serp_monitor.db.base import Base
+
+
+class PageTagCheck(Base):
+    __tablename__ = "page_tag_checks"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), index=True)
+    watch_url_id: Mapped[int] = mapped_column(ForeignKey("watch_urls.id"), index=True)
+    page_tag_id: Mapped[int] = mapped_column(ForeignKey("page_tags.id"), index=True)
+    checked_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import DateTime, Enum as SAEnum, Integer, String, func
+from sqlalchemy import DateTime, Enum as SAEnum, ForeignKey, Integer, String, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from serp_monitor.db.base import Base
@@ -16,8 +16,17 @@ class RunStatus(str, Enum):
     failed = "failed"
 
 
+# Runs that re-ingest stored payloads (serp-replay). They copy earlier
+# observations, so analytics, history and exports leave them out.
+REPLAY_KIND = "replay"
+
+
 class Run(Base):
     __tablename__ = "runs"
+    __table_args__ = (
+        UniqueConstraint("run_key", name="uq_runs_run_key"),
+        UniqueConstraint("parent_id", "shard_index", name="uq_runs_parent_id_shard_index"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     kind: Mapped[str] = mapped_column(String(32), index=True)
@@ -28,3 +37,12 @@ class Run(Base):
         DateTime(timezone=True), server_default=func.now()
     )
     error: Mapped[str | None] = mapped_column(String(500))
+    # Keywords the run was started with
+    keyword_total: Mapped[int | None] = mapped_column(Integer)
+
+    # Sharded runs: one parent per logical run, found by every node through
+    # run_key, and a child run per shard (shard_index of shard_count, from 1)
+    parent_id: Mapped[int | None] = mapped_column(ForeignKey("runs.id"))
+    run_key: Mapped[str | None] = mapped_column(String(64))
+    shard_index: Mapped[int | None] = mapped_column(Integer)
+    shard_count: Mapped[int | None] = mapped_column(Integer)
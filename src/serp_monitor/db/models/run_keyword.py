@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Enum as SAEnum, ForeignKey, Index, Integer, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from serp_monitor.db.base import Base
+from serp_monitor.db.models.run import RunStatus
+
+
+class RunKeyword(Base):
+    __tablename__ = "run_keywords"
+    __table_args__ = (
+        UniqueConstraint("run_id", "keyword_id", name="uq_run_keywords_run_id_keyword_id"),
+        Index("ix_run_keywords_keyword_id_run_id", "keyword_id", "run_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"))
+    keyword_id: Mapped[int] = mapped_column(ForeignKey("keywords.id"))
+    result_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # pending until fetched; success rows were committed with their results
+    status: Mapped[RunStatus] = mapped_column(SAEnum(RunStatus))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    error: Mapped[str | None] = mapped_column(String(500))
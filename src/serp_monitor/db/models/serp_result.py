@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -11,6 +11,12 @@ from serp_monitor.db.base import Base
 
 class SerpResult(Base):
     __tablename__ = "serp_results"
+    __table_args__ = (
+        Index("ix_serp_results_keyword_id_domain_run_id", "keyword_id", "domain", "run_id"),
+        Index("ix_serp_results_created_at_id", "created_at", "id"),
+        # Past results of a newly tracked domain (tracked-hit backfill)
+        Index("ix_serp_results_domain", "domain"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id"), index=True)
@@ -19,6 +25,8 @@ class SerpResult(Base):
     position: Mapped[int] = mapped_column(Integer, index=True)
     title: Mapped[str | None] = mapped_column(String(500))
     link: Mapped[str] = mapped_column(String(1000))
+    # extract_domain(link), stored so per-domain history can be filtered in SQL
+    domain: Mapped[str | None] = mapped_column(String(255))
     snippet: Mapped[str | None] = mapped_column(String(2000))
 
     raw: Mapped[dict] = mapped_column(JSONB)
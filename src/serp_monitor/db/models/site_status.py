@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from serp_monitor.db.base import Base
+
+
+class SiteStatus(Base):
+    __tablename__ = "site_status"
+
+    domain: Mapped[str] = mapped_column(String(255), primary_key=True)
+
+    top10_now: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    last_position: Mapped[int | None] = mapped_column(Integer)
+    last_seen_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+    canonical_changed: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    hreflang_changed: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    last_canonical: Mapped[str | None] = mapped_column(String(1000))
+    last_hreflang: Mapped[dict | None] = mapped_column(JSONB(none_as_null=True))
+
+    redirect_ever: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    redirect_now: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from serp_monitor.db.base import Base
@@ -10,6 +10,7 @@ from serp_monitor.db.base import Base
 
 class TrackedHit(Base):
     __tablename__ = "tracked_hits"
+    __table_args__ = (Index("ix_tracked_hits_detected_at_id", "detected_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     tracked_site_id: Mapped[int] = mapped_column(ForeignKey("tracked_sites.id"), index=True)
@@ -20,3 +21,5 @@ class TrackedHit(Base):
     detected_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
+    # Time of the result a backfilled hit was found in; NULL when the run found it
+    observed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
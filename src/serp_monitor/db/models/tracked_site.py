@@ -16,3 +16,5 @@ class TrackedSite(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
+    # Set once tracked_hits were created for results from before the site was tracked
+    hits_backfilled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
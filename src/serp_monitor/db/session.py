@@ -1,29 +1,199 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 import os
+import time
+from typing import Any, Iterator
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-_engine = None
-_session_factory = None
+from serp_monitor.config.settings import get_settings
 
+# Per-workload overrides on top of the DB_* settings.
+#   scheduler - long-lived process doing bulk writes from the periodic jobs
+#               and JOB_WORKERS background job workers
+#   ui        - Streamlit reruns from many concurrent browser sessions
+#   cli       - one-shot commands, a pool would only be torn down on exit
+ENGINE_PROFILES: dict[str, dict[str, Any]] = {
+    "default": {},
+    "scheduler": {
+        "pool_size": 2,
+        "max_overflow": 4,
+        "statement_timeout_ms": 0,
+        "expire_on_commit": False,
+    },
+    "ui": {
+        "pool_recycle": 300,
+        "expire_on_commit": False,
+    },
+    "cli": {
+        "poolclass": NullPool,
+        "statement_timeout_ms": 0,
+    },
+}
 
-def get_engine():
-    global _engine
-    if _engine is not None:
-        return _engine
+_engines: dict[str, Engine] = {}
+_session_factories: dict[str, sessionmaker] = {}
+_read_engines: dict[str, Engine] = {}
+_read_session_factories: dict[str, sessionmaker] = {}
+
+# monotonic time of the last commit that wrote something in this process
+_last_write_at: float | None = None
+
+
+def _profile_options(profile: str) -> dict[str, Any]:
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown engine profile: {profile}")
+    settings = get_settings()
+    options: dict[str, Any] = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout,
+        "statement_timeout_ms": settings.db_statement_timeout_ms,
+        "expire_on_commit": True,
+    }
+    options.update(ENGINE_PROFILES[profile])
+    return options
+
+
+def _connect_args(database_url: str, options: dict[str, Any]) -> dict[str, Any]:
+    connect_args: dict[str, Any] = {}
+    if options.get("statement_timeout_ms"):
+        connect_args["options"] = f"-c statement_timeout={int(options['statement_timeout_ms'])}"
+    if make_url(database_url).get_driver_name() == "psycopg":
+        settings = get_settings()
+        connect_args["prepare_threshold"] = (
+            settings.db_prepare_threshold if settings.db_prepared_statements else None
+        )
+    return connect_args
+
+
+def _create_engine(database_url: str, profile: str) -> Engine:
+    options = _profile_options(profile)
+    kwargs: dict[str, Any] = {
+        "pool_pre_ping": True,
+        "connect_args": _connect_args(database_url, options),
+    }
+    if options.get("poolclass") is NullPool:
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            pool_size=options["pool_size"],
+            max_overflow=options["max_overflow"],
+            pool_recycle=options["pool_recycle"],
+            pool_timeout=options["pool_timeout"],
+        )
+    return create_engine(database_url, **kwargs)
+
+
+def get_engine(profile: str = "default") -> Engine:
+    engine = _engines.get(profile)
+    if engine is not None:
+        return engine
     database_url = os.getenv("DATABASE_URL")
     if not database_url:
         raise RuntimeError("DATABASE_URL is not set")
-    _engine = create_engine(database_url, pool_pre_ping=True)
-    return _engine
+    engine = _create_engine(database_url, profile)
+    _engines[profile] = engine
+    return engine
+
+
+def get_read_engine(profile: str = "default") -> Engine:
+    """Engine for the read replica, or the primary when DATABASE_READ_URL is unset."""
+    read_url = os.getenv("DATABASE_READ_URL")
+    if not read_url:
+        return get_engine(profile)
+    engine = _read_engines.get(profile)
+    if engine is None:
+        engine = _create_engine(read_url, profile)
+        _read_engines[profile] = engine
+    return engine
+
+
+def get_session(profile: str = "default") -> Session:
+    factory = _session_factories.get(profile)
+    if factory is None:
+        factory = sessionmaker(
+            autoflush=False,
+            autocommit=False,
+            bind=get_engine(profile),
+            expire_on_commit=_profile_options(profile)["expire_on_commit"],
+        )
+        _session_factories[profile] = factory
+    return factory()
+
+
+def recently_written(window_seconds: float | None = None) -> bool:
+    if _last_write_at is None:
+        return False
+    if window_seconds is None:
+        window_seconds = get_settings().db_read_after_write_seconds
+    return time.monotonic() - _last_write_at < window_seconds
+
 
+def get_read_session(profile: str = "default") -> Session:
+    """Session for read-only queries, served by the replica when one is configured.
 
-def get_session():
-    global _session_factory
-    if _session_factory is None:
-        _session_factory = sessionmaker(
-            autoflush=False, autocommit=False, bind=get_engine()
+    Falls back to the primary for DB_READ_AFTER_WRITE_SECONDS after a commit
+    that wrote something in this process (e.g. a manual "Fetch Top 10" in the
+    UI), so the user does not see the replica lagging behind their own write.
+    Writes from other processes (the scheduler) may show up with replica lag.
+    """
+    if not os.getenv("DATABASE_READ_URL") or recently_written():
+        return get_session(profile)
+    factory = _read_session_factories.get(profile)
+    if factory is None:
+        factory = sessionmaker(
+            autoflush=False,
+            autocommit=False,
+            bind=get_read_engine(profile),
+            expire_on_commit=_profile_options(profile)["expire_on_commit"],
         )
-    return _session_factory()
+        _read_session_factories[profile] = factory
+    return factory()
+
+
+@event.listens_for(Session, "after_flush")
+def _flagged_flush(session: Session, flush_context: Any) -> None:  # noqa: ARG001
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flagged_execute(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session: Session) -> None:
+    global _last_write_at
+    if session.info.pop("wrote", False):
+        _last_write_at = time.monotonic()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+@contextmanager
+def pipeline(session: Session) -> Iterator[None]:
+    """Send the statements issued inside the block in one psycopg pipeline.
+
+    Only for write statements whose results are not read (no SELECT, no
+    RETURNING): results are not available until the block exits. No-op unless
+    DB_PIPELINE is enabled and the driver is psycopg 3.
+    """
+    if not get_settings().db_pipeline:
+        yield
+        return
+    driver_connection = session.connection().connection.driver_connection
+    if not hasattr(driver_connection, "pipeline"):
+        yield
+        return
+    with driver_connection.pipeline():
+        yield
@@ -6,13 +6,43 @@ import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from serp_monitor.config.settings import Settings
+from serp_monitor.utils.rate_limit import RateLimiter
 
 
 class SerperClient:
-    def __init__(self, settings: Settings) -> None:
+    """Serper search API client.
+
+    Requests share one pooled HTTP client, so connections are kept alive
+    between searches; the client is thread-safe. ``max_connections`` caps
+    the pool (httpx defaults otherwise) and ``rate_limit`` spaces requests,
+    retries included, to at most that many per second. Use it as a context
+    manager, or ``close()`` it, to release the pooled connections.
+    """
+
+    def __init__(
+        self, settings: Settings, max_connections: int | None = None, rate_limit: float | None = None
+    ) -> None:
+        if not settings.serper_api_key:
+            raise RuntimeError("SERPER_API_KEY is not set")
         self._settings = settings
+        limits = (
+            httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            if max_connections
+            else httpx.Limits(max_connections=100, max_keepalive_connections=20)
+        )
+        self._http = httpx.Client(timeout=httpx.Timeout(settings.http_timeout), limits=limits)
+        self._limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def close(self) -> None:
+        self._http.close()
+
+    def __enter__(self) -> SerperClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8), reraise=True)
     def search(self, query: str, region: str | None = None, language: str | None = None) -> dict[str, Any]:
         url = f"{self._settings.serper_base_url.rstrip('/')}/search"
         payload: dict[str, Any] = {"q": query}
@@ -24,8 +54,8 @@ class SerperClient:
             "X-API-KEY": self._settings.serper_api_key,
             "Content-Type": "application/json",
         }
-        timeout = httpx.Timeout(self._settings.http_timeout)
-        with httpx.Client(timeout=timeout) as client:
-            response = client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+        if self._limiter is not None:
+            self._limiter.wait()
+        response = self._http.post(url, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
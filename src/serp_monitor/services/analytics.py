@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Row, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import REPLAY_KIND, Run, RunKeyword, RunStatus, SerpResult, TrackedHit, TrackedSite
+
+BUCKETS = ("hour", "day", "week", "month")
+
+# Consecutive runs in/out of the top 10 that confirm a drop or a return
+DEFAULT_STREAK = 3
+
+_PAIR_KEYS = ["keyword_id", "domain"]
+_FRAME_COLUMNS = ["keyword_id", "domain", "run_id", "run_at", "position", "url"]
+
+
+def ranking_series(
+    session: Session,
+    keyword_id: int,
+    domain: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    bucket: str | None = None,
+) -> list[Row]:
+    """Best position of ``domain`` per run of ``keyword_id``, oldest first.
+
+    Every run of the keyword is returned; ``position`` and ``url`` are None
+    when the domain was not in the results. Rows have ``run_id``, ``run_at``,
+    ``position``, ``url`` and ``runs`` (runs folded into the row). With
+    ``bucket`` (hour/day/week/month) runs are downsampled to the best
+    position per period and ``run_id`` is the last run of the period.
+    """
+    if bucket is not None and bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+
+    best = (
+        select(SerpResult.run_id, SerpResult.position, SerpResult.link)
+        .where(SerpResult.keyword_id == keyword_id, SerpResult.domain == domain)
+        .distinct(SerpResult.run_id)
+        .order_by(SerpResult.run_id, SerpResult.position)
+        .subquery("best")
+    )
+    series = (
+        select(
+            Run.id.label("run_id"),
+            Run.created_at.label("run_at"),
+            best.c.position,
+            best.c.link.label("url"),
+        )
+        .join(RunKeyword, RunKeyword.run_id == Run.id)
+        .outerjoin(best, best.c.run_id == Run.id)
+        .where(
+            RunKeyword.keyword_id == keyword_id,
+            RunKeyword.status == RunStatus.success,
+            Run.kind != REPLAY_KIND,
+        )
+    )
+    if since is not None:
+        series = series.where(Run.created_at >= since)
+    if until is not None:
+        series = series.where(Run.created_at < until)
+
+    if bucket is None:
+        stmt = series.add_columns(literal(1).label("runs")).order_by(Run.created_at, Run.id)
+        return list(session.execute(stmt).all())
+
+    runs = series.subquery("runs")
+    period = func.date_trunc(bucket, runs.c.run_at)
+    stmt = (
+        select(
+            func.max(runs.c.run_id).label("run_id"),
+            period.label("run_at"),
+            func.min(runs.c.position).label("position"),
+            func.array_agg(aggregate_order_by(runs.c.url, runs.c.position.asc().nulls_last()))[1].label(
+                "url"
+            ),
+            func.count().label("runs"),
+        )
+        .group_by(period)
+        .order_by(period)
+    )
+    return list(session.execute(stmt).all())
+
+
+def tracked_pairs(session: Session) -> list[tuple[int, str]]:
+    """(keyword_id, domain) of every tracked site that was ever hit for a keyword."""
+    rows = session.execute(
+        select(TrackedHit.keyword_id, TrackedSite.domain)
+        .join(TrackedSite, TrackedSite.id == TrackedHit.tracked_site_id)
+        .join(Run, Run.id == TrackedHit.run_id)
+        .where(Run.kind != REPLAY_KIND)
+        .distinct()
+        .order_by(TrackedHit.keyword_id, TrackedSite.domain)
+    ).all()
+    return [(keyword_id, domain) for keyword_id, domain in rows]
+
+
+def load_positions(
+    session: Session,
+    pairs: Iterable[tuple[int, str]] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> pd.DataFrame:
+    """Position series for many (keyword_id, domain) pairs in one frame.
+
+    One row per pair and run of the keyword, ordered by pair and run time;
+    ``position`` is NaN and ``url`` None when the domain was not in the top 10.
+    Two queries regardless of the number of pairs: the runs of the keywords
+    and the best result per keyword, domain and run.
+    """
+    pairs_df = pd.DataFrame(
+        list(tracked_pairs(session) if pairs is None else pairs), columns=_PAIR_KEYS
+    ).drop_duplicates()
+    if pairs_df.empty:
+        return pd.DataFrame(columns=_FRAME_COLUMNS)
+    keyword_ids = [int(k) for k in pairs_df["keyword_id"].unique()]
+    domains = list(pairs_df["domain"].unique())
+
+    runs_stmt = (
+        select(RunKeyword.keyword_id, Run.id.label("run_id"), Run.created_at.label("run_at"))
+        .join(Run, Run.id == RunKeyword.run_id)
+        .where(
+            RunKeyword.keyword_id.in_(keyword_ids),
+            RunKeyword.status == RunStatus.success,
+            Run.kind != REPLAY_KIND,
+        )
+    )
+    best_stmt = (
+        select(
+            SerpResult.keyword_id,
+            SerpResult.domain,
+            SerpResult.run_id,
+            SerpResult.position,
+            SerpResult.link.label("url"),
+        )
+        .where(SerpResult.keyword_id.in_(keyword_ids), SerpResult.domain.in_(domains))
+        .distinct(SerpResult.keyword_id, SerpResult.domain, SerpResult.run_id)
+        .order_by(SerpResult.keyword_id, SerpResult.domain, SerpResult.run_id, SerpResult.position)
+    )
+    if since is not None or until is not None:
+        run_ids = select(Run.id)
+        if since is not None:
+            runs_stmt = runs_stmt.where(Run.created_at >= since)
+            run_ids = run_ids.where(Run.created_at >= since)
+        if until is not None:
+            runs_stmt = runs_stmt.where(Run.created_at < until)
+            run_ids = run_ids.where(Run.created_at < until)
+        best_stmt = best_stmt.where(SerpResult.run_id.in_(run_ids))
+
+    runs = pd.DataFrame(session.execute(runs_stmt).all(), columns=["keyword_id", "run_id", "run_at"])
+    best = pd.DataFrame(
+        session.execute(best_stmt).all(), columns=["keyword_id", "domain", "run_id", "position", "url"]
+    )
+    frame = runs.merge(pairs_df, on="keyword_id").merge(
+        best, on=["keyword_id", "domain", "run_id"], how="left"
+    )
+    frame["position"] = frame["position"].astype(float)
+    frame["url"] = frame["url"].astype(object).where(frame["url"].notna(), None)
+    return frame.sort_values(_PAIR_KEYS + ["run_at", "run_id"], ignore_index=True)[_FRAME_COLUMNS]
+
+
+def _with_streaks(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.sort_values(_PAIR_KEYS + ["run_at", "run_id"], ignore_index=True)
+    found = frame["position"].notna().to_numpy()
+    pair_start = np.ones(len(frame), dtype=bool)
+    if len(frame):
+        keys = frame[_PAIR_KEYS].to_numpy()
+        pair_start[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    # A new streak starts at every pair boundary or change between found / missing
+    streak_start = pair_start.copy()
+    streak_start[1:] |= found[1:] != found[:-1]
+    streak_id = np.cumsum(streak_start)
+    frame = frame.assign(
+        found=found,
+        pair_id=np.cumsum(pair_start),
+        streak_id=streak_id,
+        streak_len=pd.Series(streak_id).groupby(streak_id).cumcount().to_numpy() + 1,
+    )
+    return frame
+
+
+def rank_events(frame: pd.DataFrame, streak: int = DEFAULT_STREAK) -> pd.DataFrame:
+    """First-seen, dropped and back events for every pair of a positions frame.
+
+    A drop is confirmed on the ``streak``-th consecutive run outside the top
+    10, a return on the ``streak``-th consecutive run inside it after a drop;
+    repeated confirmations of the same state are collapsed.
+    """
+    columns = _PAIR_KEYS + ["run_id", "run_at", "event", "url"]
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    frame = _with_streaks(frame)
+
+    first_seen = frame[frame["found"]].drop_duplicates("pair_id").assign(event="first_seen")
+
+    candidates = frame[frame["streak_len"] == streak].assign(
+        event=np.where(frame.loc[frame["streak_len"] == streak, "found"], "back", "dropped")
+    )
+    # A return only counts after a drop: skip "back" candidates before the first drop
+    is_drop = (candidates["event"] == "dropped").astype(int)
+    candidates = candidates[is_drop.groupby(candidates["pair_id"]).cummax().astype(bool)]
+    # Drop / back alternate: keep a candidate only if the state actually flips
+    previous = candidates.groupby("pair_id")["event"].shift()
+    transitions = candidates[candidates["event"] != previous]
+
+    events = pd.concat([first_seen, transitions])
+    events = events.sort_values(["pair_id", "run_at", "run_id"], kind="stable", ignore_index=True)
+    return events[columns]
+
+
+def rank_summary(frame: pd.DataFrame, streak: int = DEFAULT_STREAK) -> pd.DataFrame:
+    """Per-pair streaks, volatility and time in the top 10 of a positions frame.
+
+    ``volatility`` is the mean absolute position change between consecutive
+    runs that both ranked; ``top10_hours`` sums the time from each ranking run
+    to the next run of the keyword.
+    """
+    columns = _PAIR_KEYS + [
+        "runs",
+        "top10_runs",
+        "top10_share",
+        "top10_hours",
+        "best_position",
+        "avg_position",
+        "last_position",
+        "volatility",
+        "longest_top10_streak",
+        "current_streak",
+        "current_state",
+        "first_seen",
+        "last_drop",
+        "last_back",
+        "drops",
+        "backs",
+    ]
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    frame = _with_streaks(frame)
+    groups = frame.groupby("pair_id", sort=True)
+
+    next_run_at = groups["run_at"].shift(-1)
+    held = (next_run_at - frame["run_at"]).dt.total_seconds().where(frame["found"], 0.0).fillna(0.0)
+    step = groups["position"].diff().abs()
+
+    summary = pd.DataFrame(
+        {
+            "keyword_id": groups["keyword_id"].first(),
+            "domain": groups["domain"].first(),
+            "runs": groups.size(),
+            "top10_runs": groups["found"].sum(),
+            "top10_hours": held.groupby(frame["pair_id"]).sum() / 3600.0,
+            "best_position": groups["position"].min(),
+            "avg_position": groups["position"].mean(),
+            "last_position": groups["position"].last().where(groups["found"].last()),
+            "volatility": step.groupby(frame["pair_id"]).mean(),
+            "longest_top10_streak": frame["streak_len"]
+            .where(frame["found"], 0)
+            .groupby(frame["pair_id"])
+            .max(),
+            "current_streak": groups["streak_len"].last(),
+            "current_state": np.where(groups["found"].last(), "in_top10", "out"),
+        }
+    )
+    summary["top10_share"] = summary["top10_runs"] / summary["runs"]
+
+    events = rank_events(frame.drop(columns=["found", "pair_id", "streak_id", "streak_len"]), streak)
+    by_event = events.pivot_table(
+        index=_PAIR_KEYS, columns="event", values="run_at", aggfunc=["max", "count"]
+    )
+    summary = summary.merge(
+        pd.DataFrame(
+            {
+                "first_seen": _pivot_column(by_event, "max", "first_seen"),
+                "last_drop": _pivot_column(by_event, "max", "dropped"),
+                "last_back": _pivot_column(by_event, "max", "back"),
+                "drops": _pivot_column(by_event, "count", "dropped"),
+                "backs": _pivot_column(by_event, "count", "back"),
+            }
+        ).reset_index(),
+        on=_PAIR_KEYS,
+        how="left",
+    )
+    summary[["drops", "backs"]] = summary[["drops", "backs"]].fillna(0).astype(int)
+    return summary[columns].reset_index(drop=True)
+
+
+def _pivot_column(table: pd.DataFrame, agg: str, event: str) -> pd.Series:
+    if (agg, event) in table.columns:
+        return table[(agg, event)]
+    return pd.Series(np.nan if agg == "count" else pd.NaT, index=table.index)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import DataVersion
+
+# What a bump invalidates:
+#   serp   - runs, SERP results, tracked hits, site positions
+#   tags   - page tag checks, redirects, canonical edges, sites added by redirects
+#   config - keywords, schedules, tracked sites, canonical favorites (UI edits, keyword sync)
+SERP = "serp"
+TAGS = "tags"
+CONFIG = "config"
+SCOPES = (SERP, TAGS, CONFIG)
+
+
+def bump_data_versions(session: Session, *scopes: str) -> None:
+    """Increment the version of ``scopes`` in the caller's transaction.
+
+    Write-only (no RETURNING), so it can go into a pipeline with the writes it
+    announces; readers see the new version together with the data on commit.
+    """
+    unknown = set(scopes) - set(SCOPES)
+    if unknown:
+        raise ValueError(f"Unknown data version scope: {', '.join(sorted(unknown))}")
+    if not scopes:
+        return
+    stmt = pg_insert(DataVersion).inline()
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DataVersion.scope],
+            set_={"version": DataVersion.version + 1, "updated_at": func.now()},
+        ),
+        [{"scope": scope, "version": 1} for scope in sorted(set(scopes))],
+    )
+
+
+def load_data_versions(session: Session) -> dict[str, int]:
+    versions = dict.fromkeys(SCOPES, 0)
+    versions.update(session.execute(select(DataVersion.scope, DataVersion.version)).tuples().all())
+    return versions
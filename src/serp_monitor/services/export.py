@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Sequence
+
+from sqlalchemy import Date, Row, Select, Text, cast, desc, func, or_, select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute, Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from serp_monitor.db.models import (
+    REPLAY_KIND,
+    Keyword,
+    PageTag,
+    RedirectEvent,
+    Run,
+    SerpResult,
+    TrackedHit,
+    TrackedSite,
+    WatchUrl,
+)
+
+EXPORT_COLUMNS = [
+    "result_id",
+    "position",
+    "title",
+    "link",
+    "snippet",
+    "created_at",
+    "keyword",
+    "region",
+    "language",
+    "run_id",
+]
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 5000
+
+
+def latest_run_id(session: Session, kind: str = "hourly") -> int | None:
+    # Shard runs are exported through their parent
+    stmt = select(Run.id).where(Run.kind == kind, Run.parent_id.is_(None)).order_by(desc(Run.id)).limit(1)
+    return session.execute(stmt).scalar_one_or_none()
+
+
+def export_statement(
+    run_ids: Iterable[int] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    kind: str | None = None,
+    keywords: Iterable[str] | None = None,
+) -> Select:
+    """SERP results matching every given filter, in EXPORT_COLUMNS order.
+
+    Ordered by result id, i.e. by run, then keyword and position as they
+    were ingested: the primary key index returns rows in that order, so the
+    server streams them without sorting the whole selection first.
+    """
+    stmt = (
+        select(
+            SerpResult.id,
+            SerpResult.position,
+            SerpResult.title,
+            SerpResult.link,
+            SerpResult.snippet,
+            SerpResult.created_at,
+            Keyword.keyword,
+            Keyword.region,
+            Keyword.language,
+            SerpResult.run_id,
+        )
+        .join(Keyword, Keyword.id == SerpResult.keyword_id)
+        .order_by(SerpResult.id)
+    )
+    if run_ids:
+        run_ids = list(run_ids)
+        # A sharded run's results are stored under its shard runs
+        runs = select(Run.id).where(or_(Run.id.in_(run_ids), Run.parent_id.in_(run_ids)))
+        stmt = stmt.where(SerpResult.run_id.in_(runs))
+    if keywords:
+        stmt = stmt.where(Keyword.keyword.in_(list(keywords)))
+    # Replays copy earlier results; they are exported only when asked for by id or kind
+    skip_replays = not run_ids and kind is None
+    if since is not None or until is not None or kind is not None or skip_replays:
+        stmt = stmt.join(Run, Run.id == SerpResult.run_id)
+        if since is not None:
+            stmt = stmt.where(Run.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(Run.created_at < until)
+        if kind is not None:
+            stmt = stmt.where(Run.kind == kind)
+        if skip_replays:
+            stmt = stmt.where(Run.kind != REPLAY_KIND)
+    return stmt
+
+
+def stream_export_batches(
+    session: Session, stmt: Select, batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Sequence[Row]]:
+    """Rows of ``stmt`` in batches from a server-side cursor.
+
+    Only one batch is held in memory at a time. The session's transaction
+    stays open until the iterator is exhausted or closed.
+    """
+    result = session.execute(stmt, execution_options={"yield_per": batch_size})
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _utc_date(column: ColumnElement) -> ColumnElement:
+    return cast(func.timezone("UTC", column), Date).label("date")
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    """An export statement with the time column (set on insert or update) and id it is read in order of."""
+
+    build: Callable[[], Select]
+    time_column: InstrumentedAttribute
+    id_column: InstrumentedAttribute
+    # Name of the id in the selected columns; the time column keeps its own
+    id_label: str
+
+    def select(self, since: datetime | None = None, until: datetime | None = None) -> Select:
+        """Rows with the time column in [since, until), ordered by primary key for streaming."""
+        stmt = self.build()
+        if since is not None:
+            stmt = stmt.where(self.time_column >= since)
+        if until is not None:
+            stmt = stmt.where(self.time_column < until)
+        return stmt.order_by(self.id_column)
+
+    def select_after(self, after: tuple[datetime, int] | None, before: datetime) -> Select:
+        """Rows after the (time, id) keyset position ``after`` and with a time before ``before``.
+
+        Ordered by (time, id) so the last row read is the next position.
+        """
+        stmt = self.build().where(self.time_column < before)
+        if after is not None:
+            stmt = stmt.where(tuple_(self.time_column, self.id_column) > tuple_(*after))
+        return stmt.order_by(self.time_column, self.id_column)
+
+    def keyset(self, row: Row) -> tuple[datetime, int]:
+        mapping = row._mapping
+        return mapping[self.time_column.key], mapping[self.id_label]
+
+
+def _replay_run_ids() -> Select:
+    # Replays copy earlier results, which the datasets already hold
+    return select(Run.id).where(Run.kind == REPLAY_KIND)
+
+
+def _serp_results_dataset() -> Select:
+    return (
+        select(
+            SerpResult.id.label("result_id"),
+            SerpResult.run_id,
+            SerpResult.keyword_id,
+            Keyword.keyword,
+            Keyword.language,
+            SerpResult.position,
+            SerpResult.title,
+            SerpResult.link,
+            SerpResult.domain,
+            SerpResult.snippet,
+            SerpResult.created_at,
+            _utc_date(SerpResult.created_at),
+            Keyword.region,
+        )
+        .join(Keyword, Keyword.id == SerpResult.keyword_id)
+        .where(SerpResult.run_id.not_in(_replay_run_ids()))
+    )
+
+
+def _tracked_hits_dataset() -> Select:
+    return (
+        select(
+            TrackedHit.id.label("hit_id"),
+            TrackedHit.run_id,
+            TrackedHit.tracked_site_id,
+            TrackedSite.domain,
+            TrackedHit.keyword_id,
+            Keyword.keyword,
+            Keyword.language,
+            TrackedHit.position,
+            TrackedHit.url,
+            TrackedHit.detected_at,
+            TrackedHit.observed_at,
+            _utc_date(TrackedHit.detected_at),
+            Keyword.region,
+        )
+        .join(TrackedSite, TrackedSite.id == TrackedHit.tracked_site_id)
+        .join(Keyword, Keyword.id == TrackedHit.keyword_id)
+        .where(TrackedHit.run_id.not_in(_replay_run_ids()))
+    )
+
+
+def _page_tags_dataset() -> Select:
+    # canonical/hreflang per user agent flattened out of the raw JSON, hreflang as JSON text
+    google = PageTag.raw["googlebot"]
+    bot = PageTag.raw["bot"]
+    return (
+        select(
+            PageTag.id.label("page_tag_id"),
+            PageTag.run_id,
+            PageTag.watch_url_id,
+            WatchUrl.url,
+            PageTag.canonical,
+            cast(PageTag.hreflang, Text).label("hreflang"),
+            google["canonical"].astext.label("google_canonical"),
+            cast(google["hreflang"], Text).label("google_hreflang"),
+            google["status"].astext.label("google_status"),
+            bot["canonical"].astext.label("bot_canonical"),
+            cast(bot["hreflang"], Text).label("bot_hreflang"),
+            bot["status"].astext.label("bot_status"),
+            PageTag.confirm_count,
+            PageTag.created_at,
+            PageTag.last_confirmed_at,
+            _utc_date(PageTag.last_confirmed_at),
+            WatchUrl.region,
+        )
+        .join(WatchUrl, WatchUrl.id == PageTag.watch_url_id)
+    )
+
+
+def _redirect_events_dataset() -> Select:
+    return (
+        select(
+            RedirectEvent.id.label("redirect_event_id"),
+            RedirectEvent.run_id,
+            RedirectEvent.source_url,
+            RedirectEvent.final_url,
+            RedirectEvent.source_domain,
+            RedirectEvent.final_domain,
+            RedirectEvent.chain,
+            RedirectEvent.observed_at,
+            _utc_date(RedirectEvent.observed_at),
+            WatchUrl.region,
+        )
+        .outerjoin(WatchUrl, WatchUrl.url == RedirectEvent.source_url)
+    )
+
+
+# Columnar export datasets; every statement ends with the "date" (UTC) and
+# "region" partition columns.
+EXPORT_DATASETS: dict[str, ExportDataset] = {
+    "serp_results": ExportDataset(_serp_results_dataset, SerpResult.created_at, SerpResult.id, "result_id"),
+    "tracked_hits": ExportDataset(_tracked_hits_dataset, TrackedHit.detected_at, TrackedHit.id, "hit_id"),
+    # Confirmations update a row in place: keyed on them, a re-confirmed state is exported again
+    "page_tags": ExportDataset(_page_tags_dataset, PageTag.last_confirmed_at, PageTag.id, "page_tag_id"),
+    "redirect_events": ExportDataset(
+        _redirect_events_dataset, RedirectEvent.observed_at, RedirectEvent.id, "redirect_event_id"
+    ),
+}
+
+# export-csv rows (EXPORT_COLUMNS) for incremental CSV export
+CSV_DATASET = ExportDataset(
+    lambda: export_statement().order_by(None), SerpResult.created_at, SerpResult.id, "id"
+)
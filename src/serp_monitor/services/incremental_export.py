@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import csv
+from datetime import datetime
+from itertools import chain
+import os
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+
+from sqlalchemy import Row, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import ExportCheckpoint
+from serp_monitor.services.export import EXPORT_BATCH_SIZE, ExportDataset, stream_export_batches
+
+# Timestamps default to now(), the start of the inserting transaction, so a
+# transaction still open may commit rows older than everything exported so
+# far. Only rows older than every open transaction are "settled" and safe to
+# move the checkpoint past. Needs to see other sessions' xact_start: run as
+# the role that writes the data or one with pg_read_all_stats.
+_SETTLED_BEFORE = text(
+    """
+    SELECT least(now(), min(xact_start))
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+      AND backend_type = 'client backend'
+      AND pid <> pg_backend_pid()
+      AND xact_start IS NOT NULL
+    """
+)
+
+# Writes one increment file from row batches and returns the rows written
+Writer = Callable[[int, Iterator[Sequence[Row]]], int]
+
+
+def settled_before(session: Session) -> datetime:
+    return session.execute(_SETTLED_BEFORE).scalar_one()
+
+
+def lock_checkpoint(session: Session, name: str, dataset: str) -> ExportCheckpoint:
+    """Load (creating on first use) and lock a consumer's checkpoint.
+
+    The row lock is held until commit, so two exports under the same name
+    run one after the other instead of writing the same increment twice.
+    """
+    session.execute(
+        pg_insert(ExportCheckpoint)
+        .values(name=name, dataset=dataset)
+        .on_conflict_do_nothing(index_elements=[ExportCheckpoint.name, ExportCheckpoint.dataset])
+    )
+    return session.execute(
+        select(ExportCheckpoint)
+        .where(ExportCheckpoint.name == name, ExportCheckpoint.dataset == dataset)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalar_one()
+
+
+def export_increment(
+    session: Session,
+    name: str,
+    dataset: str,
+    spec: ExportDataset,
+    write: Writer,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """Export rows added since the checkpoint ``name`` and advance it; returns the row count.
+
+    ``write`` gets the increment's sequence number and must leave either a
+    complete file or nothing: the checkpoint is advanced only after it
+    returns. The increment's upper bound is committed first, so an
+    interrupted export is repeated on the next call with the same sequence
+    number and the same rows, replacing any file it had already written.
+    """
+    checkpoint = lock_checkpoint(session, name, dataset)
+    while checkpoint.pending_before is None:
+        # Committed before the export query runs, so everything that
+        # committed earlier than this bound is visible to it
+        checkpoint.pending_before = settled_before(session)
+        session.commit()
+        checkpoint = lock_checkpoint(session, name, dataset)
+    before = checkpoint.pending_before
+    after = None
+    if checkpoint.last_time is not None and checkpoint.last_id is not None:
+        after = (checkpoint.last_time, checkpoint.last_id)
+
+    batches = stream_export_batches(session, spec.select_after(after, before), batch_size)
+    first = next(batches, None)
+    if first is None:
+        checkpoint.pending_before = None
+        session.commit()
+        return 0
+
+    last = spec.keyset(first[-1])
+
+    def _tracked() -> Iterator[Sequence[Row]]:
+        nonlocal last
+        for batch in chain([first], batches):
+            last = spec.keyset(batch[-1])
+            yield batch
+
+    written = write(checkpoint.sequence + 1, _tracked())
+    checkpoint.last_time, checkpoint.last_id = last
+    checkpoint.pending_before = None
+    checkpoint.sequence += 1
+    checkpoint.rows_exported += written
+    session.commit()
+    return written
+
+
+def csv_writer(out_dir: Path, dataset: str, header: Sequence[str]) -> Writer:
+    """Write each increment to ``out_dir/<dataset>-<sequence>.csv``, renamed into place when complete."""
+
+    def _write(sequence: int, batches: Iterator[Sequence[Row]]) -> int:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{dataset}-{sequence:08d}.csv"
+        partial = path.with_name(path.name + ".tmp")
+        written = 0
+        with open(partial, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(header)
+            for batch in batches:
+                writer.writerows(batch)
+                written += len(batch)
+        os.replace(partial, path)
+        return written
+
+    return _write
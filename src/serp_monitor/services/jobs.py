@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import threading
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from serp_monitor.config.settings import Settings, get_settings
+from serp_monitor.db.models import Job, JobStatus, Keyword, Run, RunKeyword, RunStatus, TrackedSite
+from serp_monitor.db.session import get_session
+from serp_monitor.providers.serper import SerperClient
+from serp_monitor.services.data_versions import SERP, bump_data_versions
+from serp_monitor.services.serp_service import SerpService
+from serp_monitor.services.tag_service import TagService
+from serp_monitor.services.tracked_hits import backfill_tracked_hits
+
+FETCH_TOP10 = "fetch_top10"
+CHECK_TAGS = "check_tags"
+CHECK_REDIRECTS = "check_redirects"
+BACKFILL_TRACKED_HITS = "backfill_tracked_hits"
+
+ACTIVE_STATUSES = (JobStatus.queued, JobStatus.running)
+
+
+def submit_job(session: Session, kind: str, params: dict[str, Any] | None = None) -> Job:
+    """Queue a job for the scheduler process; the caller commits."""
+    if kind not in _HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, status=JobStatus.queued, params=params or {})
+    session.add(job)
+    session.flush()
+    return job
+
+
+def claim_job(session: Session) -> Job | None:
+    """Mark the oldest queued job as running and return it.
+
+    SKIP LOCKED lets several workers (threads or scheduler processes) poll
+    the queue without waiting on or double-claiming each other's rows.
+    """
+    job = session.execute(
+        select(Job)
+        .where(Job.status == JobStatus.queued)
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+    if job is None:
+        session.rollback()
+        return None
+    job.status = JobStatus.running
+    job.started_at = datetime.now(timezone.utc)
+    session.commit()
+    return job
+
+
+@contextmanager
+def _heartbeat(job_id: int, interval: timedelta) -> Iterator[None]:
+    """Touch the job's updated_at every ``interval`` from a thread while the block runs.
+
+    Backfills and single-keyword fetches run long statements without
+    reporting progress, which ``fail_stale_jobs`` would take for a dead
+    worker. The row is skipped while the job's own session holds it locked.
+    """
+    stop = threading.Event()
+
+    def _beat() -> None:
+        while not stop.wait(interval.total_seconds()):
+            with get_session("scheduler") as session:
+                unlocked = select(Job.id).where(Job.id == job_id).with_for_update(skip_locked=True)
+                session.execute(
+                    update(Job)
+                    .where(Job.id.in_(unlocked), Job.status == JobStatus.running)
+                    .values(updated_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+
+    thread = threading.Thread(target=_beat, name=f"job-{job_id}-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(session: Session, job: Job, settings: Settings | None = None) -> None:
+    settings = settings or get_settings()
+    try:
+        with _heartbeat(job.id, timedelta(minutes=settings.job_stale_minutes) / 3):
+            result = _HANDLERS[job.kind](session, job, settings)
+    except Exception as exc:  # noqa: BLE001
+        session.rollback()
+        job.status = JobStatus.failed
+        job.error = str(exc)[:500]
+        job.finished_at = datetime.now(timezone.utc)
+        if job.run_id is not None:
+            run = session.get(Run, job.run_id)
+            if run is not None and run.status == RunStatus.running:
+                run.status = RunStatus.failed
+                run.error = job.error
+                run.finished_at = job.finished_at
+                bump_data_versions(session, SERP)
+        session.commit()
+        return
+    job.status = JobStatus.success
+    job.result = result
+    job.finished_at = datetime.now(timezone.utc)
+    if job.progress_total is not None:
+        job.progress_done = job.progress_total
+    session.commit()
+
+
+def fail_stale_jobs(session: Session, stale_after: timedelta) -> int:
+    """Fail running jobs without progress for ``stale_after`` (their worker died)."""
+    result = session.execute(
+        update(Job)
+        .where(Job.status == JobStatus.running, Job.updated_at < func.now() - stale_after)
+        .values(status=JobStatus.failed, error="No progress, worker stopped", finished_at=func.now())
+    )
+    session.commit()
+    return result.rowcount
+
+
+def run_pending_jobs(max_jobs: int | None = None) -> int:
+    """Execute queued jobs until the queue is empty; returns the number run."""
+    settings = get_settings()
+    with get_session("scheduler") as session:
+        fail_stale_jobs(session, timedelta(minutes=settings.job_stale_minutes))
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        with get_session("scheduler") as session:
+            job = claim_job(session)
+            if job is None:
+                break
+            run_job(session, job, settings)
+        done += 1
+    return done
+
+
+def recent_jobs(session: Session, limit: int = 50) -> list[Job]:
+    return list(session.execute(select(Job).order_by(Job.id.desc()).limit(limit)).scalars())
+
+
+def _fetch_top10(session: Session, job: Job, settings: Settings) -> dict[str, Any]:
+    keyword = session.get(Keyword, job.params["keyword_id"])
+    if keyword is None:
+        raise ValueError(f"Keyword {job.params['keyword_id']} not found")
+    with SerperClient(settings) as client:
+        run = SerpService(client).run_keywords(session, [keyword], kind="ui")
+    job.run_id = run.id
+    if run.status == RunStatus.failed:
+        # The keyword's own error rather than the run's failure count
+        error = session.execute(
+            select(RunKeyword.error).where(RunKeyword.run_id == run.id, RunKeyword.error.is_not(None))
+        ).scalar()
+        raise RuntimeError(error or run.error)
+    return {"run_id": run.id}
+
+
+def _check_tags(session: Session, job: Job, settings: Settings) -> dict[str, Any]:
+    params = job.params
+    return TagService(settings).check_url(
+        session,
+        params["run_id"],
+        params["url"],
+        region=params.get("region"),
+        language=params.get("language"),
+    )
+
+
+def _check_redirects(session: Session, job: Job, settings: Settings) -> dict[str, Any]:
+    domains = list(session.execute(select(TrackedSite.domain).order_by(TrackedSite.id.desc())).scalars())
+    run = Run(kind="redirects_manual", status=RunStatus.running, started_at=datetime.now(timezone.utc))
+    session.add(run)
+    session.flush()
+    job.run_id = run.id
+    job.progress_total = len(domains)
+    tag_service = TagService(settings)
+    for done, domain in enumerate(domains, start=1):
+        tag_service.check_url(session, run.id, f"https://{domain}", region=None, language=None)
+        # Committed together with the next check
+        job.progress_done = done
+    run.status = RunStatus.success
+    run.finished_at = datetime.now(timezone.utc)
+    bump_data_versions(session, SERP)
+    session.commit()
+    return {"run_id": run.id, "checked": len(domains)}
+
+
+def _backfill_tracked_hits(session: Session, job: Job, settings: Settings) -> dict[str, Any]:  # noqa: ARG001
+    return backfill_tracked_hits(session)
+
+
+_HANDLERS: dict[str, Callable[[Session, Job, Settings], dict[str, Any]]] = {
+    FETCH_TOP10: _fetch_top10,
+    CHECK_TAGS: _check_tags,
+    CHECK_REDIRECTS: _check_redirects,
+    BACKFILL_TRACKED_HITS: _backfill_tracked_hits,
+}
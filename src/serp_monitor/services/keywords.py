@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import String, and_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import Keyword
+from serp_monitor.services.data_versions import CONFIG, bump_data_versions
+
+_KEYWORD_KEY = ("keyword", "region", "language", "proxy_profile")
+
+
+def sync_keywords(session: Session, keywords: list[dict[str, Any]]) -> list[Keyword]:
+    """Insert missing config keywords and return the rows in config order.
+
+    Two statements whatever the config size: the entries are sent as four
+    arrays and unnested server-side into an INSERT ... ON CONFLICT DO NOTHING
+    on the unique key, then a SELECT joined to the same set.
+    """
+    keys = list(dict.fromkeys(tuple(item[column] for column in _KEYWORD_KEY) for item in keywords))
+    arrays = [
+        bindparam(f"config_{name}", [key[index] for key in keys], type_=ARRAY(String))
+        for index, name in enumerate(_KEYWORD_KEY)
+    ]
+    config = func.unnest(*arrays).table_valued(*_KEYWORD_KEY).render_derived(name="config")
+
+    created = session.execute(
+        pg_insert(Keyword)
+        .from_select(list(_KEYWORD_KEY), select(*(config.c[name] for name in _KEYWORD_KEY)))
+        .on_conflict_do_nothing(constraint="uq_keywords_keyword_region_language_proxy_profile")
+        .returning(Keyword.id)
+    ).all()
+    if created:
+        bump_data_versions(session, CONFIG)
+    # Committed before the rows are loaded, so they are not expired by it
+    session.commit()
+    stmt = select(Keyword).join(
+        config,
+        and_(
+            Keyword.keyword == config.c.keyword,
+            Keyword.region == config.c.region,
+            Keyword.language.is_not_distinct_from(config.c.language),
+            Keyword.proxy_profile.is_not_distinct_from(config.c.proxy_profile),
+        ),
+    )
+    rows = {
+        (row.keyword, row.region, row.language, row.proxy_profile): row
+        for row in session.execute(stmt).scalars()
+    }
+    return [rows[tuple(item[column] for column in _KEYWORD_KEY)] for item in keywords]
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta, timezone
+import os
+from pathlib import Path
+import shutil
+from typing import Iterator, Sequence
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from sqlalchemy import Row
+from sqlalchemy.orm import Session
+
+from serp_monitor.services.export import EXPORT_BATCH_SIZE, EXPORT_DATASETS, stream_export_batches
+from serp_monitor.services.incremental_export import Writer
+
+_TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.date32()), ("region", pa.string())]), flavor="hive")
+
+# Column order matches the statements in services.export.EXPORT_DATASETS
+SCHEMAS: dict[str, pa.Schema] = {
+    "serp_results": pa.schema(
+        [
+            ("result_id", pa.int64()),
+            ("run_id", pa.int64()),
+            ("keyword_id", pa.int64()),
+            ("keyword", pa.string()),
+            ("language", pa.string()),
+            ("position", pa.int32()),
+            ("title", pa.string()),
+            ("link", pa.string()),
+            ("domain", pa.string()),
+            ("snippet", pa.string()),
+            ("created_at", _TIMESTAMP),
+            ("date", pa.date32()),
+            ("region", pa.string()),
+        ]
+    ),
+    "tracked_hits": pa.schema(
+        [
+            ("hit_id", pa.int64()),
+            ("run_id", pa.int64()),
+            ("tracked_site_id", pa.int64()),
+            ("domain", pa.string()),
+            ("keyword_id", pa.int64()),
+            ("keyword", pa.string()),
+            ("language", pa.string()),
+            ("position", pa.int32()),
+            ("url", pa.string()),
+            ("detected_at", _TIMESTAMP),
+            ("observed_at", _TIMESTAMP),
+            ("date", pa.date32()),
+            ("region", pa.string()),
+        ]
+    ),
+    "page_tags": pa.schema(
+        [
+            ("page_tag_id", pa.int64()),
+            ("run_id", pa.int64()),
+            ("watch_url_id", pa.int64()),
+            ("url", pa.string()),
+            ("canonical", pa.string()),
+            ("hreflang", pa.string()),
+            ("google_canonical", pa.string()),
+            ("google_hreflang", pa.string()),
+            ("google_status", pa.string()),
+            ("bot_canonical", pa.string()),
+            ("bot_hreflang", pa.string()),
+            ("bot_status", pa.string()),
+            ("confirm_count", pa.int32()),
+            ("created_at", _TIMESTAMP),
+            ("last_confirmed_at", _TIMESTAMP),
+            ("date", pa.date32()),
+            ("region", pa.string()),
+        ]
+    ),
+    "redirect_events": pa.schema(
+        [
+            ("redirect_event_id", pa.int64()),
+            ("run_id", pa.int64()),
+            ("source_url", pa.string()),
+            ("final_url", pa.string()),
+            ("source_domain", pa.string()),
+            ("final_domain", pa.string()),
+            ("chain", pa.list_(pa.string())),
+            ("observed_at", _TIMESTAMP),
+            ("date", pa.date32()),
+            ("region", pa.string()),
+        ]
+    ),
+}
+
+
+def _record_batch(rows: Sequence[Row], schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def record_batches(
+    session: Session,
+    dataset: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """Rows of an export dataset as Arrow record batches, streamed from the DB."""
+    schema = SCHEMAS[dataset]
+    stmt = EXPORT_DATASETS[dataset].select(since, until)
+    for rows in stream_export_batches(session, stmt, batch_size):
+        yield _record_batch(rows, schema)
+
+
+def _partition_bounds(
+    since: datetime | None, until: datetime | None
+) -> tuple[datetime | None, datetime | None]:
+    """[since, until) widened to whole UTC days, the ``date`` partitions; naive values are UTC."""
+
+    def _utc(value: datetime) -> datetime:
+        return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    def _day_start(value: datetime) -> datetime:
+        return datetime.combine(value.date(), time(), tzinfo=timezone.utc)
+
+    if since is not None:
+        since = _day_start(_utc(since))
+    if until is not None:
+        until = _utc(until)
+        start = _day_start(until)
+        until = start if start == until else start + timedelta(days=1)
+    return since, until
+
+
+def write_dataset(
+    session: Session,
+    dataset: str,
+    out_dir: Path,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    basename_template: str | None = None,
+    existing_data_behavior: str = "delete_matching",
+) -> int:
+    """Write one dataset as Parquet under ``out_dir/<dataset>/date=.../region=...``.
+
+    Batches go to the writer as they arrive from the server-side cursor.
+    By default partitions that receive rows are replaced, so re-exporting a
+    range does not duplicate it; others are left alone. A replaced partition
+    holds a whole day, so ``since`` and ``until`` are widened to whole UTC
+    days (see ``_partition_bounds``) rather than dropping the part of the day
+    outside them. Returns the row count.
+    """
+    if existing_data_behavior == "delete_matching":
+        since, until = _partition_bounds(since, until)
+    written = 0
+
+    def _counted() -> Iterator[pa.RecordBatch]:
+        nonlocal written
+        for batch in record_batches(session, dataset, since, until, batch_size):
+            written += batch.num_rows
+            yield batch
+
+    ds.write_dataset(
+        _counted(),
+        out_dir / dataset,
+        schema=SCHEMAS[dataset],
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=basename_template or f"{dataset}-{{i}}.parquet",
+        existing_data_behavior=existing_data_behavior,
+        max_rows_per_group=max(batch_size, 1),
+        use_threads=False,
+    )
+    return written
+
+
+def parquet_writer(out_dir: Path, dataset: str, batch_size: int = EXPORT_BATCH_SIZE) -> Writer:
+    """Incremental export writer: each increment becomes ``<dataset>-<sequence>-<i>.parquet``
+    files in the ``date=.../region=...`` partitions of ``out_dir``.
+
+    Files are written to a staging directory (skipped by Arrow dataset
+    readers, as its name starts with "_") and moved into the partitions once
+    all of them are complete.
+    """
+    schema = SCHEMAS[dataset]
+
+    def _write(sequence: int, batches: Iterator[Sequence[Row]]) -> int:
+        prefix = f"{dataset}-{sequence:08d}"
+        staging = out_dir / f"_staging-{prefix}"
+        shutil.rmtree(staging, ignore_errors=True)
+        written = 0
+
+        def _counted() -> Iterator[pa.RecordBatch]:
+            nonlocal written
+            for rows in batches:
+                written += len(rows)
+                yield _record_batch(rows, schema)
+
+        ds.write_dataset(
+            _counted(),
+            staging,
+            schema=schema,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"{prefix}-{{i}}.parquet",
+            max_rows_per_group=max(batch_size, 1),
+            use_threads=False,
+        )
+        # Left by an earlier, interrupted attempt at this increment
+        for stale in out_dir.glob(f"date=*/region=*/{prefix}-*.parquet"):
+            stale.unlink()
+        for path in sorted(staging.rglob("*.parquet")):
+            target = out_dir / path.relative_to(staging)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        shutil.rmtree(staging)
+        return written
+
+    return _write
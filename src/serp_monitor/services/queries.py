@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import Row, Select, desc, func, select, text, true
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import (
+    REPLAY_KIND,
+    Keyword,
+    PageTag,
+    PageTagCheck,
+    Run,
+    RunKeyword,
+    TrackedHit,
+    WatchUrl,
+)
+
+# Below this many rows the planner estimate is replaced with an exact count
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+def _history_filter(stmt: Select, keyword: str | None, region: str | None) -> Select:
+    stmt = stmt.where(Run.kind != REPLAY_KIND)
+    if not keyword and not region:
+        return stmt
+    run_ids = select(RunKeyword.run_id).join(Keyword, Keyword.id == RunKeyword.keyword_id)
+    if keyword:
+        run_ids = run_ids.where(Keyword.keyword == keyword)
+    if region:
+        run_ids = run_ids.where(Keyword.region == region)
+    return stmt.where(Run.id.in_(run_ids))
+
+
+def history_page(
+    session: Session,
+    page_size: int,
+    keyword: str | None = None,
+    region: str | None = None,
+    before_id: int | None = None,
+    after_id: int | None = None,
+) -> tuple[list[Run], bool, bool]:
+    """One page of runs, newest first, keyed on Run.id instead of OFFSET.
+
+    ``before_id`` pages to older runs, ``after_id`` to newer ones; with neither
+    the newest page is returned. Returns (runs, has_newer, has_older).
+    """
+    stmt = _history_filter(select(Run), keyword, region)
+    if after_id is not None:
+        rows = list(
+            session.execute(
+                stmt.where(Run.id > after_id).order_by(Run.id.asc()).limit(page_size + 1)
+            ).scalars()
+        )
+        has_newer = len(rows) > page_size
+        runs = list(reversed(rows[:page_size]))
+        has_older = True
+    else:
+        if before_id is not None:
+            stmt = stmt.where(Run.id < before_id)
+        rows = list(session.execute(stmt.order_by(desc(Run.id)).limit(page_size + 1)).scalars())
+        has_older = len(rows) > page_size
+        runs = rows[:page_size]
+        has_newer = before_id is not None
+    if after_id is not None and len(runs) < page_size:
+        # Reached the newest end: show a full first page instead of a short one
+        return history_page(session, page_size, keyword, region)
+    return runs, has_newer, has_older
+
+
+def estimated_table_rows(session: Session, table: str) -> int:
+    """Row count from pg_class statistics, exact for small or unanalyzed tables."""
+    estimate = session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table},
+    ).scalar()
+    if estimate is None or estimate < EXACT_COUNT_THRESHOLD:
+        return session.execute(text(f"SELECT count(*) FROM {table}")).scalar_one()
+    return int(estimate)
+
+
+def history_run_count(session: Session, keyword: str | None = None, region: str | None = None) -> int:
+    if not keyword and not region:
+        return estimated_table_rows(session, Run.__tablename__)
+    return session.execute(
+        _history_filter(select(func.count(Run.id)), keyword, region)
+    ).scalar_one()
+
+
+def load_tracked_hits(session: Session, tracked_site_id: int, limit: int = 200) -> list[Row]:
+    """Latest hits of a tracked site with keyword and the tag checked in the hit's run.
+
+    One statement: the newest ``limit`` hits are picked first, then keyword and
+    watch URL are joined and the page tag comes from a LATERAL lookup of the
+    last check of that URL in the same run.
+    """
+    # Backfilled hits are shown at the time of their result, not of the backfill
+    seen_at = func.coalesce(TrackedHit.observed_at, TrackedHit.detected_at)
+    hits = (
+        select(TrackedHit, seen_at.label("seen_at"))
+        .where(
+            TrackedHit.tracked_site_id == tracked_site_id,
+            TrackedHit.run_id.not_in(select(Run.id).where(Run.kind == REPLAY_KIND)),
+        )
+        .order_by(seen_at.desc())
+        .limit(limit)
+        .subquery("hits")
+    )
+    tag = (
+        select(PageTag.canonical, PageTag.hreflang, PageTag.raw)
+        .join(PageTagCheck, PageTagCheck.page_tag_id == PageTag.id)
+        .where(PageTagCheck.run_id == hits.c.run_id, PageTagCheck.watch_url_id == WatchUrl.id)
+        .order_by(PageTagCheck.id.desc())
+        .limit(1)
+        .lateral("tag")
+    )
+    stmt = (
+        select(
+            hits.c.seen_at.label("detected_at"),
+            hits.c.position,
+            hits.c.url,
+            hits.c.run_id,
+            Keyword.keyword,
+            Keyword.region,
+            Keyword.language,
+            tag.c.canonical.label("tag_canonical"),
+            tag.c.hreflang.label("tag_hreflang"),
+            tag.c.raw.label("tag_raw"),
+        )
+        .select_from(hits)
+        .outerjoin(Keyword, Keyword.id == hits.c.keyword_id)
+        .outerjoin(WatchUrl, WatchUrl.url == hits.c.url)
+        .outerjoin(tag, true())
+        .order_by(hits.c.seen_at.desc())
+    )
+    return list(session.execute(stmt).all())
+
+
+def latest_page_tags(
+    session: Session, urls: Iterable[str], run_id: int | None = None
+) -> dict[str, PageTag]:
+    """Latest stored tag state of each URL, keyed by URL, in one statement.
+
+    DISTINCT ON (watch URL) over the (watch_url_id, id) index of page_tags.
+    With ``run_id`` only tags checked in that run count, newest check first.
+    URLs that were never checked are missing from the result.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    if run_id is None:
+        stmt = (
+            select(WatchUrl.url, PageTag)
+            .join(PageTag, PageTag.watch_url_id == WatchUrl.id)
+            .where(WatchUrl.url.in_(urls))
+            .distinct(WatchUrl.id)
+            .order_by(WatchUrl.id, PageTag.id.desc())
+        )
+    else:
+        stmt = (
+            select(WatchUrl.url, PageTag)
+            .join(PageTagCheck, PageTagCheck.watch_url_id == WatchUrl.id)
+            .join(PageTag, PageTag.id == PageTagCheck.page_tag_id)
+            .where(WatchUrl.url.in_(urls), PageTagCheck.run_id == run_id)
+            .distinct(WatchUrl.id)
+            .order_by(WatchUrl.id, PageTagCheck.id.desc())
+        )
+    return {url: tag for url, tag in session.execute(stmt).tuples()}
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Hashable
+
+
+def _newer(left: tuple[int, ...], right: tuple[int, ...]) -> bool:
+    return left != right and all(a >= b for a, b in zip(left, right, strict=True))
+
+
+class QueryCache:
+    """Process-wide LRU of query results, each stored with the data versions it was read at.
+
+    An entry is served until one of its scopes' versions moves; there is no
+    TTL. Shared between Streamlit sessions, so cached values must not be
+    mutated by callers.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[tuple[int, ...], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get_or_load(self, key: Hashable, version: tuple[int, ...], loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self.invalidations += 1
+            self.misses += 1
+
+        value = loader()
+
+        with self._lock:
+            current = self._entries.get(key)
+            # Versions only grow: keep a concurrent load that read newer data
+            if current is None or not _newer(current[0], version):
+                self._entries[key] = (version, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
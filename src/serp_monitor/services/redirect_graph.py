@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import RedirectEvent
+
+# Events are re-read from this many ids below the highest one seen, so rows
+# committed out of id order by concurrent checks are not missed. Re-applying
+# an event is a no-op.
+REFRESH_OVERLAP = 1000
+
+
+@dataclass(frozen=True)
+class RedirectEdge:
+    source_domain: str
+    final_domain: str
+    final_url: str
+    observed_at: datetime
+    event_id: int
+
+    @property
+    def redirects(self) -> bool:
+        return self.final_domain != self.source_domain
+
+
+def _key(edge: RedirectEdge) -> tuple[datetime, int]:
+    return edge.observed_at, edge.event_id
+
+
+class RedirectGraph:
+    """Domain-to-domain redirect edges from redirect_events, queried in memory.
+
+    Per domain it keeps the latest event (redirect or "stopped"), the latest
+    event that redirected elsewhere and the first event that redirected to
+    it. ``refresh`` loads events added since the previous call; thread-safe,
+    one instance can be shared by every UI session.
+    """
+
+    def __init__(self) -> None:
+        self._latest: dict[str, RedirectEdge] = {}
+        self._latest_redirect: dict[str, RedirectEdge] = {}
+        self._first_inbound: dict[str, RedirectEdge] = {}
+        self._max_id = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, session: Session) -> int:
+        """Apply events newer than the last refresh; returns the number read."""
+        rows = session.execute(
+            select(
+                RedirectEvent.id,
+                RedirectEvent.source_domain,
+                RedirectEvent.final_domain,
+                RedirectEvent.final_url,
+                RedirectEvent.observed_at,
+            )
+            .where(RedirectEvent.id > self._max_id - REFRESH_OVERLAP)
+            .order_by(RedirectEvent.id)
+        ).all()
+        with self._lock:
+            for event_id, source_domain, final_domain, final_url, observed_at in rows:
+                if not source_domain or not final_domain:
+                    continue
+                self._apply(RedirectEdge(source_domain, final_domain, final_url, observed_at, event_id))
+                self._max_id = max(self._max_id, event_id)
+        return len(rows)
+
+    def _apply(self, edge: RedirectEdge) -> None:
+        latest = self._latest.get(edge.source_domain)
+        if latest is None or _key(edge) >= _key(latest):
+            self._latest[edge.source_domain] = edge
+        if not edge.redirects:
+            return
+        latest = self._latest_redirect.get(edge.source_domain)
+        if latest is None or _key(edge) >= _key(latest):
+            self._latest_redirect[edge.source_domain] = edge
+        first = self._first_inbound.get(edge.final_domain)
+        if first is None or _key(edge) < _key(first):
+            self._first_inbound[edge.final_domain] = edge
+
+    def latest(self, domain: str) -> RedirectEdge | None:
+        """Most recent redirect check of ``domain``; ``redirects`` is False once it stopped."""
+        with self._lock:
+            return self._latest.get(domain)
+
+    def origin(self, domain: str) -> RedirectEdge | None:
+        """First redirect from another domain that led to ``domain``."""
+        with self._lock:
+            return self._first_inbound.get(domain)
+
+    def chain(self, domain: str) -> list[str]:
+        """Domains that first redirected into ``domain``, then where it last redirected to."""
+        with self._lock:
+            chain = [domain]
+            seen = {domain}
+            current = domain
+            while (edge := self._first_inbound.get(current)) and edge.source_domain not in seen:
+                chain.insert(0, edge.source_domain)
+                seen.add(edge.source_domain)
+                current = edge.source_domain
+            current = domain
+            while (edge := self._latest_redirect.get(current)) and edge.final_domain not in seen:
+                chain.append(edge.final_domain)
+                seen.add(edge.final_domain)
+                current = edge.final_domain
+            return chain
+
+    def cycle(self, domain: str) -> list[str] | None:
+        """Redirect loop reached from ``domain`` following current redirects, closed on its start."""
+        with self._lock:
+            path: list[str] = []
+            position: dict[str, int] = {}
+            current = domain
+            while current not in position:
+                position[current] = len(path)
+                path.append(current)
+                edge = self._latest.get(current)
+                if edge is None or not edge.redirects:
+                    return None
+                current = edge.final_domain
+            loop = path[position[current]:]
+            return loop + [current]
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import gzip
+from itertools import groupby, islice
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from serp_monitor.config.loaders import normalize_keyword
+from serp_monitor.db.models import REPLAY_KIND, Keyword, Run, RunStatus, SerpResult, TrackedSite
+from serp_monitor.services.data_versions import SERP, bump_data_versions
+from serp_monitor.services.export import EXPORT_BATCH_SIZE, stream_export_batches
+from serp_monitor.services.keywords import sync_keywords
+from serp_monitor.services.serp_service import keyword_checkpoint, result_rows, store_results
+
+# Keywords written and committed together
+REPLAY_BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class StoredPayload:
+    """One keyword's Serper payload from a past run or an archive file."""
+
+    # Payloads of one source are replayed into one run
+    source: str
+    # keyword, region, language and proxy_profile, as in the keywords config
+    keyword: dict[str, Any]
+    payload: dict[str, Any]
+    keyword_id: int | None = None
+
+
+@dataclass
+class ReplayResult:
+    source: str
+    run_id: int | None = None
+    keywords: int = 0
+    results: int = 0
+    hits: int = 0
+
+
+def source_run_ids(
+    session: Session,
+    run_ids: list[int] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> list[int]:
+    """Runs to replay: ``run_ids`` with the shards of sharded ones, or runs created in [since, until).
+
+    Replays themselves are only picked when given by id.
+    """
+    stmt = select(Run.id).order_by(Run.id)
+    if run_ids:
+        stmt = stmt.where(or_(Run.id.in_(run_ids), Run.parent_id.in_(run_ids)))
+    else:
+        stmt = stmt.where(Run.kind != REPLAY_KIND)
+    if since is not None:
+        stmt = stmt.where(Run.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Run.created_at < until)
+    return list(session.execute(stmt).scalars())
+
+
+def run_payloads(
+    session: Session, run_ids: Iterable[int], batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[StoredPayload]:
+    """Payloads rebuilt from the stored results of each run, one per keyword.
+
+    serp_results.raw is the organic item as Serper returned it, so a
+    keyword's rows in position order give back the ``organic`` list the run
+    parsed. Other blocks of the response were never stored. Rows are read
+    from a server-side cursor, one batch at a time.
+    """
+    for run_id in run_ids:
+        stmt = (
+            select(
+                SerpResult.keyword_id,
+                SerpResult.raw,
+                Keyword.keyword,
+                Keyword.region,
+                Keyword.language,
+                Keyword.proxy_profile,
+            )
+            .join(Keyword, Keyword.id == SerpResult.keyword_id)
+            .where(SerpResult.run_id == run_id)
+            .order_by(SerpResult.keyword_id, SerpResult.position, SerpResult.id)
+        )
+        rows = (row for batch in stream_export_batches(session, stmt, batch_size) for row in batch)
+        for keyword_id, group in groupby(rows, key=lambda row: row.keyword_id):
+            items = list(group)
+            first = items[0]
+            yield StoredPayload(
+                source=f"run-{run_id}",
+                keyword={
+                    "keyword": first.keyword,
+                    "region": first.region,
+                    "language": first.language,
+                    "proxy_profile": first.proxy_profile,
+                },
+                payload={"organic": [item.raw for item in items]},
+                keyword_id=keyword_id,
+            )
+
+
+def archive_files(path: Path) -> list[Path]:
+    if path.is_dir():
+        return sorted([*path.glob("*.jsonl"), *path.glob("*.jsonl.gz")])
+    return [path]
+
+
+def archive_payloads(path: Path) -> Iterator[StoredPayload]:
+    """Payloads of an archive file, or of every ``*.jsonl[.gz]`` file in a directory.
+
+    Each line is a keywords config entry with the Serper response under
+    ``payload``; each file is one source.
+    """
+    for file in archive_files(path):
+        source = file.name.removesuffix(".gz").removesuffix(".jsonl")
+        opener = gzip.open if file.suffix == ".gz" else open
+        with opener(file, "rt", encoding="utf-8") as handle:
+            for number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"{file}:{number}: {exc}") from exc
+                keyword = normalize_keyword(record)
+                if keyword is None or not isinstance(record.get("payload"), dict):
+                    raise ValueError(f"{file}:{number}: expected keyword, region and payload")
+                yield StoredPayload(source=source, keyword=keyword, payload=record["payload"])
+
+
+def write_archive(payloads: Iterable[StoredPayload], out_dir: Path) -> dict[Path, int]:
+    """Write payloads to ``out_dir/<source>.jsonl.gz``, renamed into place when complete.
+
+    Returns the payload count of each file.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written: dict[Path, int] = {}
+    for source, items in groupby(payloads, key=lambda item: item.source):
+        path = out_dir / f"{source}.jsonl.gz"
+        partial = path.with_name(path.name + ".tmp")
+        count = 0
+        with gzip.open(partial, "wt", encoding="utf-8") as handle:
+            for item in items:
+                handle.write(json.dumps({**item.keyword, "payload": item.payload}, ensure_ascii=False))
+                handle.write("\n")
+                count += 1
+        os.replace(partial, path)
+        written[path] = count
+    return written
+
+
+def _batches(items: Iterable[StoredPayload], size: int) -> Iterator[list[StoredPayload]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _keyword_ids(session: Session, batch: list[StoredPayload], dry_run: bool) -> list[int]:
+    """Keyword ids of a batch; archive keywords are created as needed, or 0 in a dry run."""
+    missing = [item.keyword for item in batch if item.keyword_id is None]
+    synced = iter(sync_keywords(session, missing) if missing and not dry_run else [])
+    ids = []
+    for item in batch:
+        if item.keyword_id is not None:
+            ids.append(item.keyword_id)
+        else:
+            ids.append(0 if dry_run else next(synced).id)
+    return ids
+
+
+def replay(
+    session: Session,
+    payloads: Iterable[StoredPayload],
+    kind: str = REPLAY_KIND,
+    batch_size: int = REPLAY_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Iterator[ReplayResult]:
+    """Ingest stored payloads into a new run per source, without calling Serper.
+
+    Payloads go through the same parsing, tracked-hit detection and writes
+    as ``SerpService.run_keywords``, with hits matched against the tracked
+    sites as they are now. Page tag checks are not run, as they fetch the
+    pages, and site status is left alone: replayed results are history,
+    not the current top 10. Runs of kind ``REPLAY_KIND`` are left out of
+    analytics, history and exports, as their results and hits copy ones
+    already stored; they keep the time of the replay rather than of the
+    source. Another ``kind`` is only for payloads never stored before, such
+    as ``serper-query --persist`` results. Keywords are committed
+    ``batch_size`` at a time. With ``dry_run`` payloads are only parsed and
+    matched; nothing is written. Yields each source's result once it is
+    done.
+    """
+    tracked_domains = dict(session.execute(select(TrackedSite.domain, TrackedSite.id)).all())
+    for source, items in groupby(payloads, key=lambda item: item.source):
+        result = ReplayResult(source=source)
+        run = None
+        if not dry_run:
+            run = Run(kind=kind, status=RunStatus.running, started_at=datetime.now(timezone.utc))
+            session.add(run)
+            session.flush()
+            result.run_id = run.id
+            # Committed first, so a failure below can still mark it failed
+            session.commit()
+        try:
+            for batch in _batches(items, batch_size):
+                started_at = datetime.now(timezone.utc)
+                serp_rows: list[dict] = []
+                hit_rows: list[dict] = []
+                checkpoints: list[dict] = []
+                for item, keyword_id in zip(batch, _keyword_ids(session, batch, dry_run)):
+                    rows, hits = result_rows(item.payload, result.run_id or 0, keyword_id, tracked_domains)
+                    serp_rows.extend(rows)
+                    hit_rows.extend(hits)
+                    checkpoints.append(
+                        keyword_checkpoint(result.run_id or 0, keyword_id, len(rows), started_at)
+                    )
+                result.keywords += len(batch)
+                result.results += len(serp_rows)
+                result.hits += len(hit_rows)
+                if run is not None:
+                    store_results(session, serp_rows, hit_rows, checkpoints)
+                    session.commit()
+        except Exception as exc:  # noqa: BLE001
+            session.rollback()
+            if run is not None:
+                run.status = RunStatus.failed
+                run.error = str(exc)[:500]
+                run.finished_at = datetime.now(timezone.utc)
+                run.keyword_total = result.keywords
+                bump_data_versions(session, SERP)
+                session.commit()
+            raise
+        if run is not None:
+            run.status = RunStatus.success
+            run.finished_at = datetime.now(timezone.utc)
+            run.keyword_total = result.keywords
+            bump_data_versions(session, SERP)
+            session.commit()
+        yield result
@@ -1,93 +1,191 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
+from typing import Any
 
+from sqlalchemy import insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 from serp_monitor.config.settings import get_settings
 from serp_monitor.db.models import (
     Keyword,
     Run,
+    RunKeyword,
     RunStatus,
     SerpResult,
     TrackedHit,
     TrackedSite,
-    PageTag,
+    PageTagCheck,
     WatchUrl,
 )
+from serp_monitor.db.session import pipeline
 from serp_monitor.utils.urls import extract_domain
 from serp_monitor.parsers.serper import parse_organic_results
 from serp_monitor.providers.serper import SerperClient
+from serp_monitor.services.data_versions import SERP, bump_data_versions
+from serp_monitor.services.site_status import is_latest_run, record_serp_run
 from serp_monitor.services.tag_service import TagService
 
 
+def result_rows(
+    payload: dict[str, Any], run_id: int, keyword_id: int, tracked_domains: dict[str, int]
+) -> tuple[list[dict], list[dict]]:
+    """serp_results and tracked_hits rows for one keyword's Serper payload."""
+    serp_rows: list[dict] = []
+    hit_rows: list[dict] = []
+    for row in parse_organic_results(payload):
+        if row.get("position") is None or not row.get("link"):
+            continue
+        domain = extract_domain(row["link"])
+        tracked_site_id = tracked_domains.get(domain)
+        serp_rows.append(
+            {
+                "run_id": run_id,
+                "keyword_id": keyword_id,
+                "position": int(row["position"]),
+                "title": row.get("title"),
+                "link": row["link"],
+                "domain": domain or None,
+                "snippet": row.get("snippet"),
+                "raw": row.get("raw") or {},
+            }
+        )
+        if tracked_site_id:
+            hit_rows.append(
+                {
+                    "tracked_site_id": tracked_site_id,
+                    "run_id": run_id,
+                    "keyword_id": keyword_id,
+                    "position": int(row["position"]),
+                    "url": row["link"],
+                }
+            )
+    return serp_rows, hit_rows
+
+
+def keyword_checkpoint(run_id: int, keyword_id: int, result_count: int, started_at: datetime) -> dict:
+    """run_keywords row marking a keyword's results as stored."""
+    return {
+        "run_id": run_id,
+        "keyword_id": keyword_id,
+        "result_count": result_count,
+        "status": RunStatus.success,
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc),
+    }
+
+
+def store_results(
+    session: Session, serp_rows: list[dict], hit_rows: list[dict], checkpoints: list[dict]
+) -> None:
+    """Write results of one or more keywords with their run_keywords checkpoints; the caller commits.
+
+    Checkpoints are upserted, so runs without pending rows (replays) get
+    them too.
+    """
+    # Results are write-only here: send all batches without waiting in between
+    with pipeline(session):
+        if serp_rows:
+            session.execute(insert(SerpResult).inline(), serp_rows)
+        if hit_rows:
+            session.execute(insert(TrackedHit).inline(), hit_rows)
+        if checkpoints:
+            checkpoint = pg_insert(RunKeyword).inline()
+            session.execute(
+                checkpoint.on_conflict_do_update(
+                    constraint="uq_run_keywords_run_id_keyword_id",
+                    set_={
+                        "result_count": checkpoint.excluded.result_count,
+                        "status": checkpoint.excluded.status,
+                        "error": None,
+                        "started_at": checkpoint.excluded.started_at,
+                        "finished_at": checkpoint.excluded.finished_at,
+                    },
+                ),
+                checkpoints,
+            )
+
+
 class SerpService:
     def __init__(self, client: SerperClient) -> None:
         self._client = client
 
-    def run_keywords(self, session: Session, keywords: list[Keyword], kind: str = "hourly") -> Run:
-        run = Run(kind=kind, status=RunStatus.running, started_at=datetime.now(timezone.utc))
-        session.add(run)
+    def run_keywords(
+        self, session: Session, keywords: list[Keyword], kind: str = "hourly", run: Run | None = None
+    ) -> Run:
+        """Fetch and store the SERP of every keyword in a new run, or in ``run`` when given.
+
+        Each keyword is committed with its results and a success checkpoint
+        in run_keywords, so passing an interrupted run back in fetches only
+        the keywords still pending or failed. A keyword that fails is
+        recorded as failed and the run goes on; the run ends failed if any
+        keyword did.
+        """
+        if run is None:
+            run = Run(kind=kind)
+            session.add(run)
+        run.status = RunStatus.running
+        run.started_at = run.started_at or datetime.now(timezone.utc)
+        run.finished_at = None
+        run.error = None
+        run.keyword_total = len(keywords)
         session.flush()
         try:
+            # One pending checkpoint per keyword; rows of a resumed run are kept
+            if keywords:
+                session.execute(
+                    pg_insert(RunKeyword).on_conflict_do_nothing(
+                        constraint="uq_run_keywords_run_id_keyword_id"
+                    ),
+                    [
+                        {"run_id": run.id, "keyword_id": keyword.id, "status": RunStatus.pending}
+                        for keyword in keywords
+                    ],
+                )
+            session.commit()
+            done = set(
+                session.execute(
+                    select(RunKeyword.keyword_id).where(
+                        RunKeyword.run_id == run.id, RunKeyword.status == RunStatus.success
+                    )
+                ).scalars()
+            )
             tracked_sites = list(session.query(TrackedSite).all())
             tracked_domains = {site.domain: site.id for site in tracked_sites}
             tag_service = TagService(get_settings())
+            failed = 0
             for keyword in keywords:
-                payload = self._client.search(
-                    keyword.keyword,
-                    region=keyword.region,
-                    language=keyword.language or None,
-                )
-                rows = parse_organic_results(payload)
-                for row in rows:
-                    if row.get("position") is None or not row.get("link"):
-                        continue
-                    domain = extract_domain(row["link"])
-                    tracked_site_id = tracked_domains.get(domain)
-                    session.add(
-                        SerpResult(
-                            run_id=run.id,
-                            keyword_id=keyword.id,
-                            position=int(row["position"]),
-                            title=row.get("title"),
-                            link=row["link"],
-                            snippet=row.get("snippet"),
-                            raw=row.get("raw") or {},
+                if keyword.id in done:
+                    continue
+                try:
+                    hit_rows = self._fetch_keyword(session, run, keyword, tracked_domains)
+                except Exception as exc:  # noqa: BLE001
+                    session.rollback()
+                    failed += 1
+                    session.execute(
+                        update(RunKeyword)
+                        .where(RunKeyword.run_id == run.id, RunKeyword.keyword_id == keyword.id)
+                        .values(
+                            status=RunStatus.failed,
+                            error=str(exc)[:500],
+                            finished_at=datetime.now(timezone.utc),
                         )
                     )
-                    if tracked_site_id:
-                        session.add(
-                            TrackedHit(
-                                tracked_site_id=tracked_site_id,
-                                run_id=run.id,
-                                keyword_id=keyword.id,
-                                position=int(row["position"]),
-                                url=row["link"],
-                            )
-                        )
-                        watch = session.query(WatchUrl).filter(WatchUrl.url == row["link"]).one_or_none()
-                        if watch:
-                            exists = (
-                                session.query(PageTag)
-                                .filter(PageTag.run_id == run.id, PageTag.watch_url_id == watch.id)
-                                .first()
-                            )
-                        else:
-                            exists = None
-                        if not exists:
-                            try:
-                                tag_service.check_url(
-                                    session,
-                                    run.id,
-                                    row["link"],
-                                    region=keyword.region,
-                                    language=keyword.language,
-                                )
-                            except Exception:
-                                session.rollback()
-            run.status = RunStatus.success
+                    session.commit()
+                    continue
+                self._check_hit_tags(session, run, keyword, hit_rows, tag_service)
+
+            run.status = RunStatus.failed if failed else RunStatus.success
+            run.error = f"{failed} of {len(keywords)} keywords failed" if failed else None
             run.finished_at = datetime.now(timezone.utc)
+            # Shard runs are recorded together by their parent. Queried before
+            # the pipeline, which cannot return rows
+            record = run.parent_id is None and is_latest_run(session, run)
+            with pipeline(session):
+                if record:
+                    record_serp_run(session, [run.id], run.finished_at)
+                bump_data_versions(session, SERP)
             session.commit()
             return run
         except Exception as exc:  # noqa: BLE001
@@ -96,5 +194,48 @@ class SerpService:
             run.error = str(exc)[:500]
             run.finished_at = datetime.now(timezone.utc)
             session.add(run)
+            bump_data_versions(session, SERP)
             session.commit()
             raise
+
+    def _fetch_keyword(
+        self, session: Session, run: Run, keyword: Keyword, tracked_domains: dict[str, int]
+    ) -> list[dict]:
+        """Fetch one keyword and commit its results with its success checkpoint; returns the hits."""
+        keyword_started_at = datetime.now(timezone.utc)
+        payload = self._client.search(
+            keyword.keyword,
+            region=keyword.region,
+            language=keyword.language or None,
+        )
+        serp_rows, hit_rows = result_rows(payload, run.id, keyword.id, tracked_domains)
+        store_results(
+            session,
+            serp_rows,
+            hit_rows,
+            [keyword_checkpoint(run.id, keyword.id, len(serp_rows), keyword_started_at)],
+        )
+        session.commit()
+        return hit_rows
+
+    def _check_hit_tags(
+        self, session: Session, run: Run, keyword: Keyword, hit_rows: list[dict], tag_service: TagService
+    ) -> None:
+        for hit in hit_rows:
+            exists = (
+                session.query(PageTagCheck.id)
+                .join(WatchUrl, WatchUrl.id == PageTagCheck.watch_url_id)
+                .filter(PageTagCheck.run_id == run.id, WatchUrl.url == hit["url"])
+                .first()
+            )
+            if not exists:
+                try:
+                    tag_service.check_url(
+                        session,
+                        run.id,
+                        hit["url"],
+                        region=keyword.region,
+                        language=keyword.language,
+                    )
+                except Exception:
+                    session.rollback()
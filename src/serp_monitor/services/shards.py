@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import hashlib
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import Run, RunKeyword, RunStatus, SerpResult
+from serp_monitor.services.data_versions import SERP, bump_data_versions
+from serp_monitor.services.site_status import is_latest_run, record_serp_run
+
+_FINISHED = (RunStatus.success, RunStatus.failed)
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """argparse type for ``i/N``: shard ``i`` (from 1) of ``N``."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard must be 1..N of N, got {value!r}")
+    return index, count
+
+
+def keyword_shard(item: dict[str, Any], shard_count: int) -> int:
+    """Shard (from 1) of a normalized config keyword.
+
+    Hashes the keyword's identity, not its row id or config position, so
+    every node assigns it to the same shard before it exists in the DB and
+    regardless of config order.
+    """
+    identity = "\x1f".join(
+        str(item.get(column) or "") for column in ("keyword", "region", "language", "proxy_profile")
+    )
+    digest = hashlib.blake2b(identity.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shard_count + 1
+
+
+def select_shard(items: list[dict[str, Any]], shard_index: int, shard_count: int) -> list[dict[str, Any]]:
+    return [item for item in items if keyword_shard(item, shard_count) == shard_index]
+
+
+def default_run_key(kind: str, shard_count: int, now: datetime | None = None) -> str:
+    """Run key shared by nodes started in the same UTC hour with the same shard count."""
+    now = now or datetime.now(timezone.utc)
+    return f"{kind}:{now.astimezone(timezone.utc):%Y-%m-%dT%H}:{shard_count}"
+
+
+def get_or_create_parent_run(session: Session, run_key: str, kind: str, shard_count: int) -> Run:
+    """The parent run of ``run_key``, created by whichever node gets there first."""
+    session.execute(
+        pg_insert(Run)
+        .values(run_key=run_key, kind=kind, status=RunStatus.running, shard_count=shard_count)
+        .on_conflict_do_nothing(index_elements=[Run.run_key])
+    )
+    parent = session.execute(select(Run).where(Run.run_key == run_key)).scalar_one()
+    if parent.shard_count != shard_count:
+        raise ValueError(f"Run {run_key} was started with {parent.shard_count} shards, not {shard_count}")
+    session.commit()
+    return parent
+
+
+def create_shard_run(session: Session, parent: Run, shard_index: int) -> Run:
+    """Child run for one shard; a shard already run under this parent is refused.
+
+    The unique (parent_id, shard_index) constraint also stops two nodes
+    racing for the same shard.
+    """
+    existing = session.execute(
+        select(Run.id).where(Run.parent_id == parent.id, Run.shard_index == shard_index)
+    ).scalar_one_or_none()
+    if existing is not None:
+        raise ValueError(f"Shard {shard_index}/{parent.shard_count} of run {parent.id} is run {existing}")
+    run = Run(
+        kind=parent.kind,
+        status=RunStatus.pending,
+        parent_id=parent.id,
+        shard_index=shard_index,
+        shard_count=parent.shard_count,
+    )
+    session.add(run)
+    session.flush()
+    return run
+
+
+def finish_parent_run(session: Session, parent_id: int) -> Run:
+    """Update the parent's status from its shards; done once all of them finished.
+
+    The parent row is locked so two shards finishing together agree on it.
+    """
+    parent = session.execute(select(Run).where(Run.id == parent_id).with_for_update()).scalar_one()
+    shards = list(session.execute(select(Run).where(Run.parent_id == parent_id)).scalars())
+    started = [shard.started_at for shard in shards if shard.started_at is not None]
+    parent.started_at = min(started) if started else parent.started_at
+    finished = [shard for shard in shards if shard.status in _FINISHED]
+    if len(finished) < (parent.shard_count or 0):
+        parent.status = RunStatus.running
+    else:
+        failed = [shard for shard in finished if shard.status == RunStatus.failed]
+        parent.status = RunStatus.failed if failed else RunStatus.success
+        parent.error = f"{len(failed)} shard(s) failed" if failed else None
+        parent.finished_at = max(shard.finished_at or parent.created_at for shard in finished)
+        # Site status from all shards at once: each shard only saw part of the top 10s
+        if is_latest_run(session, parent):
+            record_serp_run(session, [shard.id for shard in shards], parent.finished_at)
+        bump_data_versions(session, SERP)
+    parent.keyword_total = sum(shard.keyword_total or 0 for shard in shards)
+    session.commit()
+    return parent
+
+
+@dataclass(frozen=True)
+class ShardProgress:
+    shard_index: int
+    run: Run | None
+    keywords_done: int
+    results: int
+
+
+def shard_progress(session: Session, parent: Run) -> list[ShardProgress]:
+    """Every shard of ``parent`` in order, with ``run`` None for shards not started yet."""
+    shards = {
+        run.shard_index: run
+        for run in session.execute(select(Run).where(Run.parent_id == parent.id)).scalars()
+    }
+    run_ids = [run.id for run in shards.values()]
+    keywords_done = dict(
+        session.execute(
+            select(RunKeyword.run_id, func.count())
+            .where(RunKeyword.run_id.in_(run_ids), RunKeyword.status.in_(_FINISHED))
+            .group_by(RunKeyword.run_id)
+        ).all()
+    )
+    results = dict(
+        session.execute(
+            select(SerpResult.run_id, func.count())
+            .where(SerpResult.run_id.in_(run_ids))
+            .group_by(SerpResult.run_id)
+        ).all()
+    )
+    progress = []
+    for index in range(1, (parent.shard_count or 0) + 1):
+        run = shards.get(index)
+        progress.append(
+            ShardProgress(
+                shard_index=index,
+                run=run,
+                keywords_done=keywords_done.get(run.id, 0) if run else 0,
+                results=results.get(run.id, 0) if run else 0,
+            )
+        )
+    return progress
+
+
+def latest_parent_run(session: Session) -> Run | None:
+    return session.execute(
+        select(Run)
+        .where(Run.shard_count.is_not(None), Run.parent_id.is_(None))
+        .order_by(Run.id.desc())
+        .limit(1)
+    ).scalar_one_or_none()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    and_,
+    any_,
+    bindparam,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import Run, SerpResult, SiteStatus
+
+
+def preferred_tags(google: dict | None, bot: dict | None) -> tuple[str | None, dict | None]:
+    google = google or {}
+    bot = bot or {}
+    canonical = google.get("canonical") or bot.get("canonical")
+    hreflang = google.get("hreflang") or bot.get("hreflang")
+    return canonical, hreflang
+
+
+def is_latest_run(session: Session, run: Run) -> bool:
+    """Whether no later top-level run of the same kind exists.
+
+    Site status follows the newest run only: a resumed old run, or a parent
+    whose last shard finishes late, must not bring back stale positions.
+    """
+    newer = exists().where(Run.kind == run.kind, Run.parent_id.is_(None), Run.id > run.id)
+    return not session.execute(select(newer)).scalar()
+
+
+def record_serp_run(session: Session, run_ids: list[int], seen_at: datetime) -> None:
+    """Mark the top-10 domains of a run (or of all shards of one) as top-10 now, clearing the flag elsewhere.
+
+    Both statements work on the run's results in SQL, with the run ids as a
+    single array parameter, so no domain list goes through Python whatever
+    the run's size; neither reads a result, so they can go in a pipeline.
+    """
+    in_run = SerpResult.run_id == any_(bindparam("run_ids", list(run_ids), type_=ARRAY(Integer)))
+    top10 = and_(in_run, SerpResult.position <= 10, SerpResult.domain.is_not(None))
+    still_top10 = select(SerpResult.domain).where(top10)
+    session.execute(
+        update(SiteStatus)
+        .where(SiteStatus.top10_now.is_(True), SiteStatus.domain.not_in(still_top10))
+        .values(top10_now=False)
+        # No ORM objects to sync; the default would SELECT the rows first
+        .execution_options(synchronize_session=False)
+    )
+    best = (
+        select(
+            SerpResult.domain,
+            true(),
+            func.min(SerpResult.position),
+            literal(seen_at, DateTime(timezone=True)),
+        )
+        .where(top10)
+        .group_by(SerpResult.domain)
+    )
+    stmt = pg_insert(SiteStatus).from_select(["domain", "top10_now", "last_position", "last_seen_at"], best)
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SiteStatus.domain],
+            set_={
+                "top10_now": True,
+                "last_position": stmt.excluded.last_position,
+                "last_seen_at": stmt.excluded.last_seen_at,
+            },
+        )
+    )
+
+
+def record_tags(session: Session, domain: str, google: dict[str, Any], bot: dict[str, Any]) -> None:
+    """Fold one tag check into the domain's canonical/hreflang change flags.
+
+    A change is flagged when the preferred value differs from the previous
+    non-empty one, checks of all URLs of the domain form a single sequence.
+    """
+    canonical, hreflang = preferred_tags(google, bot)
+    stmt = pg_insert(SiteStatus).inline()
+    excluded = stmt.excluded
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SiteStatus.domain],
+            set_={
+                "canonical_changed": or_(
+                    SiteStatus.canonical_changed,
+                    and_(
+                        SiteStatus.last_canonical.is_not(None),
+                        SiteStatus.last_canonical.is_distinct_from(excluded.last_canonical),
+                    ),
+                ),
+                "hreflang_changed": or_(
+                    SiteStatus.hreflang_changed,
+                    and_(
+                        SiteStatus.last_hreflang.is_not(None),
+                        SiteStatus.last_hreflang.is_distinct_from(excluded.last_hreflang),
+                    ),
+                ),
+                "last_canonical": excluded.last_canonical,
+                "last_hreflang": excluded.last_hreflang,
+            },
+        ),
+        [{"domain": domain, "last_canonical": canonical, "last_hreflang": hreflang}],
+    )
+
+
+def record_redirect(session: Session, domain: str, final_domain: str) -> None:
+    redirected = final_domain != domain
+    stmt = pg_insert(SiteStatus).inline()
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[SiteStatus.domain],
+            set_={
+                "redirect_ever": or_(SiteStatus.redirect_ever, stmt.excluded.redirect_now),
+                "redirect_now": stmt.excluded.redirect_now,
+            },
+        ),
+        [{"domain": domain, "redirect_ever": redirected, "redirect_now": redirected}],
+    )
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from typing import Any
 
 import httpx
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from serp_monitor.config.settings import Settings
 from serp_monitor.db.models import (
     PageTag,
+    PageTagCheck,
     WatchUrl,
     CanonicalSite,
     CanonicalEdge,
@@ -16,10 +21,25 @@ from serp_monitor.db.models import (
     RedirectEvent,
     TrackedSite,
 )
+from serp_monitor.db.session import pipeline
 from serp_monitor.parsers.page_tags import parse_page_tags
+from serp_monitor.services.data_versions import TAGS, bump_data_versions
+from serp_monitor.services.site_status import record_redirect, record_tags
 from serp_monitor.utils.urls import extract_domain
 
 
+_STATE_KEYS = ("canonical", "hreflang", "status", "final_url")
+
+
+def _tag_state_hash(bot_parsed: dict[str, Any], google_parsed: dict[str, Any]) -> str:
+    state = {
+        "bot": {key: bot_parsed.get(key) for key in _STATE_KEYS},
+        "googlebot": {key: google_parsed.get(key) for key in _STATE_KEYS},
+    }
+    encoded = json.dumps(state, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
 class RetriableStatus(Exception):
     def __init__(self, status_code: int) -> None:
         super().__init__(f"HTTP {status_code}")
@@ -149,28 +169,89 @@ class TagService:
 
         watch_url = self._get_or_create_watch_url(session, url, region)
 
-        row = PageTag(
-            run_id=run_id,
-            watch_url_id=watch_url.id,
-            canonical=bot_parsed.get("canonical"),
-            hreflang=bot_parsed.get("hreflang"),
-            raw={
-                "url": url,
-                "bot": bot_parsed,
-                "googlebot": google_parsed,
-            },
-        )
-        session.add(row)
-        self._record_redirect_event(session, run_id, url, bot_fetch)
-        self._record_canonical_chain(session, run_id, url, google_parsed, bot_parsed)
+        page_tag = self._store_page_tag(session, run_id, watch_url, url, bot_parsed, google_parsed)
+        last_redirect = self._last_redirect_event(session, url)
+        # Everything below only writes, so it can be pipelined
+        with pipeline(session):
+            self._record_redirect_event(session, run_id, url, bot_fetch, last_redirect)
+            session.execute(
+                insert(PageTagCheck).inline(),
+                [{"run_id": run_id, "watch_url_id": watch_url.id, "page_tag_id": page_tag.id}],
+            )
+            self._record_canonical_chain(session, run_id, url, google_parsed, bot_parsed)
+            domain = extract_domain(url)
+            if domain:
+                record_tags(session, domain, google_parsed, bot_parsed)
+            bump_data_versions(session, TAGS)
         session.commit()
         return {
             "bot": bot_parsed,
             "googlebot": google_parsed,
         }
 
+    def _store_page_tag(
+        self,
+        session: Session,
+        run_id: int,
+        watch_url: WatchUrl,
+        url: str,
+        bot_parsed: dict[str, Any],
+        google_parsed: dict[str, Any],
+    ) -> PageTag:
+        state_hash = _tag_state_hash(bot_parsed, google_parsed)
+        # The transaction's time, as for created_at: exports key on it (see incremental_export)
+        now = func.now()
+
+        current = None
+        if self._settings.page_tag_storage == "changelog":
+            current = (
+                session.query(PageTag)
+                .filter(PageTag.watch_url_id == watch_url.id)
+                .order_by(PageTag.id.desc())
+                .first()
+            )
+
+        if current and current.state_hash == state_hash:
+            current.last_confirmed_at = now
+            current.confirm_count = PageTag.confirm_count + 1
+            row = current
+        else:
+            row = PageTag(
+                run_id=run_id,
+                watch_url_id=watch_url.id,
+                canonical=bot_parsed.get("canonical"),
+                hreflang=bot_parsed.get("hreflang"),
+                raw={
+                    "url": url,
+                    "bot": bot_parsed,
+                    "googlebot": google_parsed,
+                },
+                state_hash=state_hash,
+                confirm_count=1,
+                last_confirmed_at=now,
+            )
+            session.add(row)
+        session.flush()
+        return row
+
+    def _last_redirect_event(self, session: Session, source_url: str) -> RedirectEvent | None:
+        source_domain = extract_domain(source_url)
+        if not source_domain:
+            return None
+        return (
+            session.query(RedirectEvent)
+            .filter(RedirectEvent.source_domain == source_domain)
+            .order_by(RedirectEvent.observed_at.desc())
+            .first()
+        )
+
     def _record_redirect_event(
-        self, session: Session, run_id: int, source_url: str, fetch: dict[str, Any]
+        self,
+        session: Session,
+        run_id: int,
+        source_url: str,
+        fetch: dict[str, Any],
+        last_event: RedirectEvent | None,
     ) -> None:
         final_url = fetch.get("final_url")
         chain = fetch.get("chain") or []
@@ -181,54 +262,51 @@ class TagService:
         if not source_domain or not final_domain:
             return
 
-        last_event = (
-            session.query(RedirectEvent)
-            .filter(RedirectEvent.source_domain == source_domain)
-            .order_by(RedirectEvent.observed_at.desc())
-            .first()
-        )
-
         # No redirect now
         if final_domain == source_domain:
             if last_event and last_event.final_domain != source_domain:
-                session.add(
-                    RedirectEvent(
-                        run_id=run_id,
-                        source_url=source_url,
-                        final_url=source_url,
-                        source_domain=source_domain,
-                        final_domain=source_domain,
-                        chain=chain,
-                    )
+                session.execute(
+                    insert(RedirectEvent).inline(),
+                    [
+                        {
+                            "run_id": run_id,
+                            "source_url": source_url,
+                            "final_url": source_url,
+                            "source_domain": source_domain,
+                            "final_domain": source_domain,
+                            "chain": chain,
+                        }
+                    ],
                 )
+                record_redirect(session, source_domain, source_domain)
             return
 
         # Redirect unchanged -> skip event, but ensure target is tracked
         if last_event and last_event.final_domain == final_domain and last_event.final_url == final_url:
-            existing = (
-                session.query(TrackedSite)
-                .filter(TrackedSite.domain == final_domain)
-                .one_or_none()
-            )
-            if not existing:
-                session.add(TrackedSite(domain=final_domain))
+            self._ensure_tracked_site(session, final_domain)
             return
 
-        session.add(
-            RedirectEvent(
-                run_id=run_id,
-                source_url=source_url,
-                final_url=final_url,
-                source_domain=source_domain,
-                final_domain=final_domain,
-                chain=chain,
-            )
+        session.execute(
+            insert(RedirectEvent).inline(),
+            [
+                {
+                    "run_id": run_id,
+                    "source_url": source_url,
+                    "final_url": final_url,
+                    "source_domain": source_domain,
+                    "final_domain": final_domain,
+                    "chain": chain,
+                }
+            ],
         )
-        existing = (
-            session.query(TrackedSite).filter(TrackedSite.domain == final_domain).one_or_none()
+        record_redirect(session, source_domain, final_domain)
+        self._ensure_tracked_site(session, final_domain)
+
+    def _ensure_tracked_site(self, session: Session, domain: str) -> None:
+        session.execute(
+            pg_insert(TrackedSite).inline().on_conflict_do_nothing(index_elements=[TrackedSite.domain]),
+            [{"domain": domain}],
         )
-        if not existing:
-            session.add(TrackedSite(domain=final_domain))
 
     def _record_canonical_chain(
         self,
@@ -244,23 +322,28 @@ class TagService:
         if not chosen:
             return
 
-        existing_site = (
-            session.query(CanonicalSite).filter(CanonicalSite.url == chosen).one_or_none()
+        # .inline(): no implicit RETURNING, so the inserts can go into a pipeline
+        session.execute(
+            pg_insert(CanonicalSite).inline().on_conflict_do_nothing(index_elements=[CanonicalSite.url]),
+            [{"url": chosen}],
         )
-        if not existing_site:
-            session.add(CanonicalSite(url=chosen))
-        existing_fav = (
-            session.query(CanonicalFavorite).filter(CanonicalFavorite.url == chosen).one_or_none()
+        session.execute(
+            pg_insert(CanonicalFavorite)
+            .inline()
+            .on_conflict_do_nothing(index_elements=[CanonicalFavorite.url]),
+            [{"url": chosen}],
         )
-        if not existing_fav:
-            session.add(CanonicalFavorite(url=chosen))
-
-        session.add(
-            CanonicalEdge(
-                run_id=run_id,
-                source_url=source_url,
-                canonical_url=chosen,
-                canonical_google=google_can,
-                canonical_bot=bot_can,
-            )
+        session.execute(
+            insert(CanonicalEdge).inline(),
+            [
+                {
+                    "run_id": run_id,
+                    "source_url": source_url,
+                    "canonical_url": chosen,
+                    "canonical_google": google_can,
+                    "canonical_bot": bot_can,
+                    "source_domain": extract_domain(source_url) or None,
+                    "canonical_domain": extract_domain(chosen) or None,
+                }
+            ],
         )
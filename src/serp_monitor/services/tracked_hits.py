@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import exists, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from serp_monitor.db.models import Run, SerpResult, TrackedHit, TrackedSite
+from serp_monitor.services.data_versions import SERP, bump_data_versions
+
+
+def backfill_tracked_hits(session: Session) -> dict[str, Any]:
+    """Create tracked_hits for past results of every site not backfilled yet.
+
+    Runs only detect hits of sites tracked when they start, so a newly
+    starred or redirect-added site has no history. One INSERT ... SELECT
+    over serp_results by domain covers all such sites. Hits are stamped
+    with the backfill's time as detected_at, which incremental exports key
+    on, and keep the result's created_at as observed_at; results that
+    already have a hit of the site are skipped. A run that started before a
+    site was tracked and finished after its backfill matched against the
+    old list, so the site is backfilled again to cover that run's results.
+    Pending sites are locked SKIP LOCKED, so concurrent backfills do not
+    repeat each other's work.
+    """
+    missed_run = exists().where(
+        Run.started_at < TrackedSite.created_at,
+        Run.finished_at > TrackedSite.hits_backfilled_at,
+    )
+    site_ids = list(
+        session.execute(
+            select(TrackedSite.id)
+            .where(or_(TrackedSite.hits_backfilled_at.is_(None), missed_run))
+            .with_for_update(skip_locked=True)
+        ).scalars()
+    )
+    if not site_ids:
+        session.rollback()
+        return {"sites": 0, "hits": 0}
+
+    already_hit = exists().where(
+        TrackedHit.tracked_site_id == TrackedSite.id,
+        TrackedHit.run_id == SerpResult.run_id,
+        TrackedHit.keyword_id == SerpResult.keyword_id,
+        TrackedHit.position == SerpResult.position,
+    )
+    history = (
+        select(
+            TrackedSite.id,
+            SerpResult.run_id,
+            SerpResult.keyword_id,
+            SerpResult.position,
+            SerpResult.link,
+            SerpResult.created_at,
+        )
+        .join(SerpResult, SerpResult.domain == TrackedSite.domain)
+        .where(TrackedSite.id.in_(site_ids), ~already_hit)
+    )
+    hits = session.execute(
+        insert(TrackedHit).from_select(
+            ["tracked_site_id", "run_id", "keyword_id", "position", "url", "observed_at"], history
+        ),
+        # INSERT rowcount is dropped unless asked for
+        execution_options={"preserve_rowcount": True},
+    ).rowcount
+    session.execute(
+        update(TrackedSite).where(TrackedSite.id.in_(site_ids)).values(hits_backfilled_at=func.now())
+    )
+    if hits:
+        bump_data_versions(session, SERP)
+    session.commit()
+    return {"sites": len(site_ids), "hits": hits}
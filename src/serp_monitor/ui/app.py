@@ -6,11 +6,13 @@ import sys
 
 import os
 from pathlib import Path
+from typing import Any, Callable
 
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from sqlalchemy import desc, select, func
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
 
 # Ensure src/ is on sys.path for Streamlit Cloud
 _src_path = Path(__file__).resolve().parents[2]
@@ -19,13 +21,16 @@ if str(_src_path) not in sys.path:
 
 from serp_monitor.config.settings import get_settings
 from serp_monitor.db.models import (
+    Job,
+    JobStatus,
     Keyword,
     KeywordSchedule,
     PageTag,
-    Run,
-    RunStatus,
+    PageTagCheck,
+    RunKeyword,
     SchedulerStatus,
     SerpResult,
+    SiteStatus,
     TrackedHit,
     TrackedSite,
     WatchUrl,
@@ -34,10 +39,27 @@ from serp_monitor.db.models import (
     CanonicalFavorite,
     RedirectEvent,
 )
-from serp_monitor.db.session import get_session
-from serp_monitor.providers.serper import SerperClient
-from serp_monitor.services.serp_service import SerpService
-from serp_monitor.services.tag_service import TagService
+from serp_monitor.db.session import get_read_session, get_session
+from serp_monitor.services.data_versions import CONFIG, SERP, TAGS, bump_data_versions, load_data_versions
+from serp_monitor.services.analytics import load_positions, rank_events, rank_summary, ranking_series
+from serp_monitor.services.jobs import (
+    ACTIVE_STATUSES,
+    BACKFILL_TRACKED_HITS,
+    CHECK_REDIRECTS,
+    CHECK_TAGS,
+    FETCH_TOP10,
+    recent_jobs,
+    submit_job,
+)
+from serp_monitor.services.queries import (
+    history_page,
+    history_run_count,
+    latest_page_tags,
+    load_tracked_hits,
+)
+from serp_monitor.services.query_cache import QueryCache
+from serp_monitor.services.redirect_graph import RedirectGraph
+from serp_monitor.services.site_status import preferred_tags
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from serp_monitor.utils.urls import extract_domain
@@ -132,7 +154,7 @@ def _get_or_create_keyword(session, query: str, region: str, language: str) -> K
     row = Keyword(keyword=query, region=region, language=language, proxy_profile=None)
     session.add(row)
     session.flush()
-    session.commit()
+    _commit_config(session)
     return row
 
 
@@ -145,21 +167,6 @@ def _load_run_results(session, run_id: int) -> list[SerpResult]:
     return list(session.execute(stmt).scalars())
 
 
-def _load_latest_page_tag(session, run_id: int, url: str) -> PageTag | None:
-    watch = session.execute(
-        select(WatchUrl).where(WatchUrl.url == url)
-    ).scalar_one_or_none()
-    if not watch:
-        return None
-    stmt = (
-        select(PageTag)
-        .where(PageTag.run_id == run_id, PageTag.watch_url_id == watch.id)
-        .order_by(PageTag.id.desc())
-        .limit(1)
-    )
-    return session.execute(stmt).scalar_one_or_none()
-
-
 def _extract_tag_block(raw: dict | None, key: str) -> dict | None:
     if not isinstance(raw, dict):
         return None
@@ -169,55 +176,12 @@ def _extract_tag_block(raw: dict | None, key: str) -> dict | None:
     return None
 
 
-def _build_redirect_chain(session, domain: str) -> list[str]:
-    chain = [domain]
-    seen = {domain}
-
-    # upstream: who redirected to this domain
-    current = domain
-    while True:
-        ev = (
-            session.query(RedirectEvent)
-            .filter(
-                RedirectEvent.final_domain == current,
-                RedirectEvent.source_domain != current,
-            )
-            .order_by(RedirectEvent.observed_at.asc())
-            .first()
-        )
-        if not ev or not ev.source_domain or ev.source_domain in seen:
-            break
-        chain.insert(0, ev.source_domain)
-        seen.add(ev.source_domain)
-        current = ev.source_domain
-
-    # downstream: where this domain redirects to now (latest change)
-    current = domain
-    while True:
-        ev = (
-            session.query(RedirectEvent)
-            .filter(
-                RedirectEvent.source_domain == current,
-                RedirectEvent.final_domain != current,
-            )
-            .order_by(RedirectEvent.observed_at.desc())
-            .first()
-        )
-        if not ev or not ev.final_domain or ev.final_domain in seen:
-            break
-        chain.append(ev.final_domain)
-        seen.add(ev.final_domain)
-        current = ev.final_domain
-
-    return chain
-
-
 def _build_canonical_chain(session, domain: str) -> list[str]:
     chain = [domain]
     last = domain
     edges = (
         session.query(CanonicalEdge)
-        .filter(CanonicalEdge.source_url.contains(domain))
+        .filter(CanonicalEdge.source_domain == domain)
         .order_by(CanonicalEdge.observed_at.asc())
         .all()
     )
@@ -233,13 +197,13 @@ def _build_canonical_chain(session, domain: str) -> list[str]:
 def _find_canonical_origin_domain(session, domain: str) -> str | None:
     ev = (
         session.query(CanonicalEdge)
-        .filter(CanonicalEdge.canonical_url.contains(domain))
+        .filter(CanonicalEdge.canonical_domain == domain)
         .order_by(CanonicalEdge.observed_at.asc())
         .first()
     )
     if not ev:
         return None
-    return extract_domain(ev.source_url)
+    return ev.source_domain
 
 
 def _is_failure(block: dict | None) -> bool:
@@ -262,7 +226,7 @@ def _is_mismatch(bot: dict | None, google: dict | None) -> bool:
 def _scheduler_status_block() -> None:
     st.subheader("Scheduler Status")
     try:
-        with get_session() as session:
+        with get_read_session("ui") as session:
             status = session.get(SchedulerStatus, "keyword-scheduler")
     except Exception as exc:  # noqa: BLE001
         st.error(f"Failed to load scheduler status: {exc}")
@@ -307,14 +271,6 @@ def _render_tag_block(tag_data: dict | None, label: str) -> None:
         st.write(f"{label} hreflang: —")
 
 
-def _pick_preferred_tags(google: dict | None, bot: dict | None) -> tuple[str | None, dict | None]:
-    google = google or {}
-    bot = bot or {}
-    canonical = google.get("canonical") or bot.get("canonical")
-    hreflang = google.get("hreflang") or bot.get("hreflang")
-    return canonical, hreflang
-
-
 def _has_tag_mismatch(google: dict | None, bot: dict | None) -> bool:
     google = google or {}
     bot = bot or {}
@@ -337,1460 +293,1532 @@ def _mismatch_details(google: dict | None, bot: dict | None) -> str:
 def _render_cell(value: str) -> None:
     st.write(value)
 
-def _load_history(session, limit: int = 50, offset: int = 0) -> list[Run]:
-    stmt = select(Run).order_by(desc(Run.id)).limit(limit).offset(offset)
-    return list(session.execute(stmt).scalars())
+@st.cache_resource
+def _query_cache() -> QueryCache:
+    return QueryCache()
+
+
+def _refresh_data_versions() -> dict[str, int]:
+    with get_read_session("ui") as session:
+        versions = load_data_versions(session)
+    st.session_state["data_versions"] = versions
+    return versions
+
+
+def _cached(key: tuple, scopes: tuple[str, ...], loader: Callable[[Session], Any]) -> Any:
+    """``loader`` result from the shared query cache, reloaded once a scope's data version moves.
+
+    Versions are read once per rerun (see ``main``), so the cached value is
+    never older than the data at the start of the rerun.
+    """
+    versions = st.session_state.get("data_versions") or _refresh_data_versions()
+
+    def _load() -> Any:
+        with get_read_session("ui") as session:
+            return loader(session)
+
+    return _query_cache().get_or_load(key, tuple(versions[scope] for scope in scopes), _load)
+
+
+@st.cache_resource
+def _redirect_graph_index() -> RedirectGraph:
+    return RedirectGraph()
+
+
+def _redirect_graph() -> RedirectGraph:
+    """Shared redirect graph, refreshed once per move of the tags data version."""
+    graph = _redirect_graph_index()
+    _cached(("redirect_graph",), (TAGS,), graph.refresh)
+    return graph
+
+
+def _commit_config(session: Session) -> None:
+    """Commit a UI edit of keywords, schedules or favorites and invalidate cached reads."""
+    bump_data_versions(session, CONFIG)
+    session.commit()
+    _refresh_data_versions()
+
+
+def _cached_history_count(keyword: str | None, region: str | None) -> int:
+    return _cached(
+        ("history_count", keyword, region),
+        (SERP, CONFIG),
+        lambda session: history_run_count(session, keyword=keyword, region=region),
+    )
 
 
-@st.cache_data(ttl=30)
 def _cached_keywords() -> list[str]:
-    with get_session() as session:
-        return session.execute(select(Keyword.keyword).distinct().order_by(Keyword.keyword)).scalars().all()
+    return _cached(
+        ("keywords",),
+        (CONFIG,),
+        lambda session: session.execute(
+            select(Keyword.keyword).distinct().order_by(Keyword.keyword)
+        ).scalars().all(),
+    )
 
 
-@st.cache_data(ttl=30)
 def _cached_regions() -> list[str]:
-    with get_session() as session:
-        return session.execute(select(Keyword.region).distinct().order_by(Keyword.region)).scalars().all()
+    return _cached(
+        ("regions",),
+        (CONFIG,),
+        lambda session: session.execute(
+            select(Keyword.region).distinct().order_by(Keyword.region)
+        ).scalars().all(),
+    )
 
 
-@st.cache_data(ttl=30)
-def _cached_tracked_domains() -> set[str]:
-    with get_session() as session:
-        return {site.domain for site in session.query(TrackedSite).all()}
+def _cached_tracked_domains() -> frozenset[str]:
+    # Redirect checks add the final domains as tracked sites
+    return _cached(
+        ("tracked_domains",),
+        (CONFIG, TAGS),
+        lambda session: frozenset(session.execute(select(TrackedSite.domain)).scalars()),
+    )
 
 
-def main() -> None:
-    root = _find_project_root()
-    if root is not None:
-        load_dotenv(root / ".env")
+def _cached_run_results(run_id: int) -> tuple[list[SerpResult], list[PageTag], dict[int, Keyword]]:
+    def _load(session: Session) -> tuple[list[SerpResult], list[PageTag], dict[int, Keyword]]:
+        rows = _load_run_results(session, run_id)
+        tag_rows = list(
+            session.execute(
+                select(PageTag)
+                .join(PageTagCheck, PageTagCheck.page_tag_id == PageTag.id)
+                .where(PageTagCheck.run_id == run_id)
+            ).scalars()
+        )
+        keyword_ids = {row.keyword_id for row in rows}
+        keywords = {
+            keyword.id: keyword
+            for keyword in session.execute(select(Keyword).where(Keyword.id.in_(keyword_ids))).scalars()
+        }
+        return rows, tag_rows, keywords
 
-    st.set_page_config(page_title="SERP Analyzer", layout="wide")
-    st.title("SERP Analyzer")
-    st.write("Quick Serper.dev query and top 10 organic results.")
-    if not os.getenv("DATABASE_URL"):
-        st.warning("DATABASE_URL is not set. Add it to .env to enable history.")
+    return _cached(("run_results", run_id), (SERP, TAGS, CONFIG), _load)
 
-    tabs = st.tabs(["New Query", "History", "Keywords", "Sites", "Canonical", "Reports", "Settings"])
 
-    with tabs[0]:
-        with st.form("serp_form"):
-            query = st.text_input("Keyword", value="aviator")
-            region = st.selectbox("Region", REGIONS, index=REGIONS.index("IN"))
-            language = st.selectbox("Language", LANGUAGES, index=LANGUAGES.index("EN"))
-            submitted = st.form_submit_button("Fetch Top 10")
+# How often a queued / running job's panel polls for progress
+JOB_POLL_SECONDS = 2
 
-        if submitted:
-            if not query.strip():
-                st.error("Please enter a keyword")
-            else:
-                try:
-                    settings = get_settings()
-                    client = SerperClient(settings)
-                    service = SerpService(client)
-
-                    with get_session() as session:
-                        keyword = _get_or_create_keyword(session, query.strip(), region, language)
-                        run = service.run_keywords(session, [keyword], kind="ui")
-                        rows = _load_run_results(session, run.id)[:10]
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Request failed: {exc}")
-                    rows = []
 
-                if not rows:
-                    st.warning("No results")
-                else:
-                    table = [
-                        {
-                            "Position": row.position,
-                            "Title": row.title,
-                            "Link": row.link,
-                            "Snippet": row.snippet,
-                        }
-                        for row in rows
-                    ]
-                    st.dataframe(pd.DataFrame(table), width="stretch")
-
-    with tabs[1]:
-        try:
-            with get_session() as session:
-                total_runs = session.execute(select(func.count(Run.id))).scalar_one()
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load history: {exc}")
-            return
+def _submit_job(slot: str, kind: str, params: dict[str, Any]) -> None:
+    """Queue a background job and remember it under ``slot`` for this browser session."""
+    with get_session("ui") as session:
+        job = submit_job(session, kind, params)
+        session.commit()
+        st.session_state.setdefault("jobs", {})[slot] = job.id
 
-        if not total_runs:
-            st.info("History is empty yet.")
-            return
 
-        keyword_values = _cached_keywords()
-        region_values = _cached_regions()
+def _load_job(job_id: int) -> Job | None:
+    # Primary, not the replica: progress changes every few seconds
+    with get_session("ui") as session:
+        return session.get(Job, job_id)
 
-        filter_cols = st.columns([2, 2])
-        with filter_cols[0]:
-            selected_keyword_filter = st.selectbox(
-                "Filter by keyword",
-                options=["All"] + keyword_values,
-                index=0,
-            )
-        with filter_cols[1]:
-            selected_region_filter = st.selectbox(
-                "Filter by region",
-                options=["All"] + region_values,
-                index=0,
-            )
 
-        with get_session() as session:
-            base_stmt = select(Run).order_by(desc(Run.id))
-            if selected_keyword_filter != "All" or selected_region_filter != "All":
-                base_stmt = (
-                    select(Run)
-                    .join(SerpResult, SerpResult.run_id == Run.id)
-                    .join(Keyword, Keyword.id == SerpResult.keyword_id)
-                )
-                if selected_keyword_filter != "All":
-                    base_stmt = base_stmt.where(Keyword.keyword == selected_keyword_filter)
-                if selected_region_filter != "All":
-                    base_stmt = base_stmt.where(Keyword.region == selected_region_filter)
-                base_stmt = base_stmt.order_by(desc(Run.id)).distinct()
-
-            total_runs = session.execute(
-                select(func.count()).select_from(base_stmt.subquery())
-            ).scalar_one()
-
-        page_size = st.selectbox("Page size", [25, 50, 100], index=1)
-        total_pages = max(1, (total_runs + page_size - 1) // page_size)
-        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1)
-        offset = (page - 1) * page_size
-
-        with get_session() as session:
-            history = list(
-                session.execute(base_stmt.limit(page_size).offset(offset)).scalars()
-            )
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_progress(job_id: int) -> None:
+    job = _load_job(job_id)
+    if job is None or job.status not in ACTIVE_STATUSES:
+        st.rerun()
+    if job.status == JobStatus.queued:
+        st.info(f"Job {job.id} queued, waiting for the scheduler (serp-scheduler).")
+    elif job.progress_total:
+        st.progress(
+            job.progress_done / job.progress_total,
+            text=f"Job {job.id}: {job.progress_done} / {job.progress_total}",
+        )
+    else:
+        st.info(f"Job {job.id} running since {job.started_at}.")
 
-        run_ids = [run.id for run in history]
-        run_meta = {}
-        if run_ids:
-            with get_session() as session:
-                rows = session.execute(
-                    select(
-                        SerpResult.run_id,
-                        Keyword.keyword,
-                        Keyword.region,
-                        Keyword.language,
-                    )
-                    .join(Keyword, Keyword.id == SerpResult.keyword_id)
-                    .where(SerpResult.run_id.in_(run_ids))
-                ).all()
-            for run_id, keyword, region, language in rows:
-                meta = run_meta.setdefault(run_id, {"keywords": set(), "regions": set(), "languages": set()})
-                if keyword:
-                    meta["keywords"].add(keyword)
-                if region:
-                    meta["regions"].add(region)
-                if language:
-                    meta["languages"].add(language)
-
-        run_table = []
-        for run in history:
-            meta = run_meta.get(run.id, {})
-            keywords = ", ".join(sorted(meta.get("keywords", [])))
-            regions = ", ".join(sorted(meta.get("regions", [])))
-            languages = ", ".join(sorted(meta.get("languages", [])))
-            run_table.append(
-                {
-                    "Run ID": run.id,
-                    "Kind": run.kind,
-                    "Status": run.status,
-                    "Keyword(s)": keywords or "—",
-                    "Region(s)": regions or "—",
-                    "Language(s)": languages or "—",
-                    "Created At": run.created_at,
-                    "Started At": run.started_at,
-                    "Finished At": run.finished_at,
-                }
-            )
-        st.subheader("Runs")
-        st.dataframe(pd.DataFrame(run_table), width="stretch")
-        st.caption(f"Showing {offset + 1}–{min(offset + page_size, total_runs)} of {total_runs}")
-
-        options = {}
-        for run in history:
-            meta = run_meta.get(run.id, {})
-            keywords = ", ".join(sorted(meta.get("keywords", []))) or "—"
-            regions = ", ".join(sorted(meta.get("regions", []))) or "—"
-            options[
-                f"Run {run.id} • {run.kind} • {keywords} • {regions} • {run.created_at} • {run.status}"
-            ] = run.id
-        selected = st.selectbox("Select run", list(options.keys()))
-        run_id = options[selected]
-        run_obj = next((r for r in history if r.id == run_id), None)
-
-        with get_session() as session:
-            rows = _load_run_results(session, run_id)
-            tag_rows = list(
-                session.execute(select(PageTag).where(PageTag.run_id == run_id)).scalars()
-            )
 
-        if not rows:
-            st.warning("No results for this run")
-            return
+def _job_block(slot: str) -> Job | None:
+    """Show the state of the job in ``slot``, return it once it has succeeded.
 
-        total_checked = len(tag_rows)
-        failures = 0
-        mismatches = 0
-        for tag in tag_rows:
-            raw = tag.raw or {}
-            bot_block = _extract_tag_block(raw, "bot")
-            google_block = _extract_tag_block(raw, "googlebot")
-            if _is_failure(bot_block) or _is_failure(google_block):
-                failures += 1
-            if _is_mismatch(bot_block, google_block):
-                mismatches += 1
-
-        st.subheader("Tag Check Summary")
-        st.write(f"Checked: {total_checked} / {len(rows)}")
-        st.write(f"Failures: {failures}")
-        st.write(f"Mismatches: {mismatches}")
+    While the job is queued or running only a small fragment reruns to poll
+    it; the whole script reruns once when it finishes.
+    """
+    job_id = st.session_state.get("jobs", {}).get(slot)
+    if job_id is None:
+        return None
+    job = _load_job(job_id)
+    if job is None:
+        return None
+    if job.status in ACTIVE_STATUSES:
+        _job_progress(job_id)
+        return None
+    if job.status == JobStatus.failed:
+        st.error(f"Job {job.id} failed: {job.error}")
+        return None
+    return job
 
-        keyword_map = {}
-        for row in rows:
-            keyword_map.setdefault(row.keyword_id, row)
 
-        keyword_options = {}
-        with get_session() as session:
-            for row in rows:
-                keyword = session.get(Keyword, row.keyword_id)
-                if keyword:
-                    label = f"{keyword.keyword} • {keyword.region}/{keyword.language}"
-                    keyword_options[label] = keyword.id
-        selected_keyword = st.selectbox("Keyword", list(keyword_options.keys()))
-        selected_keyword_id = keyword_options[selected_keyword]
-
-        filtered_rows = [r for r in rows if r.keyword_id == selected_keyword_id]
-        if not filtered_rows:
-            st.info("No results for selected keyword.")
-            return
+def _render_new_query_view() -> None:
+    with st.form("serp_form"):
+        query = st.text_input("Keyword", value="aviator")
+        region = st.selectbox("Region", REGIONS, index=REGIONS.index("IN"))
+        language = st.selectbox("Language", LANGUAGES, index=LANGUAGES.index("EN"))
+        submitted = st.form_submit_button("Fetch Top 10")
+
+    if submitted:
+        if not query.strip():
+            st.error("Please enter a keyword")
+        else:
+            try:
+                with get_session("ui") as session:
+                    keyword = _get_or_create_keyword(session, query.strip(), region, language)
+                    keyword_id = keyword.id
+                _submit_job("fetch_top10", FETCH_TOP10, {"keyword_id": keyword_id})
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Request failed: {exc}")
+
+    job = _job_block("fetch_top10")
+    if job is None:
+        return
+    # Primary, not the cached replica read: the run has only just been written
+    with get_session("ui") as session:
+        rows = _load_run_results(session, job.result["run_id"])[:10]
+    if not rows:
+        st.warning("No results")
+    else:
+        table = [
+            {
+                "Position": row.position,
+                "Title": row.title,
+                "Link": row.link,
+                "Snippet": row.snippet,
+            }
+            for row in rows
+        ]
+        st.dataframe(pd.DataFrame(table), width="stretch")
 
-        with get_session() as session:
-            keyword = session.get(Keyword, selected_keyword_id)
-        st.markdown(
-            f"**Run ID:** {run_id}  \n"
-            f"**Keyword:** {keyword.keyword if keyword else '—'}  \n"
-            f"**Region:** {keyword.region if keyword else '—'}  \n"
-            f"**Date:** {run_obj.created_at.date() if run_obj else '—'}  \n"
-            f"**Time:** {run_obj.created_at.time() if run_obj else '—'}"
+
+def _render_history_view() -> None:
+    try:
+        total_runs = _cached_history_count(None, None)
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load history: {exc}")
+        return
+
+    if not total_runs:
+        st.info("History is empty yet.")
+        return
+
+    keyword_values = _cached_keywords()
+    region_values = _cached_regions()
+
+    filter_cols = st.columns([2, 2])
+    with filter_cols[0]:
+        selected_keyword_filter = st.selectbox(
+            "Filter by keyword",
+            options=["All"] + keyword_values,
+            index=0,
+        )
+    with filter_cols[1]:
+        selected_region_filter = st.selectbox(
+            "Filter by region",
+            options=["All"] + region_values,
+            index=0,
         )
+    keyword_filter = None if selected_keyword_filter == "All" else selected_keyword_filter
+    region_filter = None if selected_region_filter == "All" else selected_region_filter
+
+    page_size = st.selectbox("Page size", [25, 50, 100], index=1)
+
+    # Keyset cursor: ("before", id) for older pages, ("after", id) for newer ones
+    cursor_scope = (keyword_filter, region_filter, page_size)
+    if st.session_state.get("history_cursor_scope") != cursor_scope:
+        st.session_state["history_cursor_scope"] = cursor_scope
+        st.session_state["history_cursor"] = None
+    cursor = st.session_state.get("history_cursor")
+
+    with get_read_session("ui") as session:
+        history, has_newer, has_older = history_page(
+            session,
+            page_size,
+            keyword=keyword_filter,
+            region=region_filter,
+            before_id=cursor[1] if cursor and cursor[0] == "before" else None,
+            after_id=cursor[1] if cursor and cursor[0] == "after" else None,
+        )
+    if keyword_filter or region_filter:
+        total_runs = _cached_history_count(keyword_filter, region_filter)
+
+    nav_cols = st.columns([1, 1, 4])
+    with nav_cols[0]:
+        if st.button("← Newer", disabled=not has_newer or not history, key="history_newer"):
+            st.session_state["history_cursor"] = ("after", history[0].id)
+            st.rerun()
+    with nav_cols[1]:
+        if st.button("Older →", disabled=not has_older or not history, key="history_older"):
+            st.session_state["history_cursor"] = ("before", history[-1].id)
+            st.rerun()
+
+    run_ids = [run.id for run in history]
+    run_meta = {}
+    if run_ids:
+        with get_read_session("ui") as session:
+            rows = session.execute(
+                select(
+                    RunKeyword.run_id,
+                    Keyword.keyword,
+                    Keyword.region,
+                    Keyword.language,
+                )
+                .join(Keyword, Keyword.id == RunKeyword.keyword_id)
+                .where(RunKeyword.run_id.in_(run_ids))
+            ).all()
+        for run_id, keyword, region, language in rows:
+            meta = run_meta.setdefault(run_id, {"keywords": set(), "regions": set(), "languages": set()})
+            if keyword:
+                meta["keywords"].add(keyword)
+            if region:
+                meta["regions"].add(region)
+            if language:
+                meta["languages"].add(language)
+
+    run_table = []
+    for run in history:
+        meta = run_meta.get(run.id, {})
+        keywords = ", ".join(sorted(meta.get("keywords", [])))
+        regions = ", ".join(sorted(meta.get("regions", [])))
+        languages = ", ".join(sorted(meta.get("languages", [])))
+        run_table.append(
+            {
+                "Run ID": run.id,
+                "Kind": run.kind,
+                "Status": run.status,
+                "Keyword(s)": keywords or "—",
+                "Region(s)": regions or "—",
+                "Language(s)": languages or "—",
+                "Created At": run.created_at,
+                "Started At": run.started_at,
+                "Finished At": run.finished_at,
+            }
+        )
+    st.subheader("Runs")
+    st.dataframe(pd.DataFrame(run_table), width="stretch")
+    if history:
+        st.caption(f"Showing runs {history[0].id}–{history[-1].id} of ~{total_runs}")
+
+    options = {}
+    for run in history:
+        meta = run_meta.get(run.id, {})
+        keywords = ", ".join(sorted(meta.get("keywords", []))) or "—"
+        regions = ", ".join(sorted(meta.get("regions", []))) or "—"
+        options[
+            f"Run {run.id} • {run.kind} • {keywords} • {regions} • {run.created_at} • {run.status}"
+        ] = run.id
+    selected = st.selectbox("Select run", list(options.keys()))
+    run_id = options[selected]
+    run_obj = next((r for r in history if r.id == run_id), None)
+
+    rows, tag_rows, run_keywords = _cached_run_results(run_id)
+
+    if not rows:
+        st.warning("No results for this run")
+        return
 
-        tag_map = {}
-        tracked_domains = _cached_tracked_domains()
-        with get_session() as session:
-            for row in filtered_rows:
-                existing = _load_latest_page_tag(session, run_id, row.link)
-                if existing:
-                    raw = existing.raw or {}
-                    tag_map[row.link] = {
-                        "bot": _extract_tag_block(raw, "bot")
-                        or {"canonical": existing.canonical, "hreflang": existing.hreflang},
-                        "googlebot": _extract_tag_block(raw, "googlebot"),
-                    }
+    total_checked = len(tag_rows)
+    failures = 0
+    mismatches = 0
+    for tag in tag_rows:
+        raw = tag.raw or {}
+        bot_block = _extract_tag_block(raw, "bot")
+        google_block = _extract_tag_block(raw, "googlebot")
+        if _is_failure(bot_block) or _is_failure(google_block):
+            failures += 1
+        if _is_mismatch(bot_block, google_block):
+            mismatches += 1
+
+    st.subheader("Tag Check Summary")
+    st.write(f"Checked: {total_checked} / {len(rows)}")
+    st.write(f"Failures: {failures}")
+    st.write(f"Mismatches: {mismatches}")
+
+    keyword_map = {}
+    for row in rows:
+        keyword_map.setdefault(row.keyword_id, row)
+
+    keyword_options = {}
+    for row in rows:
+        keyword = run_keywords.get(row.keyword_id)
+        if keyword:
+            label = f"{keyword.keyword} • {keyword.region}/{keyword.language}"
+            keyword_options[label] = keyword.id
+    selected_keyword = st.selectbox("Keyword", list(keyword_options.keys()))
+    selected_keyword_id = keyword_options[selected_keyword]
+
+    filtered_rows = [r for r in rows if r.keyword_id == selected_keyword_id]
+    if not filtered_rows:
+        st.info("No results for selected keyword.")
+        return
 
-        st.subheader("Results Table")
-        header_cols = st.columns([1, 3, 3, 3, 2, 2, 2, 3, 1, 1])
-        headers = [
-            "Position",
-            "URL",
-            "Meta Title",
-            "Meta Description",
-            "Canonical",
-            "Hreflang",
-            "Mismatch",
-            "Mismatch Details",
-            "Check",
-            "★",
-        ]
-        for col, title in zip(header_cols, headers, strict=False):
-            col.markdown(f"**{title}**")
-
-        for row in filtered_rows:
-            tags = tag_map.get(row.link, {})
-            bot = tags.get("bot") or {}
-            google = tags.get("googlebot") or {}
-            domain = extract_domain(row.link)
-            is_favorite = domain in tracked_domains
-            canonical, hreflang = _pick_preferred_tags(google, bot)
-            mismatch = _has_tag_mismatch(google, bot)
-
-            cols = st.columns([1, 3, 3, 3, 2, 2, 2, 3, 1, 1])
-            _render_cell(str(row.position))
-            with cols[1]:
-                _render_cell(row.link)
-            with cols[2]:
-                _render_cell(row.title or "—")
-            with cols[3]:
-                _render_cell(row.snippet or "—")
-            with cols[4]:
-                _render_cell(canonical or "—")
-            with cols[5]:
-                _render_cell(str(hreflang or "—"))
-            with cols[6]:
-                if mismatch:
-                    cols[6].markdown("<span style='color:#d32f2f;font-weight:600'>есть расхождения</span>", unsafe_allow_html=True)
-                else:
-                    _render_cell("—")
+    keyword = run_keywords.get(selected_keyword_id)
+    st.markdown(
+        f"**Run ID:** {run_id}  \n"
+        f"**Keyword:** {keyword.keyword if keyword else '—'}  \n"
+        f"**Region:** {keyword.region if keyword else '—'}  \n"
+        f"**Date:** {run_obj.created_at.date() if run_obj else '—'}  \n"
+        f"**Time:** {run_obj.created_at.time() if run_obj else '—'}"
+    )
 
-            with cols[7]:
-                if mismatch:
-                    st.text(_mismatch_details(google, bot))
-                else:
-                    _render_cell("—")
+    tag_map = {}
+    tracked_domains = _cached_tracked_domains()
+    with get_read_session("ui") as session:
+        latest = latest_page_tags(session, [row.link for row in filtered_rows], run_id=run_id)
+    for link, existing in latest.items():
+        raw = existing.raw or {}
+        tag_map[link] = {
+            "bot": _extract_tag_block(raw, "bot")
+            or {"canonical": existing.canonical, "hreflang": existing.hreflang},
+            "googlebot": _extract_tag_block(raw, "googlebot"),
+        }
+
+    st.subheader("Results Table")
+    header_cols = st.columns([1, 3, 3, 3, 2, 2, 2, 3, 1, 1])
+    headers = [
+        "Position",
+        "URL",
+        "Meta Title",
+        "Meta Description",
+        "Canonical",
+        "Hreflang",
+        "Mismatch",
+        "Mismatch Details",
+        "Check",
+        "★",
+    ]
+    for col, title in zip(header_cols, headers, strict=False):
+        col.markdown(f"**{title}**")
+
+    for row in filtered_rows:
+        tags = tag_map.get(row.link, {})
+        bot = tags.get("bot") or {}
+        google = tags.get("googlebot") or {}
+        domain = extract_domain(row.link)
+        is_favorite = domain in tracked_domains
+        canonical, hreflang = preferred_tags(google, bot)
+        mismatch = _has_tag_mismatch(google, bot)
+
+        cols = st.columns([1, 3, 3, 3, 2, 2, 2, 3, 1, 1])
+        _render_cell(str(row.position))
+        with cols[1]:
+            _render_cell(row.link)
+        with cols[2]:
+            _render_cell(row.title or "—")
+        with cols[3]:
+            _render_cell(row.snippet or "—")
+        with cols[4]:
+            _render_cell(canonical or "—")
+        with cols[5]:
+            _render_cell(str(hreflang or "—"))
+        with cols[6]:
+            if mismatch:
+                cols[6].markdown("<span style='color:#d32f2f;font-weight:600'>есть расхождения</span>", unsafe_allow_html=True)
+            else:
+                _render_cell("—")
 
-            if cols[8].button("Check Tags", key=f"check_{row.id}"):
-                try:
-                    settings = get_settings()
-                    service = TagService(settings)
-                    with get_session() as session:
-                        tag = service.check_url(
-                            session,
-                            run_id,
-                            row.link,
-                            region=None,
-                            language=(keyword.language if keyword else None),
-                        )
-                    st.success("Tags fetched")
-                    _render_tag_block(tag.get("bot"), "Bot")
-                    _render_tag_block(tag.get("googlebot"), "Googlebot")
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Tag check failed: {exc}")
-
-            star_label = "★" if is_favorite else "☆"
-            if cols[9].button(
-                star_label,
-                key=f"star_{row.id}",
-                type="primary" if is_favorite else "secondary",
-            ):
-                try:
-                    with get_session() as session:
-                        existing = (
-                            session.query(TrackedSite)
-                            .filter(TrackedSite.domain == domain)
-                            .one_or_none()
-                        )
-                        if existing:
-                            session.delete(existing)
-                            session.commit()
-                            st.success(f"Removed {domain} from favorites")
-                        else:
-                            session.add(TrackedSite(domain=domain))
-                            session.commit()
-                            st.success(f"Added {domain} to favorites")
-                    st.rerun()
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Failed to track site: {exc}")
-
-    with tabs[2]:
-        st.subheader("Keyword Manager")
-        try:
-            with get_session() as session:
-                keywords = list(
-                    session.execute(
-                        select(Keyword).order_by(Keyword.id.desc()).limit(200)
-                    ).scalars()
+        with cols[7]:
+            if mismatch:
+                st.text(_mismatch_details(google, bot))
+            else:
+                _render_cell("—")
+
+        if cols[8].button("Check Tags", key=f"check_{row.id}"):
+            try:
+                _submit_job(
+                    f"check_tags_{row.id}",
+                    CHECK_TAGS,
+                    {
+                        "run_id": run_id,
+                        "url": row.link,
+                        "region": None,
+                        "language": keyword.language if keyword else None,
+                    },
                 )
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load keywords: {exc}")
-            return
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Tag check failed: {exc}")
+        tag_job = _job_block(f"check_tags_{row.id}")
+        if tag_job is not None:
+            st.success("Tags fetched")
+            _render_tag_block(tag_job.result.get("bot"), "Bot")
+            _render_tag_block(tag_job.result.get("googlebot"), "Googlebot")
+
+        star_label = "★" if is_favorite else "☆"
+        if cols[9].button(
+            star_label,
+            key=f"star_{row.id}",
+            type="primary" if is_favorite else "secondary",
+        ):
+            try:
+                with get_session("ui") as session:
+                    existing = (
+                        session.query(TrackedSite)
+                        .filter(TrackedSite.domain == domain)
+                        .one_or_none()
+                    )
+                    if existing:
+                        session.query(TrackedHit).filter(
+                            TrackedHit.tracked_site_id == existing.id
+                        ).delete()
+                        session.delete(existing)
+                        _commit_config(session)
+                        st.success(f"Removed {domain} from favorites")
+                    else:
+                        session.add(TrackedSite(domain=domain))
+                        _commit_config(session)
+                        st.success(f"Added {domain} to favorites")
+                if not existing:
+                    # Hits of the domain's past results, found in the background
+                    _submit_job("backfill_tracked_hits", BACKFILL_TRACKED_HITS, {})
+                st.rerun()
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Failed to track site: {exc}")
 
-        if keywords:
-            table = [
-                {
-                    "ID": row.id,
-                    "Keyword": row.keyword,
-                    "Region": row.region,
-                    "Language": row.language,
-                    "Proxy": row.proxy_profile,
-                }
-                for row in keywords
-            ]
-            st.dataframe(pd.DataFrame(table), width="stretch")
+
+def _render_keywords_view() -> None:
+    st.subheader("Keyword Manager")
+    try:
+        with get_read_session("ui") as session:
+            keywords = list(
+                session.execute(
+                    select(Keyword).order_by(Keyword.id.desc()).limit(200)
+                ).scalars()
+            )
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load keywords: {exc}")
+        return
+
+    if keywords:
+        table = [
+            {
+                "ID": row.id,
+                "Keyword": row.keyword,
+                "Region": row.region,
+                "Language": row.language,
+                "Proxy": row.proxy_profile,
+            }
+            for row in keywords
+        ]
+        st.dataframe(pd.DataFrame(table), width="stretch")
+    else:
+        st.info("No keywords yet.")
+
+    st.divider()
+    st.write("Add new keyword")
+    with st.form("keyword_create"):
+        new_keyword = st.text_input("Keyword", value="")
+        new_region = st.selectbox("Region", REGIONS, index=REGIONS.index("IN"))
+        new_language = st.selectbox("Language", LANGUAGES, index=LANGUAGES.index("EN"))
+        submitted = st.form_submit_button("Create")
+
+    if submitted:
+        if not new_keyword.strip():
+            st.error("Keyword is required")
         else:
-            st.info("No keywords yet.")
+            try:
+                with get_session("ui") as session:
+                    _get_or_create_keyword(
+                        session,
+                        new_keyword.strip(),
+                        new_region,
+                        new_language,
+                    )
+                st.success("Keyword saved")
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Failed to save keyword: {exc}")
+
+    st.divider()
+    st.write("Delete keyword")
+    if keywords:
+        options = {f"{row.id} • {row.keyword} • {row.region}/{row.language}": row.id for row in keywords}
+        selected = st.selectbox("Select keyword", list(options.keys()))
+        if st.button("Delete selected"):
+            try:
+                with get_session("ui") as session:
+                    row = session.get(Keyword, options[selected])
+                    if row:
+                        session.delete(row)
+                        _commit_config(session)
+                st.success("Keyword deleted")
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Failed to delete keyword: {exc}")
 
-        st.divider()
-        st.write("Add new keyword")
-        with st.form("keyword_create"):
-            new_keyword = st.text_input("Keyword", value="")
-            new_region = st.selectbox("Region", REGIONS, index=REGIONS.index("IN"))
-            new_language = st.selectbox("Language", LANGUAGES, index=LANGUAGES.index("EN"))
-            submitted = st.form_submit_button("Create")
-
-        if submitted:
-            if not new_keyword.strip():
-                st.error("Keyword is required")
-            else:
-                try:
-                    with get_session() as session:
-                        _get_or_create_keyword(
-                            session,
-                            new_keyword.strip(),
-                            new_region,
-                            new_language,
+    st.divider()
+    st.subheader("Keyword Schedules")
+    try:
+        with get_read_session("ui") as session:
+            schedules = list(
+                session.execute(
+                    select(KeywordSchedule).order_by(KeywordSchedule.id.desc()).limit(200)
+                ).scalars()
+            )
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load schedules: {exc}")
+        return
+
+    if schedules:
+        schedule_table = []
+        keyword_map = {}
+        with get_read_session("ui") as session:
+            for row in schedules:
+                keyword = session.get(Keyword, row.keyword_id)
+                keyword_map[row.id] = keyword
+                schedule_table.append(
+                    {
+                        "ID": row.id,
+                        "Keyword": keyword.keyword if keyword else "—",
+                        "Region": keyword.region if keyword else "—",
+                        "Language": keyword.language if keyword else "—",
+                        "Interval (h)": row.interval_hours,
+                        "Active": row.active,
+                        "Last Run": row.last_run_at,
+                        "Next Run": row.next_run_at,
+                    }
+                )
+        st.dataframe(pd.DataFrame(schedule_table), width="stretch")
+    else:
+        st.info("No schedules yet.")
+
+    st.write("Create or update schedule")
+    if keywords:
+        kw_options = {f"{row.id} • {row.keyword} • {row.region}/{row.language}": row.id for row in keywords}
+        selected_kw = st.selectbox("Keyword", list(kw_options.keys()))
+        interval = st.number_input("Interval (hours)", min_value=1, max_value=720, value=24, step=1)
+        active = st.checkbox("Active", value=True)
+        if st.button("Save schedule"):
+            try:
+                with get_session("ui") as session:
+                    existing = session.execute(
+                        select(KeywordSchedule).where(
+                            KeywordSchedule.keyword_id == kw_options[selected_kw]
+                        )
+                    ).scalar_one_or_none()
+                    settings = get_settings()
+                    now = datetime.now(ZoneInfo(settings.scheduler_tz))
+                    if existing:
+                        existing.interval_hours = int(interval)
+                        existing.active = bool(active)
+                        if existing.active:
+                            existing.next_run_at = now + timedelta(hours=int(interval))
+                        session.add(existing)
+                    else:
+                        schedule = KeywordSchedule(
+                            keyword_id=kw_options[selected_kw],
+                            interval_hours=int(interval),
+                            active=bool(active),
+                            next_run_at=now + timedelta(hours=int(interval)),
                         )
-                    st.success("Keyword saved")
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Failed to save keyword: {exc}")
+                        session.add(schedule)
+                    _commit_config(session)
+                st.success("Schedule saved")
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Failed to save schedule: {exc}")
+    else:
+        st.info("Create at least one keyword first.")
 
-        st.divider()
-        st.write("Delete keyword")
-        if keywords:
-            options = {f"{row.id} • {row.keyword} • {row.region}/{row.language}": row.id for row in keywords}
-            selected = st.selectbox("Select keyword", list(options.keys()))
-            if st.button("Delete selected"):
-                try:
-                    with get_session() as session:
-                        row = session.get(Keyword, options[selected])
-                        if row:
-                            session.delete(row)
-                            session.commit()
-                    st.success("Keyword deleted")
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Failed to delete keyword: {exc}")
 
-        st.divider()
-        st.subheader("Keyword Schedules")
-        try:
-            with get_session() as session:
-                schedules = list(
-                    session.execute(
-                        select(KeywordSchedule).order_by(KeywordSchedule.id.desc()).limit(200)
-                    ).scalars()
-                )
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load schedules: {exc}")
+def _render_sites_view() -> None:
+    st.subheader("Tracked Sites")
+    try:
+        with get_read_session("ui") as session:
+            sites = list(session.query(TrackedSite).order_by(TrackedSite.id.desc()).all())
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load tracked sites: {exc}")
+        return
+
+    if not sites:
+        st.info("No tracked sites yet. Use ★ in History to add.")
+    else:
+        st.write("Manual checks")
+        if st.button("Check redirects", key="check_redirects_btn"):
+            try:
+                _submit_job("check_redirects", CHECK_REDIRECTS, {})
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Redirect check failed: {exc}")
+        redirect_job = _job_block("check_redirects")
+        if redirect_job is not None:
+            st.success(f"Redirect check completed: {redirect_job.result['checked']} sites")
+
+        st.subheader("Site Filters")
+        col_a, col_b, col_c, col_d = st.columns(4)
+        with col_a:
+            rank_filter = st.selectbox(
+                "Top-10 now",
+                ["Any", "Yes", "No"],
+                key="site_filter_rank",
+            )
+        with col_b:
+            canonical_filter = st.selectbox(
+                "Canonical changed",
+                ["Any", "Yes", "No"],
+                key="site_filter_canonical",
+            )
+        with col_c:
+            hreflang_filter = st.selectbox(
+                "Hreflang changed",
+                ["Any", "Yes", "No"],
+                key="site_filter_hreflang",
+            )
+        with col_d:
+            redirect_filter = st.selectbox(
+                "Redirects",
+                ["Any", "Ever", "Now", "Never"],
+                key="site_filter_redirect",
+            )
+
+        # Flags come from the site_status summary kept up to date by ingestion and tag checks
+        status_filters = []
+        if rank_filter != "Any":
+            status_filters.append(
+                func.coalesce(SiteStatus.top10_now, False).is_(rank_filter == "Yes")
+            )
+        if canonical_filter != "Any":
+            status_filters.append(
+                func.coalesce(SiteStatus.canonical_changed, False).is_(canonical_filter == "Yes")
+            )
+        if hreflang_filter != "Any":
+            status_filters.append(
+                func.coalesce(SiteStatus.hreflang_changed, False).is_(hreflang_filter == "Yes")
+            )
+        if redirect_filter == "Ever":
+            status_filters.append(SiteStatus.redirect_ever.is_(True))
+        elif redirect_filter == "Now":
+            status_filters.append(SiteStatus.redirect_now.is_(True))
+        elif redirect_filter == "Never":
+            status_filters.append(func.coalesce(SiteStatus.redirect_ever, False).is_(False))
+
+        filtered_sites = _cached(
+            ("site_filter", rank_filter, canonical_filter, hreflang_filter, redirect_filter),
+            (SERP, TAGS, CONFIG),
+            lambda session: session.execute(
+                select(TrackedSite.id, TrackedSite.domain)
+                .outerjoin(SiteStatus, SiteStatus.domain == TrackedSite.domain)
+                .where(*status_filters)
+                .order_by(TrackedSite.id.desc())
+            ).all(),
+        )
+
+        if not filtered_sites:
+            st.info("No sites match current filters.")
             return
 
-        if schedules:
-            schedule_table = []
-            keyword_map = {}
-            with get_session() as session:
-                for row in schedules:
-                    keyword = session.get(Keyword, row.keyword_id)
-                    keyword_map[row.id] = keyword
-                    schedule_table.append(
+        site_options = {f"{s.id} • {s.domain}": s.id for s in filtered_sites}
+        selected_site = st.selectbox("Select site", list(site_options.keys()))
+        site_id = site_options[selected_site]
+        site_domain = selected_site.split(" • ", 1)[1]
+
+        redirect_graph = _redirect_graph()
+        with get_read_session("ui") as session:
+            redirect_now = redirect_graph.latest(site_domain)
+            if redirect_now and redirect_now.final_domain != site_domain:
+                st.warning(
+                    f"Redirecting to {redirect_now.final_url} "
+                    f"(last seen {redirect_now.observed_at})"
+                )
+            if redirect_now and redirect_now.final_domain == site_domain:
+                st.info(f"Redirect stopped (last seen {redirect_now.observed_at})")
+            redirect_origin = redirect_graph.origin(site_domain)
+            if redirect_origin:
+                st.info(
+                    f"Added via redirect from {redirect_origin.source_domain} "
+                    f"(first seen {redirect_origin.observed_at})"
+                )
+            redirect_chain = redirect_graph.chain(site_domain)
+            if redirect_chain:
+                st.caption("Redirect chain: " + " → ".join(redirect_chain))
+            redirect_loop = redirect_graph.cycle(site_domain)
+            if redirect_loop:
+                st.error("Redirect loop: " + " → ".join(redirect_loop))
+
+            canon_chain = _build_canonical_chain(session, site_domain)
+            if canon_chain:
+                st.caption("Canonical chain: " + " → ".join(canon_chain))
+
+            hits = _cached(
+                ("tracked_hits", site_id),
+                (SERP, TAGS, CONFIG),
+                lambda hits_session: load_tracked_hits(hits_session, site_id, limit=200),
+            )
+            if hits:
+                rows = []
+                last_google_canonical: str | None = None
+                last_google_hreflang: str | dict | None = None
+                for hit in hits:
+                    google_block = {}
+                    bot_block = {}
+                    if isinstance(hit.tag_raw, dict):
+                        google_block = _extract_tag_block(hit.tag_raw, "googlebot") or {}
+                        bot_block = _extract_tag_block(hit.tag_raw, "bot") or {
+                            "canonical": hit.tag_canonical,
+                            "hreflang": hit.tag_hreflang,
+                        }
+                    changed = False
+                    if last_google_canonical is not None or last_google_hreflang is not None:
+                        if google_block.get("canonical") != (last_google_canonical or "—"):
+                            changed = True
+                        if google_block.get("hreflang") != (last_google_hreflang or "—"):
+                            changed = True
+                    canonical, hreflang = preferred_tags(google_block, bot_block)
+                    mismatch = _has_tag_mismatch(google_block, bot_block)
+                    rows.append(
                         {
-                            "ID": row.id,
-                            "Keyword": keyword.keyword if keyword else "—",
-                            "Region": keyword.region if keyword else "—",
-                            "Language": keyword.language if keyword else "—",
-                            "Interval (h)": row.interval_hours,
-                            "Active": row.active,
-                            "Last Run": row.last_run_at,
-                            "Next Run": row.next_run_at,
+                            "Detected At": hit.detected_at,
+                            "Keyword": hit.keyword or "—",
+                            "Region": hit.region or "—",
+                            "Language": hit.language or "—",
+                            "Position": hit.position,
+                            "URL": hit.url,
+                            "Canonical": canonical or "—",
+                            "Hreflang": hreflang or "—",
+                            "Mismatch": "есть расхождения" if mismatch else "—",
+                            "Run ID": hit.run_id,
+                            "_changed": changed,
                         }
                     )
-            st.dataframe(pd.DataFrame(schedule_table), width="stretch")
-        else:
-            st.info("No schedules yet.")
-
-        st.write("Create or update schedule")
-        if keywords:
-            kw_options = {f"{row.id} • {row.keyword} • {row.region}/{row.language}": row.id for row in keywords}
-            selected_kw = st.selectbox("Keyword", list(kw_options.keys()))
-            interval = st.number_input("Interval (hours)", min_value=1, max_value=720, value=24, step=1)
-            active = st.checkbox("Active", value=True)
-            if st.button("Save schedule"):
-                try:
-                    with get_session() as session:
-                        existing = session.execute(
-                            select(KeywordSchedule).where(
-                                KeywordSchedule.keyword_id == kw_options[selected_kw]
-                            )
-                        ).scalar_one_or_none()
-                        settings = get_settings()
-                        now = datetime.now(ZoneInfo(settings.scheduler_tz))
-                        if existing:
-                            existing.interval_hours = int(interval)
-                            existing.active = bool(active)
-                            if existing.active:
-                                existing.next_run_at = now + timedelta(hours=int(interval))
-                            session.add(existing)
-                        else:
-                            schedule = KeywordSchedule(
-                                keyword_id=kw_options[selected_kw],
-                                interval_hours=int(interval),
-                                active=bool(active),
-                                next_run_at=now + timedelta(hours=int(interval)),
-                            )
-                            session.add(schedule)
-                        session.commit()
-                    st.success("Schedule saved")
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Failed to save schedule: {exc}")
-        else:
-            st.info("Create at least one keyword first.")
-
-    with tabs[3]:
-        st.subheader("Tracked Sites")
-        try:
-            with get_session() as session:
-                sites = list(session.query(TrackedSite).order_by(TrackedSite.id.desc()).all())
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load tracked sites: {exc}")
-            return
+                    last_google_canonical = google_block.get("canonical") if google_block else None
+                    last_google_hreflang = google_block.get("hreflang") if google_block else None
+                df = pd.DataFrame(rows)
+                def _highlight(row):
+                    if row.get("_changed"):
+                        return ["background-color:#ffebee"] * len(row)
+                    return [""] * len(row)
+                if "_changed" in df.columns:
+                    df_display = df.drop(columns=["_changed"])
+                    st.dataframe(df_display.style.apply(_highlight, axis=1), width="stretch")
+                else:
+                    st.dataframe(df, width="stretch")
+            else:
+                st.info("No detections yet.")
+
+        st.divider()
+        st.subheader("Redirect History")
+        with get_read_session("ui") as session:
+            redirects = (
+                session.query(RedirectEvent)
+                .filter(RedirectEvent.source_domain == site_domain)
+                .order_by(RedirectEvent.observed_at.desc())
+                .limit(200)
+                .all()
+            )
+            if not redirects:
+                st.info("No redirect events yet.")
+            else:
+                rows = []
+                for ev in redirects:
+                    status = (
+                        "redirecting"
+                        if ev.final_domain and ev.final_domain != ev.source_domain
+                        else "stopped"
+                    )
+                    rows.append(
+                        {
+                            "Time": ev.observed_at,
+                            "From": ev.source_domain,
+                            "To": ev.final_domain,
+                            "Final URL": ev.final_url,
+                            "Status": status,
+                            "Chain": " → ".join(ev.chain or []),
+                            "Run ID": ev.run_id,
+                        }
+                    )
+                st.dataframe(pd.DataFrame(rows), width="stretch")
+
+        st.divider()
+        st.subheader("Ranking History (Top-10 or Not in Top-10)")
+        with get_read_session("ui") as session:
+            keyword_ids = (
+                session.query(TrackedHit.keyword_id)
+                .filter(TrackedHit.tracked_site_id == site_id)
+                .distinct()
+                .all()
+            )
+            keyword_ids = [kid for (kid,) in keyword_ids]
+            keywords = (
+                session.query(Keyword)
+                .filter(Keyword.id.in_(keyword_ids))
+                .order_by(Keyword.keyword)
+                .all()
+            )
 
-        if not sites:
-            st.info("No tracked sites yet. Use ★ in History to add.")
+        if not keywords:
+            st.info("No keywords tracked for this site yet.")
         else:
-            st.write("Manual checks")
-            if st.button("Check redirects", key="check_redirects_btn"):
-                try:
-                    settings = get_settings()
-                    now = datetime.now(ZoneInfo(settings.scheduler_tz))
-                    with get_session() as session:
-                        run = Run(kind="redirects_manual", status=RunStatus.running, started_at=now)
-                        session.add(run)
-                        session.flush()
-                        tag_service = TagService(settings)
-                        for site in sites:
-                            url = f"https://{site.domain}"
-                            tag_service.check_url(session, run.id, url, region=None, language=None)
-                        run.status = RunStatus.success
-                        run.finished_at = datetime.now(ZoneInfo(settings.scheduler_tz))
-                        session.commit()
-                    st.success("Redirect check completed")
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Redirect check failed: {exc}")
-
-            st.subheader("Site Filters")
-            col_a, col_b, col_c, col_d = st.columns(4)
-            with col_a:
-                rank_filter = st.selectbox(
-                    "Top-10 now",
-                    ["Any", "Yes", "No"],
-                    key="site_filter_rank",
-                )
-            with col_b:
-                canonical_filter = st.selectbox(
-                    "Canonical changed",
-                    ["Any", "Yes", "No"],
-                    key="site_filter_canonical",
-                )
-            with col_c:
-                hreflang_filter = st.selectbox(
-                    "Hreflang changed",
-                    ["Any", "Yes", "No"],
-                    key="site_filter_hreflang",
-                )
-            with col_d:
-                redirect_filter = st.selectbox(
-                    "Redirects",
-                    ["Any", "Ever", "Now", "Never"],
-                    key="site_filter_redirect",
-                )
+            keyword_options = {
+                f"{k.keyword} • {k.region}/{k.language}": k.id for k in keywords
+            }
+            selected_kw = st.selectbox("Keyword for ranking history", list(keyword_options.keys()))
+            selected_kw_id = keyword_options[selected_kw]
+            resolution = st.selectbox(
+                "Resolution", ["Run", "Day", "Week"], key="ranking_history_resolution"
+            )
 
-            def _flag_changed_for_domain(session, domain: str) -> tuple[bool, bool]:
-                watch_ids = [
-                    w.id for w in session.query(WatchUrl).all() if extract_domain(w.url) == domain
-                ]
-                if not watch_ids:
-                    return False, False
-                tags = (
-                    session.query(PageTag)
-                    .filter(PageTag.watch_url_id.in_(watch_ids))
-                    .order_by(PageTag.created_at.asc())
-                    .all()
-                )
-                last_can = None
-                last_hre = None
-                can_changed = False
-                hre_changed = False
-                for tag in tags:
-                    raw = tag.raw or {}
-                    google = _extract_tag_block(raw, "googlebot") or {}
-                    bot = _extract_tag_block(raw, "bot") or {
-                        "canonical": tag.canonical,
-                        "hreflang": tag.hreflang,
-                    }
-                    canonical, hreflang = _pick_preferred_tags(google, bot)
-                    if last_can is not None and canonical != last_can:
-                        can_changed = True
-                    if last_hre is not None and hreflang != last_hre:
-                        hre_changed = True
-                    last_can = canonical
-                    last_hre = hreflang
-                return can_changed, hre_changed
-
-            def _redirect_flags(session, domain: str) -> tuple[bool, bool]:
-                events = (
-                    session.query(RedirectEvent)
-                    .filter(RedirectEvent.source_domain == domain)
-                    .order_by(RedirectEvent.observed_at.desc())
-                    .all()
-                )
-                if not events:
-                    return False, False
-                ever = any(ev.final_domain != domain for ev in events)
-                now = events[0].final_domain != domain
-                return ever, now
-
-            def _ranks_top10_now(session, domain: str) -> bool:
-                latest_run = session.query(Run).order_by(Run.created_at.desc()).first()
-                if not latest_run:
-                    return False
-                rows = (
-                    session.query(SerpResult)
-                    .filter(SerpResult.run_id == latest_run.id)
-                    .all()
-                )
-                for r in rows:
-                    if extract_domain(r.link) == domain and int(r.position) <= 10:
-                        return True
-                return False
-
-            filtered_sites = []
-            with get_session() as session:
-                for s in sites:
-                    domain = s.domain
-                    top_now = _ranks_top10_now(session, domain)
-                    can_changed, hre_changed = _flag_changed_for_domain(session, domain)
-                    red_ever, red_now = _redirect_flags(session, domain)
-
-                    if rank_filter == "Yes" and not top_now:
-                        continue
-                    if rank_filter == "No" and top_now:
-                        continue
-                    if canonical_filter == "Yes" and not can_changed:
-                        continue
-                    if canonical_filter == "No" and can_changed:
-                        continue
-                    if hreflang_filter == "Yes" and not hre_changed:
-                        continue
-                    if hreflang_filter == "No" and hre_changed:
-                        continue
-                    if redirect_filter == "Ever" and not red_ever:
-                        continue
-                    if redirect_filter == "Now" and not red_now:
-                        continue
-                    if redirect_filter == "Never" and red_ever:
-                        continue
-
-                    filtered_sites.append(s)
-
-            if not filtered_sites:
-                st.info("No sites match current filters.")
+            bucket = None if resolution == "Run" else resolution.lower()
+            series = _cached(
+                ("ranking_series", selected_kw_id, site_domain, bucket),
+                (SERP,),
+                lambda session: ranking_series(session, selected_kw_id, site_domain, bucket=bucket),
+            )
+            seen = [point.run_at for point in series if point.position is not None]
+            if not seen:
+                st.info("No runs yet for this keyword/site.")
                 return
 
-            site_options = {f"{s.id} • {s.domain}": s.id for s in filtered_sites}
-            selected_site = st.selectbox("Select site", list(site_options.keys()))
-            site_id = site_options[selected_site]
-            site_domain = selected_site.split(" • ", 1)[1]
+            table = []
+            for point in reversed(series):
+                if point.run_at < seen[0]:
+                    continue
+                row = {
+                    "Run ID": point.run_id,
+                    "Date": point.run_at,
+                    "Position": point.position if point.position is not None else "not in top 10",
+                }
+                if resolution != "Run":
+                    row["Runs"] = point.runs
+                table.append(row)
+            st.dataframe(pd.DataFrame(table), width="stretch")
 
-            with get_session() as session:
-                redirect_now = (
-                    session.query(RedirectEvent)
-                    .filter(RedirectEvent.source_domain == site_domain)
-                    .order_by(RedirectEvent.observed_at.desc())
-                    .first()
-                )
-                if redirect_now and redirect_now.final_domain != site_domain:
-                    st.warning(
-                        f"Redirecting to {redirect_now.final_url} "
-                        f"(last seen {redirect_now.observed_at})"
-                    )
-                if redirect_now and redirect_now.final_domain == site_domain:
-                    st.info(f"Redirect stopped (last seen {redirect_now.observed_at})")
-                redirect_origin = (
-                    session.query(RedirectEvent)
-                    .filter(RedirectEvent.final_domain == site_domain)
-                    .order_by(RedirectEvent.observed_at.asc())
-                    .first()
-                )
-                if redirect_origin:
-                    st.info(
-                        f"Added via redirect from {redirect_origin.source_domain} "
-                        f"(first seen {redirect_origin.observed_at})"
-                    )
-                redirect_chain = _build_redirect_chain(session, site_domain)
-                if redirect_chain:
-                    st.caption("Redirect chain: " + " → ".join(redirect_chain))
-
-                canon_chain = _build_canonical_chain(session, site_domain)
-                if canon_chain:
-                    st.caption("Canonical chain: " + " → ".join(canon_chain))
-
-                hits = list(
-                    session.query(TrackedHit)
-                    .filter(TrackedHit.tracked_site_id == site_id)
-                    .order_by(TrackedHit.detected_at.desc())
+        st.divider()
+        st.subheader("Tags History")
+        with get_read_session("ui") as session:
+            hit_urls = (
+                session.query(TrackedHit.url)
+                .filter(TrackedHit.tracked_site_id == site_id)
+                .distinct()
+                .all()
+            )
+            hit_urls = [u for (u,) in hit_urls if u]
+            watch_ids = (
+                session.query(WatchUrl.id)
+                .filter(WatchUrl.url.in_(hit_urls))
+                .all()
+            )
+            watch_ids = [wid for (wid,) in watch_ids]
+            if not watch_ids:
+                st.info("No tag checks yet.")
+            else:
+                tags = (
+                    session.query(PageTag)
+                    .filter(PageTag.watch_url_id.in_(watch_ids))
+                    .order_by(PageTag.created_at.desc())
                     .limit(200)
+                    .all()
                 )
-                if hits:
+                if not tags:
+                    st.info("No tag checks yet.")
+                else:
                     rows = []
-                    last_google_canonical: str | None = None
-                    last_google_hreflang: str | dict | None = None
-                    for hit in hits:
-                        keyword = session.get(Keyword, hit.keyword_id)
-                        google_block = {}
-                        bot_block = {}
-                        if hit.url:
-                            watch = (
-                                session.query(WatchUrl)
-                                .filter(WatchUrl.url == hit.url)
-                                .one_or_none()
-                            )
-                            if watch:
-                                page_tag = (
-                                    session.query(PageTag)
-                                    .filter(
-                                        PageTag.run_id == hit.run_id,
-                                        PageTag.watch_url_id == watch.id,
-                                    )
-                                    .order_by(PageTag.id.desc())
-                                    .first()
-                                )
-                                if page_tag and isinstance(page_tag.raw, dict):
-                                    google_block = _extract_tag_block(page_tag.raw, "googlebot") or {}
-                                    bot_block = _extract_tag_block(page_tag.raw, "bot") or {
-                                        "canonical": page_tag.canonical,
-                                        "hreflang": page_tag.hreflang,
-                                    }
+                    prev_bot = {"canonical": None, "hreflang": None}
+                    prev_google = {"canonical": None, "hreflang": None}
+                    for tag in tags:
+                        raw = tag.raw or {}
+                        bot = _extract_tag_block(raw, "bot") or {
+                            "canonical": tag.canonical,
+                            "hreflang": tag.hreflang,
+                        }
+                        google = _extract_tag_block(raw, "googlebot") or {}
                         changed = False
-                        if last_google_canonical is not None or last_google_hreflang is not None:
-                            if google_block.get("canonical") != (last_google_canonical or "—"):
-                                changed = True
-                            if google_block.get("hreflang") != (last_google_hreflang or "—"):
-                                changed = True
-                        canonical, hreflang = _pick_preferred_tags(google_block, bot_block)
-                        mismatch = _has_tag_mismatch(google_block, bot_block)
+                        if bot.get("canonical") != prev_bot.get("canonical"):
+                            changed = True
+                        if bot.get("hreflang") != prev_bot.get("hreflang"):
+                            changed = True
+                        if google.get("canonical") != prev_google.get("canonical"):
+                            changed = True
+                        if google.get("hreflang") != prev_google.get("hreflang"):
+                            changed = True
+                        canonical, hreflang = preferred_tags(google, bot)
+                        mismatch = _has_tag_mismatch(google, bot)
                         rows.append(
                             {
-                                "Detected At": hit.detected_at,
-                                "Keyword": keyword.keyword if keyword else "—",
-                                "Region": keyword.region if keyword else "—",
-                                "Language": keyword.language if keyword else "—",
-                                "Position": hit.position,
-                                "URL": hit.url,
+                                "Date": tag.created_at,
+                                "Last Confirmed": tag.last_confirmed_at or tag.created_at,
+                                "Checks": tag.confirm_count or 1,
+                                "Run ID": tag.run_id,
+                                "URL": session.get(WatchUrl, tag.watch_url_id).url
+                                if tag.watch_url_id
+                                else "—",
                                 "Canonical": canonical or "—",
                                 "Hreflang": hreflang or "—",
                                 "Mismatch": "есть расхождения" if mismatch else "—",
-                                "Run ID": hit.run_id,
+                                "Mismatch Details": _mismatch_details(google, bot) if mismatch else "—",
                                 "_changed": changed,
                             }
                         )
-                        last_google_canonical = google_block.get("canonical") if google_block else None
-                        last_google_hreflang = google_block.get("hreflang") if google_block else None
+                        prev_bot = {"canonical": bot.get("canonical"), "hreflang": bot.get("hreflang")}
+                        prev_google = {"canonical": google.get("canonical"), "hreflang": google.get("hreflang")}
+
                     df = pd.DataFrame(rows)
                     def _highlight(row):
                         if row.get("_changed"):
                             return ["background-color:#ffebee"] * len(row)
                         return [""] * len(row)
-                    if "_changed" in df.columns:
-                        df_display = df.drop(columns=["_changed"])
-                        st.dataframe(df_display.style.apply(_highlight, axis=1), width="stretch")
-                    else:
-                        st.dataframe(df, width="stretch")
-                else:
-                    st.info("No detections yet.")
+                    df_display = df.drop(columns=["_changed"])
+                    st.dataframe(df_display.style.apply(_highlight, axis=1), width="stretch")
+
+    st.divider()
+    st.write("Remove tracked site")
+    if sites:
+        remove_site = st.selectbox("Site to remove", list(site_options.keys()), key="remove_site")
+        if st.button("Remove"):
+            try:
+                with get_session("ui") as session:
+                    site = session.get(TrackedSite, site_options[remove_site])
+                    if site:
+                        session.query(TrackedHit).filter(
+                            TrackedHit.tracked_site_id == site.id
+                        ).delete()
+                        session.delete(site)
+                        _commit_config(session)
+                st.success("Removed")
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"Failed to remove site: {exc}")
 
-            st.divider()
-            st.subheader("Redirect History")
-            with get_session() as session:
-                redirects = (
-                    session.query(RedirectEvent)
-                    .filter(RedirectEvent.source_domain == site_domain)
-                    .order_by(RedirectEvent.observed_at.desc())
-                    .limit(200)
-                    .all()
-                )
-                if not redirects:
-                    st.info("No redirect events yet.")
-                else:
-                    rows = []
-                    for ev in redirects:
-                        status = (
-                            "redirecting"
-                            if ev.final_domain and ev.final_domain != ev.source_domain
-                            else "stopped"
-                        )
-                        rows.append(
-                            {
-                                "Time": ev.observed_at,
-                                "From": ev.source_domain,
-                                "To": ev.final_domain,
-                                "Final URL": ev.final_url,
-                                "Status": status,
-                                "Chain": " → ".join(ev.chain or []),
-                                "Run ID": ev.run_id,
-                            }
-                        )
-                    st.dataframe(pd.DataFrame(rows), width="stretch")
-
-            st.divider()
-            st.subheader("Ranking History (Top-10 or Not in Top-10)")
-            with get_session() as session:
-                keyword_ids = (
-                    session.query(TrackedHit.keyword_id)
-                    .filter(TrackedHit.tracked_site_id == site_id)
-                    .distinct()
-                    .all()
-                )
-                keyword_ids = [kid for (kid,) in keyword_ids]
-                keywords = (
-                    session.query(Keyword)
-                    .filter(Keyword.id.in_(keyword_ids))
-                    .order_by(Keyword.keyword)
-                    .all()
-                )
 
-            if not keywords:
-                st.info("No keywords tracked for this site yet.")
-            else:
-                keyword_options = {
-                    f"{k.keyword} • {k.region}/{k.language}": k.id for k in keywords
-                }
-                selected_kw = st.selectbox("Keyword for ranking history", list(keyword_options.keys()))
-                selected_kw_id = keyword_options[selected_kw]
-
-                with get_session() as session:
-                    runs = (
-                        session.query(Run)
-                        .join(SerpResult, SerpResult.run_id == Run.id)
-                        .filter(SerpResult.keyword_id == selected_kw_id)
-                        .order_by(Run.created_at.desc())
-                        .distinct()
-                        .all()
-                    )
-                    if not runs:
-                        st.info("No runs yet for this keyword/site.")
-                    else:
-                        serp_rows = (
-                            session.query(SerpResult)
-                            .filter(SerpResult.keyword_id == selected_kw_id)
-                            .all()
-                        )
+def _render_canonical_view() -> None:
+    st.subheader("Canonical Chain (changes over time)")
+    try:
+        with get_read_session("ui") as session:
+            favorites = session.query(CanonicalFavorite).order_by(CanonicalFavorite.id.desc()).all()
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load canonical favorites: {exc}")
+        return
 
-                        best_pos_by_run: dict[int, dict[str, str | int]] = {}
-                        for row in serp_rows:
-                            if extract_domain(row.link) != site_domain:
-                                continue
-                            pos = int(row.position)
-                            prev = best_pos_by_run.get(row.run_id)
-                            if prev is None or pos < int(prev["pos"]):
-                                best_pos_by_run[row.run_id] = {
-                                    "pos": pos,
-                                    "url": row.link,
-                                }
+    fav_urls = [f.url for f in favorites]
+    if not fav_urls:
+        st.info("No canonical favorites yet.")
+    else:
+        selected_url = st.selectbox(
+            "Select canonical favorite", fav_urls, key="canonical_chain_select_top"
+        )
+        with get_read_session("ui") as session:
+            # Find earliest appearance of this url in canonical edges
+            first_edge = (
+                session.query(CanonicalEdge)
+                .filter(CanonicalEdge.canonical_url == selected_url)
+                .order_by(CanonicalEdge.observed_at.asc())
+                .first()
+            )
+            first_seen = first_edge.observed_at if first_edge else None
+            first_source = first_edge.source_url if first_edge else None
 
-                        if not best_pos_by_run:
-                            st.info("No runs yet for this keyword/site.")
-                            return
+            keyword_geo = "—"
+            if first_edge:
+                serp = (
+                    session.query(SerpResult)
+                    .filter(SerpResult.run_id == first_edge.run_id)
+                    .first()
+                )
+                if serp:
+                    keyword = session.get(Keyword, serp.keyword_id)
+                    if keyword:
+                        keyword_geo = f"{keyword.keyword} / {keyword.region}/{keyword.language}"
+
+            if first_seen:
+                st.caption(
+                    f"First seen: {first_seen} • From {first_source or '—'} • {keyword_geo} • "
+                    f"Added to canonical favorites automatically"
+                )
+            else:
+                st.caption("First seen: —")
+
+            selected_domain = extract_domain(selected_url)
+            origin_domain = _find_canonical_origin_domain(session, selected_domain)
+            chain_domain = origin_domain or selected_domain
+            chain = _build_canonical_chain(session, chain_domain)
+            if chain:
+                st.write(" → ".join(chain))
+
+            edges = (
+                session.query(CanonicalEdge)
+                .filter(CanonicalEdge.canonical_url == selected_url)
+                .order_by(CanonicalEdge.observed_at.asc())
+                .all()
+            )
+            if not edges:
+                st.info("No canonical chain events for this site yet.")
+            else:
+                detail_rows = [
+                    {
+                        "Observed At": e.observed_at,
+                        "Source URL": e.source_url,
+                        "Canonical URL": e.canonical_url or "—",
+                        "Run ID": e.run_id,
+                    }
+                    for e in edges
+                ]
+                st.dataframe(pd.DataFrame(detail_rows), width="stretch")
 
-                        first_seen_time = min(
-                            r.created_at for r in runs if r.id in best_pos_by_run
-                        )
-                        runs = [r for r in runs if r.created_at >= first_seen_time]
+    st.divider()
+    st.subheader("Canonical Favorites")
+    try:
+        with get_read_session("ui") as session:
+            favorites = session.query(CanonicalFavorite).order_by(CanonicalFavorite.id.desc()).all()
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load canonical favorites: {exc}")
+        return
 
-                        table = []
-                        for r in runs:
-                            best = best_pos_by_run.get(r.id)
-                            table.append(
-                                {
-                                    "Run ID": r.id,
-                                    "Date": r.created_at,
-                                    "Position": best["pos"] if best else "not in top 10",
-                                }
-                            )
-                        st.dataframe(pd.DataFrame(table), width="stretch")
-
-            st.divider()
-            st.subheader("Tags History")
-            with get_session() as session:
-                hit_urls = (
-                    session.query(TrackedHit.url)
-                    .filter(TrackedHit.tracked_site_id == site_id)
-                    .distinct()
-                    .all()
+    fav_urls = [f.url for f in favorites]
+    st.write("Add canonical favorite")
+    new_url = st.text_input("Canonical URL", value="")
+    if st.button("Add", key="canonical_fav_add"):
+        if new_url.strip():
+            with get_session("ui") as session:
+                exists = (
+                    session.query(CanonicalFavorite)
+                    .filter(CanonicalFavorite.url == new_url.strip())
+                    .one_or_none()
                 )
-                hit_urls = [u for (u,) in hit_urls if u]
-                watch_ids = (
-                    session.query(WatchUrl.id)
-                    .filter(WatchUrl.url.in_(hit_urls))
-                    .all()
+                if not exists:
+                    session.add(CanonicalFavorite(url=new_url.strip()))
+                    _commit_config(session)
+            st.success("Added")
+            st.rerun()
+
+    if fav_urls:
+        remove = st.selectbox(
+            "Remove canonical favorite", fav_urls, key="canonical_fav_remove_select"
+        )
+        if st.button("Remove", key="canonical_fav_remove_btn"):
+            with get_session("ui") as session:
+                row = (
+                    session.query(CanonicalFavorite)
+                    .filter(CanonicalFavorite.url == remove)
+                    .one_or_none()
                 )
-                watch_ids = [wid for (wid,) in watch_ids]
-                if not watch_ids:
-                    st.info("No tag checks yet.")
-                else:
-                    tags = (
-                        session.query(PageTag)
-                        .filter(PageTag.watch_url_id.in_(watch_ids))
-                        .order_by(PageTag.created_at.desc())
-                        .limit(200)
-                        .all()
-                    )
-                    if not tags:
-                        st.info("No tag checks yet.")
-                    else:
-                        rows = []
-                        prev_bot = {"canonical": None, "hreflang": None}
-                        prev_google = {"canonical": None, "hreflang": None}
-                        for tag in tags:
-                            raw = tag.raw or {}
-                            bot = _extract_tag_block(raw, "bot") or {
-                                "canonical": tag.canonical,
-                                "hreflang": tag.hreflang,
-                            }
-                            google = _extract_tag_block(raw, "googlebot") or {}
-                            changed = False
-                            if bot.get("canonical") != prev_bot.get("canonical"):
-                                changed = True
-                            if bot.get("hreflang") != prev_bot.get("hreflang"):
-                                changed = True
-                            if google.get("canonical") != prev_google.get("canonical"):
-                                changed = True
-                            if google.get("hreflang") != prev_google.get("hreflang"):
-                                changed = True
-                            canonical, hreflang = _pick_preferred_tags(google, bot)
-                            mismatch = _has_tag_mismatch(google, bot)
-                            rows.append(
-                                {
-                                    "Date": tag.created_at,
-                                    "Run ID": tag.run_id,
-                                    "URL": session.get(WatchUrl, tag.watch_url_id).url
-                                    if tag.watch_url_id
-                                    else "—",
-                                    "Canonical": canonical or "—",
-                                    "Hreflang": hreflang or "—",
-                                    "Mismatch": "есть расхождения" if mismatch else "—",
-                                    "Mismatch Details": _mismatch_details(google, bot) if mismatch else "—",
-                                    "_changed": changed,
-                                }
-                            )
-                            prev_bot = {"canonical": bot.get("canonical"), "hreflang": bot.get("hreflang")}
-                            prev_google = {"canonical": google.get("canonical"), "hreflang": google.get("hreflang")}
+                if row:
+                    session.delete(row)
+                    _commit_config(session)
+            st.success("Removed")
+            st.rerun()
+
+    st.divider()
+    st.subheader("Canonical Favorites Checks")
+    check_rows = []
+    with get_read_session("ui") as session:
+        latest = latest_page_tags(session, fav_urls)
+    for url in fav_urls:
+        tag = latest.get(url)
+        if not tag:
+            check_rows.append(
+                {
+                    "URL": url,
+                    "Last Checked": "—",
+                    "Canonical": "—",
+                    "Hreflang": "—",
+                }
+            )
+            continue
+        raw = tag.raw or {}
+        google = raw.get("googlebot") or {}
+        bot = raw.get("bot") or {}
+        canonical = google.get("canonical") or bot.get("canonical") or "—"
+        hreflang = google.get("hreflang") or bot.get("hreflang") or "—"
+        check_rows.append(
+            {
+                "URL": url,
+                "Last Checked": tag.last_confirmed_at or tag.created_at,
+                "Canonical": canonical,
+                "Hreflang": hreflang,
+            }
+        )
+    if check_rows:
+        st.dataframe(pd.DataFrame(check_rows), width="stretch")
+    else:
+        st.info("No canonical favorites yet.")
 
-                        df = pd.DataFrame(rows)
-                        def _highlight(row):
-                            if row.get("_changed"):
-                                return ["background-color:#ffebee"] * len(row)
-                            return [""] * len(row)
-                        df_display = df.drop(columns=["_changed"])
-                        st.dataframe(df_display.style.apply(_highlight, axis=1), width="stretch")
+    st.divider()
+    st.subheader("Canonical Chain (changes over time)")
+    if not fav_urls:
+        st.info("No canonical favorites yet.")
+    else:
+        selected_url = st.selectbox(
+            "Select site for chain", fav_urls, key="canonical_chain_select"
+        )
+        with get_read_session("ui") as session:
+            edges = (
+                session.query(CanonicalEdge)
+                .filter(CanonicalEdge.source_url == selected_url)
+                .order_by(CanonicalEdge.observed_at.asc())
+                .all()
+            )
+        chain = [selected_url]
+        last = selected_url
+        for edge in edges:
+            target = edge.canonical_url
+            if not target:
+                continue
+            if target != last:
+                chain.append(target)
+                last = target
+
+        st.write(" → ".join(chain))
+        if edges:
+            detail_rows = [
+                {
+                    "Observed At": e.observed_at,
+                    "Canonical URL": e.canonical_url or "—",
+                    "Run ID": e.run_id,
+                }
+                for e in edges
+            ]
+            st.dataframe(pd.DataFrame(detail_rows), width="stretch")
 
-        st.divider()
-        st.write("Remove tracked site")
-        if sites:
-            remove_site = st.selectbox("Site to remove", list(site_options.keys()), key="remove_site")
-            if st.button("Remove"):
-                try:
-                    with get_session() as session:
-                        site = session.get(TrackedSite, site_options[remove_site])
-                        if site:
-                            session.query(TrackedHit).filter(
-                                TrackedHit.tracked_site_id == site.id
-                            ).delete()
-                            session.delete(site)
-                            session.commit()
-                    st.success("Removed")
-                except Exception as exc:  # noqa: BLE001
-                    st.error(f"Failed to remove site: {exc}")
-
-    with tabs[4]:
-        st.subheader("Canonical Chain (changes over time)")
-        try:
-            with get_session() as session:
-                favorites = session.query(CanonicalFavorite).order_by(CanonicalFavorite.id.desc()).all()
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load canonical favorites: {exc}")
-            return
 
-        fav_urls = [f.url for f in favorites]
-        if not fav_urls:
-            st.info("No canonical favorites yet.")
+def _load_portfolio_summary(session: Session) -> tuple[pd.DataFrame, dict[int, str]]:
+    summary = rank_summary(load_positions(session))
+    keyword_labels = {
+        k.id: f"{k.keyword} • {k.region}/{k.language}"
+        for k in session.query(Keyword).filter(
+            Keyword.id.in_([int(kid) for kid in summary["keyword_id"].unique()])
+        )
+    }
+    return summary, keyword_labels
+
+
+def _render_reports_view() -> None:
+    st.subheader("Report / Dossier")
+    try:
+        with get_read_session("ui") as session:
+            sites = list(session.query(TrackedSite).order_by(TrackedSite.id.desc()).all())
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load tracked sites: {exc}")
+        return
+
+    if sites and st.toggle("Portfolio summary (all tracked sites)", key="report_portfolio"):
+        summary, keyword_labels = _cached(("portfolio_summary",), (SERP, CONFIG), _load_portfolio_summary)
+        if summary.empty:
+            st.info("No positions for tracked sites yet.")
         else:
-            selected_url = st.selectbox(
-                "Select canonical favorite", fav_urls, key="canonical_chain_select_top"
+            summary = summary.copy()  # cached frame is shared between sessions
+            summary.insert(1, "keyword", summary["keyword_id"].map(keyword_labels))
+            st.dataframe(
+                summary.sort_values(["current_state", "last_drop"], ascending=[False, False]),
+                width="stretch",
             )
-            with get_session() as session:
-                # Find earliest appearance of this url in canonical edges
-                first_edge = (
-                    session.query(CanonicalEdge)
-                    .filter(CanonicalEdge.canonical_url == selected_url)
-                    .order_by(CanonicalEdge.observed_at.asc())
-                    .first()
-                )
-                first_seen = first_edge.observed_at if first_edge else None
-                first_source = first_edge.source_url if first_edge else None
-
-                keyword_geo = "—"
-                if first_edge:
-                    serp = (
-                        session.query(SerpResult)
-                        .filter(SerpResult.run_id == first_edge.run_id)
-                        .first()
-                    )
-                    if serp:
-                        keyword = session.get(Keyword, serp.keyword_id)
-                        if keyword:
-                            keyword_geo = f"{keyword.keyword} / {keyword.region}/{keyword.language}"
-
-                if first_seen:
-                    st.caption(
-                        f"First seen: {first_seen} • From {first_source or '—'} • {keyword_geo} • "
-                        f"Added to canonical favorites automatically"
-                    )
-                else:
-                    st.caption("First seen: —")
-
-                selected_domain = extract_domain(selected_url)
-                origin_domain = _find_canonical_origin_domain(session, selected_domain)
-                chain_domain = origin_domain or selected_domain
-                chain = _build_canonical_chain(session, chain_domain)
-                if chain:
-                    st.write(" → ".join(chain))
-
-                edges = (
-                    session.query(CanonicalEdge)
-                    .filter(CanonicalEdge.canonical_url == selected_url)
-                    .order_by(CanonicalEdge.observed_at.asc())
-                    .all()
-                )
-                if not edges:
-                    st.info("No canonical chain events for this site yet.")
-                else:
-                    detail_rows = [
-                        {
-                            "Observed At": e.observed_at,
-                            "Source URL": e.source_url,
-                            "Canonical URL": e.canonical_url or "—",
-                            "Run ID": e.run_id,
-                        }
-                        for e in edges
-                    ]
-                    st.dataframe(pd.DataFrame(detail_rows), width="stretch")
-
         st.divider()
-        st.subheader("Canonical Favorites")
-        try:
-            with get_session() as session:
-                favorites = session.query(CanonicalFavorite).order_by(CanonicalFavorite.id.desc()).all()
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load canonical favorites: {exc}")
-            return
 
-        fav_urls = [f.url for f in favorites]
-        st.write("Add canonical favorite")
-        new_url = st.text_input("Canonical URL", value="")
-        if st.button("Add", key="canonical_fav_add"):
-            if new_url.strip():
-                with get_session() as session:
-                    exists = (
-                        session.query(CanonicalFavorite)
-                        .filter(CanonicalFavorite.url == new_url.strip())
-                        .one_or_none()
-                    )
-                    if not exists:
-                        session.add(CanonicalFavorite(url=new_url.strip()))
-                        session.commit()
-                st.success("Added")
-                st.rerun()
+    if not sites:
+        st.info("No tracked sites yet.")
+    else:
+        site_options = {f"{s.id} • {s.domain}": s.id for s in sites}
+        selected_site = st.selectbox("Site", list(site_options.keys()), key="report_site")
+        site_id = site_options[selected_site]
+        site_domain = selected_site.split(" • ", 1)[1]
+
+        with get_read_session("ui") as session:
+            keyword_ids = (
+                session.query(TrackedHit.keyword_id)
+                .filter(TrackedHit.tracked_site_id == site_id)
+                .distinct()
+                .all()
+            )
+            keyword_ids = [kid for (kid,) in keyword_ids]
+            keywords = (
+                session.query(Keyword)
+                .filter(Keyword.id.in_(keyword_ids))
+                .order_by(Keyword.keyword)
+                .all()
+            )
 
-        if fav_urls:
-            remove = st.selectbox(
-                "Remove canonical favorite", fav_urls, key="canonical_fav_remove_select"
+        if not keywords:
+            st.info("No keywords tracked for this site yet.")
+        else:
+            keyword_options = {
+                f"{k.keyword} • {k.region}/{k.language}": k.id for k in keywords
+            }
+            selected_kw = st.selectbox(
+                "Keyword", list(keyword_options.keys()), key="report_keyword"
             )
-            if st.button("Remove", key="canonical_fav_remove_btn"):
-                with get_session() as session:
-                    row = (
-                        session.query(CanonicalFavorite)
-                        .filter(CanonicalFavorite.url == remove)
-                        .one_or_none()
-                    )
-                    if row:
-                        session.delete(row)
-                        session.commit()
-                st.success("Removed")
-                st.rerun()
+            selected_kw_id = keyword_options[selected_kw]
 
-        st.divider()
-        st.subheader("Canonical Favorites Checks")
-        check_rows = []
-        with get_session() as session:
-            for url in fav_urls:
-                watch = session.query(WatchUrl).filter(WatchUrl.url == url).one_or_none()
-                if not watch:
-                    check_rows.append(
-                        {
-                            "URL": url,
-                            "Last Checked": "—",
-                            "Canonical": "—",
-                            "Hreflang": "—",
-                        }
-                    )
-                    continue
-                tag = (
-                    session.query(PageTag)
-                    .filter(PageTag.watch_url_id == watch.id)
-                    .order_by(PageTag.created_at.desc())
-                    .first()
-                )
-                if not tag:
-                    check_rows.append(
-                        {
-                            "URL": url,
-                            "Last Checked": "—",
-                            "Canonical": "—",
-                            "Hreflang": "—",
-                        }
-                    )
-                    continue
-                raw = tag.raw or {}
-                google = raw.get("googlebot") or {}
-                bot = raw.get("bot") or {}
-                canonical = google.get("canonical") or bot.get("canonical") or "—"
-                hreflang = google.get("hreflang") or bot.get("hreflang") or "—"
-                check_rows.append(
+            positions = _cached(
+                ("positions", selected_kw_id, site_domain),
+                (SERP,),
+                lambda session: load_positions(session, [(selected_kw_id, site_domain)]),
+            )
+            if positions.empty:
+                st.info("No runs yet for this keyword.")
+                return
+            runs = list(positions.itertuples(index=False))
+            best_by_run: dict[int, dict[str, str | int]] = {
+                r.run_id: {"pos": int(r.position), "link": r.url or "—"}
+                for r in runs
+                if pd.notna(r.position)
+            }
+            if not best_by_run:
+                st.info("No runs yet for this keyword/site.")
+                return
+
+            table = []
+            for r in runs:
+                best = best_by_run.get(r.run_id)
+                table.append(
                     {
-                        "URL": url,
-                        "Last Checked": tag.created_at,
-                        "Canonical": canonical,
-                        "Hreflang": hreflang,
+                        "Run ID": r.run_id,
+                        "Date": r.run_at,
+                        "Position": best["pos"] if best else "not in top 10",
+                        "URL": best["link"] if best else "—",
                     }
                 )
-        if check_rows:
-            st.dataframe(pd.DataFrame(check_rows), width="stretch")
-        else:
-            st.info("No canonical favorites yet.")
+            df_runs = pd.DataFrame(table)
+            st.subheader("Positions by Run")
+            st.dataframe(df_runs, width="stretch")
 
-        st.divider()
-        st.subheader("Canonical Chain (changes over time)")
-        if not fav_urls:
-            st.info("No canonical favorites yet.")
-        else:
-            selected_url = st.selectbox(
-                "Select site for chain", fav_urls, key="canonical_chain_select"
+            df_chart = df_runs.copy()
+            df_chart["Position Value"] = df_chart["Position"].apply(
+                lambda v: 11 if v == "not in top 10" else int(v)
             )
-            with get_session() as session:
-                edges = (
-                    session.query(CanonicalEdge)
-                    .filter(CanonicalEdge.source_url == selected_url)
-                    .order_by(CanonicalEdge.observed_at.asc())
-                    .all()
-                )
-            chain = [selected_url]
-            last = selected_url
-            for edge in edges:
-                target = edge.canonical_url
-                if not target:
-                    continue
-                if target != last:
-                    chain.append(target)
-                    last = target
+            st.line_chart(df_chart.set_index("Date")["Position Value"])
 
-            st.write(" → ".join(chain))
-            if edges:
-                detail_rows = [
-                    {
-                        "Observed At": e.observed_at,
-                        "Canonical URL": e.canonical_url or "—",
-                        "Run ID": e.run_id,
-                    }
-                    for e in edges
-                ]
-                st.dataframe(pd.DataFrame(detail_rows), width="stretch")
+            # First seen / drop / back (3 consecutive)
+            rank_log = rank_events(positions)
 
-    with tabs[5]:
-        st.subheader("Report / Dossier")
-        try:
-            with get_session() as session:
-                sites = list(session.query(TrackedSite).order_by(TrackedSite.id.desc()).all())
-        except Exception as exc:  # noqa: BLE001
-            st.error(f"Failed to load tracked sites: {exc}")
-            return
+            def _last_event(name: str) -> datetime | None:
+                times = rank_log.loc[rank_log["event"] == name, "run_at"]
+                return times.iloc[-1].to_pydatetime() if not times.empty else None
 
-        if not sites:
-            st.info("No tracked sites yet.")
-        else:
-            site_options = {f"{s.id} • {s.domain}": s.id for s in sites}
-            selected_site = st.selectbox("Site", list(site_options.keys()), key="report_site")
-            site_id = site_options[selected_site]
-            site_domain = selected_site.split(" • ", 1)[1]
-
-            with get_session() as session:
-                keyword_ids = (
-                    session.query(TrackedHit.keyword_id)
-                    .filter(TrackedHit.tracked_site_id == site_id)
-                    .distinct()
-                    .all()
-                )
-                keyword_ids = [kid for (kid,) in keyword_ids]
-                keywords = (
-                    session.query(Keyword)
-                    .filter(Keyword.id.in_(keyword_ids))
-                    .order_by(Keyword.keyword)
-                    .all()
-                )
+            first_seen = _last_event("first_seen")
+            drop_confirmed_at = _last_event("dropped")
+            back_confirmed_at = _last_event("back")
+            drop_time = drop_confirmed_at
+            last_link_before = next((r.url for r in reversed(runs) if pd.notna(r.position)), None)
 
-            if not keywords:
-                st.info("No keywords tracked for this site yet.")
+            if drop_time:
+                st.info(f"First drop out of Top-10: {drop_time}")
             else:
-                keyword_options = {
-                    f"{k.keyword} • {k.region}/{k.language}": k.id for k in keywords
-                }
-                selected_kw = st.selectbox(
-                    "Keyword", list(keyword_options.keys()), key="report_keyword"
-                )
-                selected_kw_id = keyword_options[selected_kw]
-
-                with get_session() as session:
-                    runs = (
-                        session.query(Run)
-                        .join(SerpResult, SerpResult.run_id == Run.id)
-                        .filter(SerpResult.keyword_id == selected_kw_id)
-                        .order_by(Run.created_at.asc())
-                        .distinct()
-                        .all()
-                    )
-                    if not runs:
-                        st.info("No runs yet for this keyword.")
-                        return
+                st.info("No drop out of Top-10 yet.")
 
-                    hits = (
-                        session.query(TrackedHit)
-                        .filter(
-                            TrackedHit.tracked_site_id == site_id,
-                            TrackedHit.keyword_id == selected_kw_id,
-                        )
-                        .order_by(TrackedHit.detected_at.asc())
-                        .all()
-                    )
-                    if not hits:
-                        st.info("No runs yet for this keyword/site.")
-                        return
+            if not drop_time:
+                return
 
-                best_by_run: dict[int, dict[str, str | int]] = {}
-                for hit in hits:
-                    if hit.position is None:
-                        continue
-                    prev = best_by_run.get(hit.run_id)
-                    if prev is None or hit.position < int(prev["pos"]):
-                        best_by_run[hit.run_id] = {"pos": int(hit.position), "link": hit.url or "—"}
-
-                table = []
-                for r in runs:
-                    best = best_by_run.get(r.id)
-                    table.append(
-                        {
-                            "Run ID": r.id,
-                            "Date": r.created_at,
-                            "Position": best["pos"] if best else "not in top 10",
-                            "URL": best["link"] if best else "—",
-                        }
-                    )
-                df_runs = pd.DataFrame(table)
-                st.subheader("Positions by Run")
-                st.dataframe(df_runs, width="stretch")
+            events: list[dict[str, str | datetime]] = []
 
-                df_chart = df_runs.copy()
-                df_chart["Position Value"] = df_chart["Position"].apply(
-                    lambda v: 11 if v == "not in top 10" else int(v)
+            if first_seen:
+                events.append(
+                    {
+                        "Time": first_seen,
+                        "Event": "First seen",
+                        "Details": "First time found in Top-10",
+                    }
+                )
+            if drop_confirmed_at:
+                events.append(
+                    {
+                        "Time": drop_confirmed_at,
+                        "Event": "Dropped",
+                        "Details": "Not in Top-10 for 3 consecutive runs",
+                    }
+                )
+            if back_confirmed_at and drop_confirmed_at:
+                events.append(
+                    {
+                        "Time": back_confirmed_at,
+                        "Event": "Back",
+                        "Details": "Found in Top-10 for 3 consecutive runs",
+                    }
                 )
-                st.line_chart(df_chart.set_index("Date")["Position Value"])
-
-                # First seen / drop / back (3 consecutive)
-                first_hit_time = None
-                drop_time = None
-                last_link_before = None
-                streak_missing = 0
-                streak_found = 0
-                last_state = None
-                first_seen = None
-                drop_confirmed_at = None
-                back_confirmed_at = None
-                last_found_link = None
-
-                # runs are ascending
-                for r in runs:
-                    best = best_by_run.get(r.id)
-                    is_found = best is not None
-                    if is_found and first_seen is None:
-                        first_seen = r.created_at
-                    if is_found:
-                        last_found_link = best["link"]
-                        streak_found += 1
-                        streak_missing = 0
-                    else:
-                        streak_missing += 1
-                        streak_found = 0
-
-                    if streak_missing >= 3 and last_state != "dropped":
-                        drop_confirmed_at = r.created_at
-                        last_state = "dropped"
-                    if streak_found >= 3 and last_state == "dropped":
-                        back_confirmed_at = r.created_at
-                        last_state = "back"
-
-                if first_seen:
-                    first_hit_time = first_seen
-                    last_link_before = last_found_link
-                if drop_confirmed_at:
-                    drop_time = drop_confirmed_at
-
-                if drop_time:
-                    st.info(f"First drop out of Top-10: {drop_time}")
-                else:
-                    st.info("No drop out of Top-10 yet.")
-
-                if not drop_time:
-                    return
-
-                events: list[dict[str, str | datetime]] = []
 
-                if first_seen:
-                    events.append(
-                        {
-                            "Time": first_seen,
-                            "Event": "First seen",
-                            "Details": "First time found in Top-10",
-                        }
+            with get_read_session("ui") as session:
+                redirect_events = (
+                    session.query(RedirectEvent)
+                    .filter(
+                        RedirectEvent.source_domain == site_domain,
+                        RedirectEvent.observed_at >= drop_time,
                     )
-                if drop_confirmed_at:
+                    .order_by(RedirectEvent.observed_at.asc())
+                    .all()
+                )
+                for ev in redirect_events:
                     events.append(
                         {
-                            "Time": drop_confirmed_at,
-                            "Event": "Dropped",
-                            "Details": "Not in Top-10 for 3 consecutive runs",
+                            "Time": ev.observed_at,
+                            "Event": f"Redirected to {ev.final_url}",
+                            "Details": " → ".join(ev.chain or []),
                         }
                     )
-                if back_confirmed_at and drop_confirmed_at:
-                    events.append(
-                        {
-                            "Time": back_confirmed_at,
-                            "Event": "Back",
-                            "Details": "Found in Top-10 for 3 consecutive runs",
-                        }
+
+                # Canonical / hreflang changes after drop
+                watch_urls = session.query(WatchUrl).all()
+                watch_ids = [
+                    w.id for w in watch_urls if extract_domain(w.url) == site_domain
+                ]
+                if watch_ids:
+                    baseline_tag = (
+                        session.query(PageTag)
+                        .filter(
+                            PageTag.watch_url_id.in_(watch_ids),
+                            PageTag.created_at < drop_time,
+                        )
+                        .order_by(PageTag.created_at.desc())
+                        .first()
                     )
+                    last_can = None
+                    last_hre = None
+                    if baseline_tag:
+                        raw = baseline_tag.raw or {}
+                        google = _extract_tag_block(raw, "googlebot") or {}
+                        bot = _extract_tag_block(raw, "bot") or {
+                            "canonical": baseline_tag.canonical,
+                            "hreflang": baseline_tag.hreflang,
+                        }
+                        last_can, last_hre = preferred_tags(google, bot)
 
-                with get_session() as session:
-                    redirect_events = (
-                        session.query(RedirectEvent)
+                    tags = (
+                        session.query(PageTag)
                         .filter(
-                            RedirectEvent.source_domain == site_domain,
-                            RedirectEvent.observed_at >= drop_time,
+                            PageTag.watch_url_id.in_(watch_ids),
+                            PageTag.created_at >= drop_time,
                         )
-                        .order_by(RedirectEvent.observed_at.asc())
+                        .order_by(PageTag.created_at.asc())
                         .all()
                     )
-                    for ev in redirect_events:
-                        events.append(
-                            {
-                                "Time": ev.observed_at,
-                                "Event": f"Redirected to {ev.final_url}",
-                                "Details": " → ".join(ev.chain or []),
-                            }
-                        )
-
-                    # Canonical / hreflang changes after drop
-                    watch_urls = session.query(WatchUrl).all()
-                    watch_ids = [
-                        w.id for w in watch_urls if extract_domain(w.url) == site_domain
-                    ]
-                    if watch_ids:
-                        baseline_tag = (
-                            session.query(PageTag)
-                            .filter(
-                                PageTag.watch_url_id.in_(watch_ids),
-                                PageTag.created_at < drop_time,
+                    for tag in tags:
+                        raw = tag.raw or {}
+                        google = _extract_tag_block(raw, "googlebot") or {}
+                        bot = _extract_tag_block(raw, "bot") or {
+                            "canonical": tag.canonical,
+                            "hreflang": tag.hreflang,
+                        }
+                        canonical, hreflang = preferred_tags(google, bot)
+                        if canonical != last_can:
+                            events.append(
+                                {
+                                    "Time": tag.created_at,
+                                    "Event": "Canonical changed",
+                                    "Details": f"{last_can or '—'} → {canonical or '—'}",
+                                }
                             )
-                            .order_by(PageTag.created_at.desc())
-                            .first()
-                        )
-                        last_can = None
-                        last_hre = None
-                        if baseline_tag:
-                            raw = baseline_tag.raw or {}
-                            google = _extract_tag_block(raw, "googlebot") or {}
-                            bot = _extract_tag_block(raw, "bot") or {
-                                "canonical": baseline_tag.canonical,
-                                "hreflang": baseline_tag.hreflang,
-                            }
-                            last_can, last_hre = _pick_preferred_tags(google, bot)
-
-                        tags = (
-                            session.query(PageTag)
-                            .filter(
-                                PageTag.watch_url_id.in_(watch_ids),
-                                PageTag.created_at >= drop_time,
+                        if hreflang != last_hre:
+                            events.append(
+                                {
+                                    "Time": tag.created_at,
+                                    "Event": "Hreflang changed",
+                                    "Details": f"{last_hre or '—'} → {hreflang or '—'}",
+                                }
                             )
-                            .order_by(PageTag.created_at.asc())
-                            .all()
-                        )
-                        for tag in tags:
-                            raw = tag.raw or {}
-                            google = _extract_tag_block(raw, "googlebot") or {}
-                            bot = _extract_tag_block(raw, "bot") or {
-                                "canonical": tag.canonical,
-                                "hreflang": tag.hreflang,
-                            }
-                            canonical, hreflang = _pick_preferred_tags(google, bot)
-                            if canonical != last_can:
-                                events.append(
-                                    {
-                                        "Time": tag.created_at,
-                                        "Event": "Canonical changed",
-                                        "Details": f"{last_can or '—'} → {canonical or '—'}",
-                                    }
-                                )
-                            if hreflang != last_hre:
-                                events.append(
-                                    {
-                                        "Time": tag.created_at,
-                                        "Event": "Hreflang changed",
-                                        "Details": f"{last_hre or '—'} → {hreflang or '—'}",
-                                    }
-                                )
-                            last_can = canonical
-                            last_hre = hreflang
-
-                # New target page after drop
-                first_link_after = None
-                for r in runs:
-                    if r.created_at <= drop_time:
-                        continue
-                    best = best_by_run.get(r.id)
-                    if best:
-                        first_link_after = best["link"]
-                        break
-                if first_link_after and last_link_before and first_link_after != last_link_before:
-                    events.append(
-                        {
-                            "Time": drop_time,
-                            "Event": "New target page in SERP",
-                            "Details": f"{last_link_before} → {first_link_after}",
-                        }
-                    )
+                        last_can = canonical
+                        last_hre = hreflang
 
-                if not events:
-                    events.append(
-                        {"Time": drop_time, "Event": "No activity", "Details": "No changes detected"}
-                    )
+            # New target page after drop
+            first_link_after = None
+            for r in runs:
+                if r.run_at <= drop_time:
+                    continue
+                best = best_by_run.get(r.run_id)
+                if best:
+                    first_link_after = best["link"]
+                    break
+            if first_link_after and last_link_before and first_link_after != last_link_before:
+                events.append(
+                    {
+                        "Time": drop_time,
+                        "Event": "New target page in SERP",
+                        "Details": f"{last_link_before} → {first_link_after}",
+                    }
+                )
 
-                events_df = pd.DataFrame(events).sort_values("Time", ascending=True)
-                st.subheader("Events after drop")
-                if not events_df.empty and "Event" in events_df.columns:
-                    def _event_style(row):
-                        if row.get("Event") == "Dropped":
-                            return ["color:#c62828"] * len(row)
-                        if row.get("Event") == "Back":
-                            return ["color:#2e7d32"] * len(row)
-                        return ["" for _ in row]
-                    st.dataframe(events_df.style.apply(_event_style, axis=1), width="stretch")
-                else:
-                    st.dataframe(events_df, width="stretch")
+            if not events:
+                events.append(
+                    {"Time": drop_time, "Event": "No activity", "Details": "No changes detected"}
+                )
+
+            events_df = pd.DataFrame(events).sort_values("Time", ascending=True)
+            st.subheader("Events after drop")
+            if not events_df.empty and "Event" in events_df.columns:
+                def _event_style(row):
+                    if row.get("Event") == "Dropped":
+                        return ["color:#c62828"] * len(row)
+                    if row.get("Event") == "Back":
+                        return ["color:#2e7d32"] * len(row)
+                    return ["" for _ in row]
+                st.dataframe(events_df.style.apply(_event_style, axis=1), width="stretch")
+            else:
+                st.dataframe(events_df, width="stretch")
+
+
+def _query_cache_block() -> None:
+    st.subheader("Query Cache")
+    stats = _query_cache().stats()
+    cols = st.columns(4)
+    cols[0].metric("Hit rate", f"{stats['hit_rate']:.0%}")
+    cols[1].metric("Hits / misses", f"{stats['hits']} / {stats['misses']}")
+    cols[2].metric("Entries", f"{stats['entries']} / {stats['max_entries']}")
+    cols[3].metric("Invalidated / evicted", f"{stats['invalidations']} / {stats['evictions']}")
+    try:
+        versions = st.session_state.get("data_versions") or _refresh_data_versions()
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load data versions: {exc}")
+    else:
+        st.caption("Data versions: " + ", ".join(f"{scope} {version}" for scope, version in versions.items()))
+    if st.button("Clear cache", key="query_cache_clear"):
+        _query_cache().clear()
+        st.success("Cache cleared")
+
+
+def _jobs_block() -> None:
+    st.subheader("Background Jobs")
+    st.button("Refresh", key="jobs_refresh")
+    try:
+        with get_session("ui") as session:
+            jobs = recent_jobs(session, limit=50)
+    except Exception as exc:  # noqa: BLE001
+        st.error(f"Failed to load jobs: {exc}")
+        return
+    if not jobs:
+        st.info("No jobs yet.")
+        return
+    table = [
+        {
+            "ID": job.id,
+            "Kind": job.kind,
+            "Status": job.status,
+            "Progress": f"{job.progress_done} / {job.progress_total}" if job.progress_total else "—",
+            "Run ID": job.run_id,
+            "Created At": job.created_at,
+            "Started At": job.started_at,
+            "Finished At": job.finished_at,
+            "Error": job.error or "—",
+        }
+        for job in jobs
+    ]
+    st.dataframe(pd.DataFrame(table), width="stretch")
+
+
+def _render_settings_view() -> None:
+    _scheduler_status_block()
+    st.divider()
+    _jobs_block()
+    st.divider()
+    _query_cache_block()
+
+
+VIEWS = {
+    "New Query": _render_new_query_view,
+    "History": _render_history_view,
+    "Keywords": _render_keywords_view,
+    "Sites": _render_sites_view,
+    "Canonical": _render_canonical_view,
+    "Reports": _render_reports_view,
+    "Settings": _render_settings_view,
+}
+
+
+def main() -> None:
+    root = _find_project_root()
+    if root is not None:
+        load_dotenv(root / ".env")
+
+    st.set_page_config(page_title="SERP Analyzer", layout="wide")
+    st.title("SERP Analyzer")
+    st.write("Quick Serper.dev query and top 10 organic results.")
+    if not os.getenv("DATABASE_URL"):
+        st.warning("DATABASE_URL is not set. Add it to .env to enable history.")
 
-    with tabs[6]:
-        _scheduler_status_block()
+    # Cached reads reload the data versions once per rerun, on first use
+    st.session_state.pop("data_versions", None)
 
+    # Only the selected view runs: st.tabs would execute every tab on each rerun
+    view = st.radio("View", list(VIEWS), horizontal=True, key="view", label_visibility="collapsed")
+    VIEWS[view]()
 
 
 if __name__ == "__main__":
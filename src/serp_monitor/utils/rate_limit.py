@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Spaces calls to at most ``rate`` per second, across threads.
+
+    Each caller reserves the next free slot under a lock and sleeps outside
+    it until the slot comes, so waiting threads do not block each other.
+    """
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self._interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -12,8 +12,11 @@ from serp_monitor.config.settings import get_settings
 from serp_monitor.db.models import Keyword, KeywordSchedule, SchedulerStatus, Run, RunStatus, TrackedSite, CanonicalFavorite
 from serp_monitor.db.session import get_session
 from serp_monitor.providers.serper import SerperClient
+from serp_monitor.services.data_versions import SERP, bump_data_versions
+from serp_monitor.services.jobs import run_pending_jobs
 from serp_monitor.services.serp_service import SerpService
 from serp_monitor.services.tag_service import TagService
+from serp_monitor.services.tracked_hits import backfill_tracked_hits
 
 
 def _now_tz() -> datetime:
@@ -23,11 +26,9 @@ def _now_tz() -> datetime:
 
 def _run_due_schedules() -> None:
     settings = get_settings()
-    client = SerperClient(settings)
-    service = SerpService(client)
     now = _now_tz()
 
-    with get_session() as session:
+    with get_session("scheduler") as session:
         status = session.get(SchedulerStatus, "keyword-scheduler")
         if not status:
             status = SchedulerStatus(name="keyword-scheduler", running=True)
@@ -36,7 +37,7 @@ def _run_due_schedules() -> None:
         session.add(status)
         session.commit()
 
-    with get_session() as session:
+    with get_session("scheduler") as session:
         schedules = list(
             session.execute(
                 select(KeywordSchedule).where(
@@ -47,27 +48,29 @@ def _run_due_schedules() -> None:
             ).scalars()
         )
 
-    for schedule in schedules:
-        with get_session() as session:
-            schedule = session.get(KeywordSchedule, schedule.id)
-            if not schedule or not schedule.active:
-                continue
-            keyword = session.get(Keyword, schedule.keyword_id)
-            if not keyword:
-                continue
-            service.run_keywords(session, [keyword], kind="schedule")
-            next_run = now + timedelta(hours=schedule.interval_hours)
-            schedule.last_run_at = now
-            schedule.next_run_at = next_run
-            session.add(schedule)
-            session.commit()
+    with SerperClient(settings) as client:
+        service = SerpService(client)
+        for schedule in schedules:
+            with get_session("scheduler") as session:
+                schedule = session.get(KeywordSchedule, schedule.id)
+                if not schedule or not schedule.active:
+                    continue
+                keyword = session.get(Keyword, schedule.keyword_id)
+                if not keyword:
+                    continue
+                service.run_keywords(session, [keyword], kind="schedule")
+                next_run = now + timedelta(hours=schedule.interval_hours)
+                schedule.last_run_at = now
+                schedule.next_run_at = next_run
+                session.add(schedule)
+                session.commit()
 
 
 def _run_favorite_tag_checks() -> None:
     now = _now_tz()
     tag_service = TagService(get_settings())
 
-    with get_session() as session:
+    with get_session("scheduler") as session:
         sites = list(session.query(TrackedSite).all())
         if not sites:
             return
@@ -82,6 +85,7 @@ def _run_favorite_tag_checks() -> None:
                 tag_service.check_url(session, run.id, url, region=None, language=None)
             run.status = RunStatus.success
             run.finished_at = _now_tz()
+            bump_data_versions(session, SERP)
             session.commit()
         except Exception as exc:  # noqa: BLE001
             session.rollback()
@@ -89,6 +93,7 @@ def _run_favorite_tag_checks() -> None:
             run.error = str(exc)[:500]
             run.finished_at = _now_tz()
             session.add(run)
+            bump_data_versions(session, SERP)
             session.commit()
 
 
@@ -96,7 +101,7 @@ def _run_canonical_favorite_checks() -> None:
     now = _now_tz()
     tag_service = TagService(get_settings())
 
-    with get_session() as session:
+    with get_session("scheduler") as session:
         sites = list(session.query(CanonicalFavorite).all())
         if not sites:
             return
@@ -109,6 +114,7 @@ def _run_canonical_favorite_checks() -> None:
                 tag_service.check_url(session, run.id, site.url, region=None, language=None)
             run.status = RunStatus.success
             run.finished_at = _now_tz()
+            bump_data_versions(session, SERP)
             session.commit()
         except Exception as exc:  # noqa: BLE001
             session.rollback()
@@ -116,9 +122,16 @@ def _run_canonical_favorite_checks() -> None:
             run.error = str(exc)[:500]
             run.finished_at = _now_tz()
             session.add(run)
+            bump_data_versions(session, SERP)
             session.commit()
 
 
+def _run_tracked_hit_backfill() -> None:
+    # Catches sites added by redirect checks; starring a site queues a job
+    with get_session("scheduler") as session:
+        backfill_tracked_hits(session)
+
+
 def start_scheduler() -> BackgroundScheduler:
     settings = get_settings()
     scheduler = BackgroundScheduler(timezone=settings.scheduler_tz)
@@ -149,6 +162,25 @@ def start_scheduler() -> BackgroundScheduler:
         misfire_grace_time=300,
         max_instances=1,
     )
+    scheduler.add_job(
+        _run_tracked_hit_backfill,
+        "interval",
+        minutes=5,
+        id="tracked_hit_backfill",
+        coalesce=True,
+        misfire_grace_time=300,
+        max_instances=1,
+    )
+    # Each instance drains the queue; extra instances start while one is busy
+    scheduler.add_job(
+        run_pending_jobs,
+        "interval",
+        seconds=settings.job_poll_seconds,
+        id="background_jobs",
+        coalesce=True,
+        misfire_grace_time=60,
+        max_instances=settings.job_workers,
+    )
     scheduler.start()
     return scheduler
 
@@ -184,13 +216,32 @@ def run_forever() -> None:
         misfire_grace_time=300,
         max_instances=1,
     )
+    scheduler.add_job(
+        _run_tracked_hit_backfill,
+        "interval",
+        minutes=5,
+        id="tracked_hit_backfill",
+        coalesce=True,
+        misfire_grace_time=300,
+        max_instances=1,
+    )
+    # Each instance drains the queue; extra instances start while one is busy
+    scheduler.add_job(
+        run_pending_jobs,
+        "interval",
+        seconds=settings.job_poll_seconds,
+        id="background_jobs",
+        coalesce=True,
+        misfire_grace_time=60,
+        max_instances=settings.job_workers,
+    )
     scheduler.start()
 
 
 def _register_shutdown() -> None:
     def _mark_stopped() -> None:
         try:
-            with get_session() as session:
+            with get_session("scheduler") as session:
                 status = session.get(SchedulerStatus, "keyword-scheduler")
                 if not status:
                     status = SchedulerStatus(name="keyword-scheduler", running=False)